@@ -30,13 +30,16 @@ class BaseProvider(CIMProvider2):
         In addition to CIM provider methods, this class and its subclasses
         can convert CIM InstanceName to Anaconda's StorageDevice instance
         and a vice versa.
+
+        Instances are rendered from the current snapshot of the storage,
+        see StorageAccess, without any lock.
     """
     @cmpi_logging.trace_method
     def __init__(self, storage, config, provider_manager, setting_manager,
             job_manager, *args, **kwargs):
         """
             Initialize the provider.
-            Store reference to blivet.Blivet.
+            Store reference to StorageAccess, which wraps blivet.Blivet.
             Store reference to StorageConfiguration.
             Register at given ProviderManager.
         """
@@ -47,6 +50,23 @@ class BaseProvider(CIMProvider2):
         self.setting_manager = setting_manager
         self.job_manager = job_manager
 
+    @staticmethod
+    def is_requested(model, *property_names):
+        """
+            Return True, if at least one of given properties should be
+            filled in given model.
+            The CIMOM creates the model with property_list set according
+            to PropertyList of the request and the model silently drops all
+            other properties, so it is not necessary to compute them.
+        """
+        property_list = getattr(model, 'property_list', None)
+        if property_list is None:
+            return True
+        for name in property_names:
+            if name.lower() in property_list:
+                return True
+        return False
+
     @cmpi_logging.trace_method
     # The method has too many arguments, but that's because of
     # CIMProvider2.references
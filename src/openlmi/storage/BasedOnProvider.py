@@ -28,7 +28,19 @@ class BasedOnProvider(BaseProvider):
         Base of all BasedOn providers.
         It should handle everything, subclasses just need to override
         enumerate_devices.
+
+        The associations between devices are indexed once per snapshot of
+        the device tree, see get_adjacency(). All intrinsic methods,
+        including References and Associators, are answered from the index.
+
+        Subclasses can override dependent_role and antecedent_role to
+        associate devices using different properties, and enumerate_edges,
+        if the associated devices are not base devices of each other.
     """
+    # Names of the association properties.
+    dependent_role = 'Dependent'
+    antecedent_role = 'Antecedent'
+
     @cmpi_logging.trace_method
     def __init__(self, *args, **kwargs):
         super(BasedOnProvider, self).__init__(*args, **kwargs)
@@ -43,25 +55,89 @@ class BasedOnProvider(BaseProvider):
         return []
 
     @cmpi_logging.trace_method
-    def enum_instances(self, env, model, keys_only):
+    def enumerate_edges(self):
         """
-            Provider implementation of EnumerateInstances intrinsic method.
+            Enumerate all (dependent, antecedent) tuples of associated
+            StorageDevices.
         """
-        model.path.update({'Dependent': None, 'Antecedent': None})
-
         for device in self.enumerate_devices():
             provider = self.provider_manager.get_provider_for_device(device)
             if not provider:
                 raise pywbem.CIMError(pywbem.CIM_ERR_FAILED,
                         "Cannot find provider for device " + device.path)
             for base in provider.get_base_devices(device):
-                model['Dependent'] = provider.get_name_for_device(device)
-                model['Antecedent'] = self.provider_manager.get_name_for_device(
-                        base)
-                if keys_only:
-                    yield model
-                else:
-                    yield self.get_instance(env, model, device, base)
+                yield (device, base)
+
+    @cmpi_logging.trace_method
+    def get_adjacency(self):
+        """
+            Return tuple (edges, by_dependent, by_antecedent):
+              - edges: list of all (dependent device, antecedent device,
+                dependent CIMInstanceName, antecedent CIMInstanceName)
+                tuples,
+              - by_dependent: dictionary dependent device -> list of its
+                edges,
+              - by_antecedent: dictionary antecedent device -> list of its
+                edges.
+
+            The index is built when it is needed for the first time and it
+            is stored in the current snapshot of the device tree, i.e. it is
+            rebuilt after each refresh.
+        """
+        snapshot = self.storage.snapshot
+        key = ('adjacency', self)
+        adjacency = snapshot.memo.get(key)
+        if adjacency is None:
+            snapshot.memo_lock.acquire()
+            try:
+                adjacency = snapshot.memo.get(key)
+                if adjacency is None:
+                    adjacency = self._build_adjacency()
+                    snapshot.memo[key] = adjacency
+            finally:
+                snapshot.memo_lock.release()
+        return adjacency
+
+    @cmpi_logging.trace_method
+    def _build_adjacency(self):
+        """
+            Build the association index, see get_adjacency().
+        """
+        edges = []
+        by_dependent = {}
+        by_antecedent = {}
+        for (device, base) in self.enumerate_edges():
+            edge = (device, base,
+                    self.provider_manager.get_name_for_device(device),
+                    self.provider_manager.get_name_for_device(base))
+            edges.append(edge)
+            by_dependent.setdefault(device, []).append(edge)
+            by_antecedent.setdefault(base, []).append(edge)
+        return (edges, by_dependent, by_antecedent)
+
+    @cmpi_logging.trace_method
+    def _get_edge_instance(self, env, model, edge, keys_only):
+        """
+            Fill given model with association represented by given edge.
+        """
+        (device, base, device_name, base_name) = edge
+        model[self.dependent_role] = device_name.copy()
+        model[self.antecedent_role] = base_name.copy()
+        if keys_only:
+            return model
+        return self.get_instance(env, model, device, base)
+
+    @cmpi_logging.trace_method
+    def enum_instances(self, env, model, keys_only):
+        """
+            Provider implementation of EnumerateInstances intrinsic method.
+        """
+        model.path.update({self.dependent_role: None,
+                self.antecedent_role: None})
+
+        (edges, _by_dependent, _by_antecedent) = self.get_adjacency()
+        for edge in edges:
+            yield self._get_edge_instance(env, model, edge, keys_only)
 
 
     # pylint: disable-msg=W0221
@@ -73,31 +149,54 @@ class BasedOnProvider(BaseProvider):
         """
         if not device:
             device = self.provider_manager.get_device_for_name(
-                    model['Dependent'])
+                    model[self.dependent_role])
         if not device:
             raise pywbem.CIMError(pywbem.CIM_ERR_NOT_FOUND,
-                    "Cannot find Dependent device")
+                    "Cannot find %s device" % (self.dependent_role,))
 
         if not base:
             base = self.provider_manager.get_device_for_name(
-                    model['Antecedent'])
+                    model[self.antecedent_role])
         if not base:
             raise pywbem.CIMError(pywbem.CIM_ERR_NOT_FOUND,
-                    "Cannot find Antecedent device")
-
-        device_provider = self.provider_manager.get_device_provider_for_name(
-                model['Dependent'])
-        if not (base in device_provider.get_base_devices(device)):
-            raise pywbem.CIMError(pywbem.CIM_ERR_NOT_FOUND,
-                    "Antecedent is not related to Dependent device")
+                    "Cannot find %s device" % (self.antecedent_role,))
 
-        return model
+        (_edges, by_dependent, _by_antecedent) = self.get_adjacency()
+        for edge in by_dependent.get(device, []):
+            if edge[1] is base:
+                return model
+        raise pywbem.CIMError(pywbem.CIM_ERR_NOT_FOUND,
+                "%s is not related to %s device"
+                % (self.antecedent_role, self.dependent_role))
 
     @cmpi_logging.trace_method
     def references(self, env, object_name, model, result_class_name, role,
                    result_role, keys_only):
-        """Instrument Associations."""
-        return self.simple_references(env, object_name, model,
-                result_class_name, role, result_role, keys_only,
-                "CIM_StorageExtent",
-                "CIM_StorageExtent")
+        """
+            Instrument Associations.
+            Only associations of the device represented by object_name are
+            looked up in the index, other associations are not enumerated.
+        """
+        device = self.provider_manager.get_device_for_name(object_name)
+        if not device:
+            return
+
+        model.path.update({self.dependent_role: None,
+                self.antecedent_role: None})
+        (_edges, by_dependent, by_antecedent) = self.get_adjacency()
+        if role:
+            role = role.lower()
+        if result_role:
+            result_role = result_role.lower()
+        dependent = self.dependent_role.lower()
+        antecedent = self.antecedent_role.lower()
+
+        edges = []
+        if (role in (None, '', dependent)
+                and result_role in (None, '', antecedent)):
+            edges.extend(by_dependent.get(device, []))
+        if (role in (None, '', antecedent)
+                and result_role in (None, '', dependent)):
+            edges.extend(by_antecedent.get(device, []))
+        for edge in edges:
+            yield self._get_edge_instance(env, model, edge, keys_only)
@@ -212,6 +212,29 @@ class ElementCapabilitiesProvider(BaseProvider):
         self.service_provider = service_provider
         super(ElementCapabilitiesProvider, self).__init__(*args, **kwargs)
 
+    @cmpi_logging.trace_method
+    def _get_service_name(self):
+        """ Return CIMInstanceName of the associated service. """
+        return pywbem.CIMInstanceName(
+                classname=self.service_provider.classname,
+                namespace=self.config.namespace,
+                keybindings={
+                        'CreationClassName':
+                                self.service_provider.classname,
+                        'Name': self.service_provider.classname,
+                        'SystemCreationClassName' :
+                                self.config.system_class_name,
+                        'SystemName': self.config.system_name
+                })
+
+    @cmpi_logging.trace_method
+    def _get_capabilities_name(self, instance_id):
+        """ Return CIMInstanceName of capabilities with given InstanceID. """
+        return pywbem.CIMInstanceName(
+                classname=self.capabilities_provider.classname,
+                namespace=self.config.namespace,
+                keybindings={'InstanceID' : instance_id})
+
     @cmpi_logging.trace_method
     def enumerate_capabilities(self):
         """
@@ -226,23 +249,37 @@ class ElementCapabilitiesProvider(BaseProvider):
             requested.
         """
         for capabilities in self.capabilities_provider.enumerate_capabilities():
-            managed_element_name = pywbem.CIMInstanceName(
-                    classname=self.service_provider.classname,
-                    namespace=self.config.namespace,
-                    keybindings={
-                            'CreationClassName':
-                                    self.service_provider.classname,
-                            'Name': self.service_provider.classname,
-                            'SystemCreationClassName' :
-                                    self.config.system_class_name,
-                            'SystemName': self.config.system_name
-                    })
-
-            capabilities_name = pywbem.CIMInstanceName(
-                    classname=self.capabilities_provider.classname,
-                    namespace=self.config.namespace,
-                    keybindings={'InstanceID' : capabilities['InstanceID']})
-            yield (managed_element_name, capabilities_name)
+            yield (self._get_service_name(),
+                    self._get_capabilities_name(capabilities['InstanceID']))
+
+    @cmpi_logging.trace_method
+    def get_element_name_for_capabilities(self, instance_id):
+        """
+            Return CIMInstanceName of managed element associated to
+            capabilities with given InstanceID.
+            Return None if there is no such capabilities.
+
+            Subclasses should override this method, if they override
+            enumerate_capabilities.
+        """
+        if not self.capabilities_provider.get_capabilities_for_id(
+                instance_id):
+            return None
+        return self._get_service_name()
+
+    @cmpi_logging.trace_method
+    def enumerate_capabilities_for_element(self, element_name):
+        """
+            Return iterable with (managed_element_name, capabilities_name)
+            of managed element with given CIMInstanceName.
+
+            Subclasses should override this method, if they override
+            enumerate_capabilities.
+        """
+        if (element_name.classname.lower()
+                != self.service_provider.classname.lower()):
+            return []
+        return self.enumerate_capabilities()
 
     @cmpi_logging.trace_method
     def enum_instances(self, env, model, keys_only):
@@ -287,11 +324,44 @@ class ElementCapabilitiesProvider(BaseProvider):
     @cmpi_logging.trace_method
     def references(self, env, object_name, model, result_class_name, role,
                    result_role, keys_only):
-        """Instrument Associations. """
-        return self.simple_references(env, object_name, model,
-                result_class_name, role, result_role, keys_only,
-                "CIM_Capabilities",
-                "CIM_ManagedElement")
+        """
+            Instrument Associations.
+            The association is resolved directly from given object_name,
+            other capabilities or managed elements are not enumerated.
+        """
+        if role:
+            role = role.lower()
+        if result_role:
+            result_role = result_role.lower()
+
+        if (object_name.classname.lower()
+                == self.capabilities_provider.classname.lower()):
+            if role not in (None, '', 'capabilities'):
+                return
+            if result_role not in (None, '', 'managedelement'):
+                return
+            if not object_name.has_key('InstanceID'):
+                return
+            instance_id = object_name['InstanceID']
+            element_name = self.get_element_name_for_capabilities(instance_id)
+            if not element_name:
+                return
+            pairs = [(element_name, self._get_capabilities_name(instance_id))]
+        else:
+            if role not in (None, '', 'managedelement'):
+                return
+            if result_role not in (None, '', 'capabilities'):
+                return
+            pairs = self.enumerate_capabilities_for_element(object_name)
+
+        model.path.update({'Capabilities': None, 'ManagedElement': None})
+        for (element_name, capabilities_name) in pairs:
+            model['Capabilities'] = capabilities_name
+            model['ManagedElement'] = element_name
+            if keys_only:
+                yield model
+            else:
+                yield self.get_instance(env, model, capabilities_name)
 
 
     class Values(object):
@@ -0,0 +1,485 @@
+# Copyright (C) 2013 Red Hat, Inc.  All rights reserved.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#
+# Authors: Jan Safranek <jsafrane@redhat.com>
+# -*- coding: utf-8 -*-
+"""
+    .. autoclass:: DeviceMonitor
+        :members:
+"""
+
+import threading
+import time
+import pywbem
+import openlmi.common.cmpi_logging as cmpi_logging
+import openlmi.storage.util.storage
+from openlmi.storage.ExtentProvider import ExtentProvider
+from openlmi.storage.LocalFileSystemProvider import LocalFileSystemProvider
+
+class DeviceMonitor(object):
+    """
+    Watch udev events of block devices and keep the device tree up to date
+    with changes made outside of the provider, e.g. by mdadm or lvm
+    commands. Only the changed devices are refreshed in a background
+    thread, so CIM requests do not need to wait for full ``storage.reset()``.
+    The periodic full reset of the device tree is performed by the
+    background thread too.
+
+    Optionally, ``LMI_StorageInstCreation``, ``LMI_StorageInstDeletion`` and
+    ``LMI_StorageInstModification`` indications for appropriate storage
+    extents, storage pools, data formats and local filesystems are sent.
+
+    Bursts of udev events are debounced - the device tree is refreshed and
+    the indications are sent only when there was no udev event for
+    ``settle_time`` seconds, but at latest after ``MAX_DELAY_FACTOR`` *
+    ``settle_time`` seconds after the first event of the burst.
+    Devices, which were refreshed by an action after their udev event,
+    are not refreshed again.
+
+    The monitor remembers last known instances of all devices and formats,
+    the indications are generated by comparing them with instances
+    after the refresh of the device tree. Therefore also changes made by
+    our own jobs are reported. Only instances of categories, for which
+    someone is subscribed, are remembered and rendered.
+    """
+
+    IND_EXTENT_CREATED = "StorageExtentCreated"
+    IND_EXTENT_DELETED = "StorageExtentDeleted"
+    IND_EXTENT_CHANGED = "StorageExtentChanged"
+    IND_POOL_CREATED = "StoragePoolCreated"
+    IND_POOL_DELETED = "StoragePoolDeleted"
+    IND_POOL_CHANGED = "StoragePoolChanged"
+    IND_FORMAT_CREATED = "DataFormatCreated"
+    IND_FORMAT_DELETED = "DataFormatDeleted"
+    IND_FORMAT_CHANGED = "DataFormatChanged"
+    IND_FILESYSTEM_CREATED = "LocalFileSystemCreated"
+    IND_FILESYSTEM_DELETED = "LocalFileSystemDeleted"
+    IND_FILESYSTEM_CHANGED = "LocalFileSystemChanged"
+
+    # Categories of reported instances.
+    CATEGORY_EXTENT = 1
+    CATEGORY_POOL = 2
+    CATEGORY_FORMAT = 3
+    CATEGORY_FILESYSTEM = 4
+
+    # category -> (CIM class, description, creation filter, deletion filter,
+    #     modification filter)
+    CATEGORIES = {
+        CATEGORY_EXTENT: ("CIM_StorageExtent", "StorageExtent",
+                IND_EXTENT_CREATED, IND_EXTENT_DELETED, IND_EXTENT_CHANGED),
+        CATEGORY_POOL: ("CIM_StoragePool", "StoragePool",
+                IND_POOL_CREATED, IND_POOL_DELETED, IND_POOL_CHANGED),
+        CATEGORY_FORMAT: ("LMI_DataFormat", "DataFormat",
+                IND_FORMAT_CREATED, IND_FORMAT_DELETED, IND_FORMAT_CHANGED),
+        CATEGORY_FILESYSTEM: ("CIM_LocalFileSystem", "LocalFileSystem",
+                IND_FILESYSTEM_CREATED, IND_FILESYSTEM_DELETED,
+                IND_FILESYSTEM_CHANGED),
+    }
+
+    # Maximum delay of a burst of events, in multiples of settle_time.
+    MAX_DELAY_FACTOR = 10
+
+    @cmpi_logging.trace_method
+    def __init__(self, storage, provider_manager, indication_manager,
+            settle_time=1, send_indications=True):
+        """
+        Create new ``DeviceMonitor``. It does not watch udev until
+        ``start()`` is called.
+
+        :param storage: (``StorageAccess``) The storage to refresh.
+        :param provider_manager: (``ProviderManager``) Manager with all device
+            and format providers.
+        :param indication_manager: (``IndicationManager``) Manager to send
+            indications.
+        :param settle_time: (``float``) Time in seconds without any udev event
+            before the device tree is refreshed.
+        :param send_indications: (``bool``) Whether indications about changed
+            devices should be sent.
+        """
+        self.storage = storage
+        self.provider_manager = provider_manager
+        self.indication_manager = indication_manager
+        self.settle_time = settle_time
+        self.send_indications = send_indications
+
+        # Last known instances, str(instance path) -> (device name,
+        # category, CIMInstance)
+        self.instances = {}
+        # Categories of instances in self.instances, i.e. categories
+        # with subscribed indication filters.
+        self.tracked = set()
+        # Lock to guard self.instances and self.tracked.
+        self.instances_lock = threading.RLock()
+
+        # Condition to guard pending events and to wake up the monitor
+        # thread.
+        self.event_condition = threading.Condition()
+        # Names of devices with pending udev events -> time of the last
+        # event.
+        self.pending = {}
+        # Time of the first and the last pending event.
+        self.first_event = None
+        self.last_event = None
+
+        self.observer = None
+        self.monitor_thread = None
+        if self.send_indications:
+            self._add_indication_filters()
+            self.indication_manager.add_subscription_listener(
+                    self._subscriptions_changed)
+
+    @cmpi_logging.trace_method
+    def _add_indication_filters(self):
+        """
+        Add all device-related ``IndicationFilters`` to indication manager.
+        """
+        filters = {}
+        for (classname, description, created, deleted, changed) \
+                in self.CATEGORIES.itervalues():
+            filters[created] = {
+                "Query" : "SELECT * FROM CIM_InstCreation WHERE "
+                    "SourceInstance ISA " + classname,
+                "Description" : "Creation of a " + description + ".",
+            }
+            filters[deleted] = {
+                "Query" : "SELECT * FROM CIM_InstDeletion WHERE "
+                    "SourceInstance ISA " + classname,
+                "Description" : "Deletion of a " + description + ".",
+            }
+            filters[changed] = {
+                "Query" : "SELECT * FROM CIM_InstModification WHERE "
+                    "SourceInstance ISA " + classname,
+                "Description" : "Modification of a " + description + ".",
+            }
+        self.indication_manager.add_filters(filters)
+
+    @cmpi_logging.trace_method
+    def start(self):
+        """
+        Start watching udev.
+        It must be called after all device and format providers are
+        registered in the provider manager.
+        """
+        # pyudev is needed only when the monitor is enabled
+        import pyudev
+
+        if self.send_indications:
+            self._subscriptions_changed()
+
+        # the periodic full reset is done by the monitor thread
+        openlmi.storage.util.storage.set_background_reset(True)
+        self.monitor_thread = threading.Thread(target=self._monitor_main)
+        self.monitor_thread.start()
+
+        context = pyudev.Context()
+        monitor = pyudev.Monitor.from_netlink(context)
+        monitor.filter_by('block')
+        self.observer = pyudev.MonitorObserver(monitor, self._udev_event)
+        self.observer.start()
+
+    def _get_subscribed_categories(self):
+        """
+        Return set of categories, for which at least one indication filter
+        is subscribed.
+        """
+        categories = set()
+        for (category, filters) in self.CATEGORIES.iteritems():
+            for filter_id in filters[2:]:
+                if self.indication_manager.is_subscribed(filter_id):
+                    categories.add(category)
+                    break
+        return categories
+
+    @cmpi_logging.trace_method
+    def _subscriptions_changed(self):
+        """
+        Callback from IndicationManager. Remember current instances of
+        newly subscribed categories and forget instances of categories,
+        which are not subscribed anymore.
+        """
+        self.instances_lock.acquire()
+        try:
+            subscribed = self._get_subscribed_categories()
+            added = subscribed - self.tracked
+            removed = self.tracked - subscribed
+            if removed:
+                for (path, entry) in self.instances.items():
+                    if entry[1] in removed:
+                        del self.instances[path]
+            if added:
+                self.instances.update(self._get_instances(
+                        self.storage.devices, added))
+            self.tracked = subscribed
+        finally:
+            self.instances_lock.release()
+
+    @staticmethod
+    def _get_device_name(udev_device):
+        """
+        Return name of blivet StorageDevice for given pyudev.Device.
+        """
+        name = udev_device.get('DM_NAME', None)
+        if name:
+            return name
+        name = udev_device.get('MD_DEVNAME', None)
+        if name and udev_device.sys_name.startswith('md'):
+            return name
+        return udev_device.sys_name
+
+    def _udev_event(self, action, udev_device):
+        """
+        Callback from pyudev.MonitorObserver. It just enqueues the device
+        for refresh.
+        """
+        device = self.storage.get_device_by_kernel_name(
+                udev_device.sys_name)
+        if device:
+            name = device.name
+        else:
+            # new device
+            name = self._get_device_name(udev_device)
+        cmpi_logging.logger.trace_verbose("udev event %s on %s"
+                % (action, name))
+        self.event_condition.acquire()
+        try:
+            now = time.time()
+            if not self.pending:
+                self.first_event = now
+            self.last_event = now
+            self.pending[name] = now
+            self.event_condition.notify()
+        finally:
+            self.event_condition.release()
+
+    @cmpi_logging.trace_method
+    def _get_pending(self):
+        """
+        Wait until a burst of udev events settles and return dictionary
+        of names of changed devices -> time of their last udev event.
+        Return None, if periodic full reset of the device tree is due.
+        """
+        self.event_condition.acquire()
+        try:
+            while True:
+                if not self.pending:
+                    next_reset = openlmi.storage.util.storage.get_next_reset()
+                    if next_reset is None:
+                        self.event_condition.wait()
+                        continue
+                    timeout = next_reset - time.time()
+                    if timeout <= 0:
+                        return None
+                    self.event_condition.wait(timeout)
+                    continue
+                now = time.time()
+                deadline = min(self.last_event + self.settle_time,
+                        self.first_event
+                            + self.MAX_DELAY_FACTOR * self.settle_time)
+                if now >= deadline:
+                    break
+                self.event_condition.wait(deadline - now)
+
+            pending = self.pending
+            self.pending = {}
+            return pending
+        finally:
+            self.event_condition.release()
+
+    @cmpi_logging.trace_method
+    def _monitor_main(self):
+        """
+        Main loop of the monitor thread.
+        """
+        while True:
+            pending = self._get_pending()
+            try:
+                if pending is None:
+                    self.reset_devices()
+                else:
+                    self.process_devices(pending)
+            except Exception, err:
+                cmpi_logging.logger.error(
+                        "Failed to refresh devices %s: %s"
+                        % (sorted(pending or []), str(err)))
+
+    @cmpi_logging.trace_method
+    def reset_devices(self):
+        """
+        Perform full reset of the device tree and send indications about
+        changed instances.
+        """
+        cmpi_logging.logger.trace_info(
+                "Periodic full reset of the device tree.")
+        self.instances_lock.acquire()
+        try:
+            self.storage.acquire_write()
+            try:
+                openlmi.storage.util.storage.reset_storage(self.storage,
+                        force=True)
+            finally:
+                self.storage.release_write()
+
+            # instances are rendered from the new snapshot without the lock
+            if not self.tracked:
+                return
+            new_instances = self._get_instances(self.storage.devices,
+                    self.tracked)
+            self._send_changes(dict(self.instances), new_instances)
+        finally:
+            self.instances_lock.release()
+
+    @cmpi_logging.trace_method
+    def process_devices(self, pending):
+        """
+        Refresh devices with given names in the device tree and send
+        indications about changed instances.
+
+        :param pending: (``dictionary`` of ``string`` -> ``float``) Names of
+            the changed devices -> time of their last udev event. Devices,
+            which were refreshed after this time, are not refreshed again.
+        """
+        names = set([name for (name, event_time) in pending.iteritems()
+                if event_time >= openlmi.storage.util.storage.get_refresh_time(
+                        name)])
+        self.instances_lock.acquire()
+        try:
+            self.storage.acquire_write()
+            try:
+                scope = set(pending.keys())
+                # devices modified by running actions are refreshed when
+                # the actions finish
+                names -= self.storage.get_reserved_devices()
+                if names:
+                    devices = [self.storage.get_device_by_name(name)
+                            for name in names]
+                    devices = [device for device in devices if device]
+                    affected = \
+                            openlmi.storage.util.storage.get_affected_devices(
+                                    self.storage, devices)
+                    scope.update([device.name for device in affected])
+
+                    openlmi.storage.util.storage.reset_storage(
+                            self.storage, devices, names=names)
+                else:
+                    cmpi_logging.logger.trace_verbose(
+                            "Devices %s are already refreshed."
+                            % (sorted(scope),))
+            finally:
+                self.storage.release_write()
+
+            if not self.tracked:
+                return
+            # reset_storage() has published new snapshot, instances are
+            # rendered from it without the lock
+            devices = [self.storage.get_device_by_name(name)
+                    for name in pending]
+            devices = [device for device in devices if device]
+            affected = openlmi.storage.util.storage \
+                    .get_published_affected_devices(self.storage, devices)
+            new_instances = self._get_instances(affected, self.tracked)
+
+            scope.update([device.name for device in affected])
+            old_instances = {}
+            for (path, entry) in self.instances.iteritems():
+                if entry[0] in scope:
+                    old_instances[path] = entry
+            self._send_changes(old_instances, new_instances)
+        finally:
+            self.instances_lock.release()
+
+    @cmpi_logging.trace_method
+    def _send_changes(self, old_instances, new_instances):
+        """
+        Compare old and new instances, update last known instances and
+        send appropriate indications.
+        Both parameters are dictionaries as returned by _get_instances().
+        """
+
+        for (path, (_name, category, instance)) in old_instances.iteritems():
+            filters = self.CATEGORIES[category]
+            if path not in new_instances:
+                del self.instances[path]
+                self.indication_manager.send_instdeletion(instance,
+                        filters[3])
+
+        for (path, entry) in new_instances.iteritems():
+            (_name, category, instance) = entry
+            filters = self.CATEGORIES[category]
+            self.instances[path] = entry
+            old_entry = old_instances.get(path, None)
+            if not old_entry:
+                self.indication_manager.send_instcreation(instance,
+                        filters[2])
+            elif old_entry[2] != instance:
+                self.indication_manager.send_instmodification(
+                        old_entry[2], instance, filters[4])
+
+    @cmpi_logging.trace_method
+    def _get_instances(self, devices, categories):
+        """
+        Return dictionary str(instance path) -> (device name, category,
+        CIMInstance) for all given devices and their formats. Only
+        instances of given categories are returned.
+        """
+        instances = {}
+        for device in devices:
+            provider = self.provider_manager.get_provider_for_device(device)
+            if provider:
+                if isinstance(provider, ExtentProvider):
+                    category = self.CATEGORY_EXTENT
+                else:
+                    category = self.CATEGORY_POOL
+                if category in categories:
+                    name = provider.get_name_for_device(device)
+                    instance = self._get_instance(provider, name, device)
+                    if instance:
+                        instances[str(name)] = (device.name, category,
+                                instance)
+
+            fmt = self.storage.get_format(device)
+            if not fmt or not fmt.type:
+                continue
+            provider = self.provider_manager.get_provider_for_format(
+                    device, fmt)
+            if provider:
+                if isinstance(provider, LocalFileSystemProvider):
+                    category = self.CATEGORY_FILESYSTEM
+                else:
+                    category = self.CATEGORY_FORMAT
+                if category in categories:
+                    name = provider.get_name_for_format(device, fmt)
+                    instance = self._get_instance(provider, name, fmt)
+                    if instance:
+                        instances[str(name)] = (device.name, category,
+                                instance)
+        return instances
+
+    @cmpi_logging.trace_method
+    def _get_instance(self, provider, name, obj):
+        """
+        Return CIMInstance with given name, filled by given provider.
+        ``obj`` is StorageDevice or DeviceFormat, which is passed
+        to provider's get_instance. Return None if the instance cannot be
+        created.
+        """
+        model = pywbem.CIMInstance(classname=name.classname, path=name)
+        model.update(name)
+        try:
+            return provider.get_instance(None, model, obj)
+        except pywbem.CIMError, err:
+            cmpi_logging.logger.trace_warn("Cannot get instance %s: %s"
+                    % (str(name), str(err)))
+            return None
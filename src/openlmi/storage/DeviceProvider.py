@@ -19,6 +19,7 @@
 """ Module for DeviceProvider class. """
 
 from openlmi.storage.BaseProvider import BaseProvider
+from openlmi.storage.InstanceCache import InstanceCache
 import pywbem
 import openlmi.common.cmpi_logging as cmpi_logging
 
@@ -37,10 +38,60 @@ class DeviceProvider(BaseProvider):
             Initialize the provider.
             Store reference to blivet.Blivet.
             Store reference to StorageConfiguration.
-            Register at given ProviderManager.
+            
+            The provider must be registered at ProviderManager by
+            add_device_provider(). Subclasses should set self.classname to
+            CIM class name of their instances, so the manager can index
+            them.
         """
         super(DeviceProvider, self).__init__(*args, **kwargs)
-        self.provider_manager.add_device_provider(self)
+        if self.config.instance_cache:
+            self.instance_cache = InstanceCache(
+                    self.config.instance_cache_size)
+        else:
+            self.instance_cache = None
+
+    @cmpi_logging.trace_method
+    # pylint: disable-msg=W0613
+    def render_instance(self, env, model, device):
+        """
+            Fill all non-key properties of given StorageDevice to the model.
+            Subclasses, which use get_cached_instance(), must override
+            this method.
+        """
+        return model
+
+    @cmpi_logging.trace_method
+    def get_cached_instance(self, env, model, device):
+        """
+            Fill properties of given StorageDevice to the model using
+            render_instance().
+
+            The rendered properties are cached until the device tree is
+            refreshed. Instances requested with PropertyList are rendered
+            without the cache, only the requested properties are computed.
+            Devices of private views (e.g. of a transaction) are not cached.
+        """
+        snapshot = self.storage.snapshot
+        if (self.instance_cache is None or snapshot.generation is None
+                or device not in snapshot.paths):
+            return self.render_instance(env, model, device)
+
+        properties = self.instance_cache.get(device, snapshot.generation)
+        if properties is None:
+            if getattr(model, 'property_list', None) is not None:
+                return self.render_instance(env, model, device)
+            # Render to an empty instance, the model may contain properties
+            # of previously enumerated device.
+            instance = pywbem.CIMInstance(classname=model.classname,
+                    path=model.path)
+            instance = self.render_instance(env, instance, device)
+            properties = instance.properties.values()
+            self.instance_cache.put(device, snapshot.generation, properties)
+
+        for prop in properties:
+            model[prop.name] = prop.copy()
+        return model
 
     @cmpi_logging.trace_method
     # pylint: disable-msg=W0613
@@ -81,17 +132,24 @@ class DeviceProvider(BaseProvider):
     def get_status(self, device):
         """
             Returns OperationalStatus for given Anaconda StorageDevice.
+            The status is computed only once for each snapshot of the device
+            tree, see compute_status().
+        """
+        return list(self._get_device_attributes(device)[1])
+
+    @cmpi_logging.trace_method
+    # pylint: disable-msg=W0613
+    def compute_status(self, device, base_statuses):
+        """
+            Compute OperationalStatus for given Anaconda StorageDevice.
+            base_statuses is list of OperationalStatuses of its base devices.
             It combines statuses of all parent devices.
             Subclasses should override this method to provide additional
             statuses.
         """
         status = set()
-        parents = self.get_base_devices(device)
-        if len(parents) > 0:
-            for parent in parents:
-                parent_provider = self.provider_manager.get_provider_for_device(
-                        parent)
-                parent_status = parent_provider.get_status(parent)
+        if len(base_statuses) > 0:
+            for parent_status in base_statuses:
                 status.update(parent_status)
         else:
             status.add(self.Values.OperationalStatus.OK)
@@ -105,21 +163,77 @@ class DeviceProvider(BaseProvider):
             depend on, e.g. RAID members of a RAID, physical volumes
             of a Volume Group and Volume Group of Logical Volume.
         """
-        if device.parents:
-            return device.parents
-        return []
+        return self.storage.get_parents(device)
 
     @cmpi_logging.trace_method
-    def _find_redundancy(self, device):
+    def _get_device_attributes(self, device):
         """
-            Discover redundancy of given StorageDevice.
-            It uses ProviderManager to do so.
+            Return tuple (redundancy, status) of given StorageDevice.
+
+            Attributes of all devices are computed in one pass over the
+            device tree, when they are requested for the first time after
+            a refresh. They are stored in the current StorageSnapshot, i.e.
+            they are discarded when a new snapshot is published.
         """
-        provider = self.provider_manager.get_provider_for_device(device)
-        if not provider:
-            raise pywbem.CIMError(pywbem.CIM_ERR_FAILED,
-                    "Cannot find provider for device " + device.path)
-        return provider.get_redundancy(device)
+        snapshot = self.storage.snapshot
+        table = snapshot.memo.get('device_attributes')
+        if table is None:
+            snapshot.memo_lock.acquire()
+            try:
+                table = snapshot.memo.get('device_attributes')
+                if table is None:
+                    table = {}
+                    for dev in snapshot.devices:
+                        try:
+                            self._compute_device_attributes(dev, table)
+                        except pywbem.CIMError:
+                            # the error is stored in the table
+                            pass
+                    snapshot.memo['device_attributes'] = table
+            finally:
+                snapshot.memo_lock.release()
+
+        if device in table:
+            attributes = table[device]
+            if isinstance(attributes, pywbem.CIMError):
+                raise attributes
+            return attributes
+        # the device is not in the snapshot, e.g. it has not been
+        # created yet
+        return self._compute_device_attributes(device, dict(table))
+
+    @cmpi_logging.trace_method
+    def _compute_device_attributes(self, device, table):
+        """
+            Compute tuple (redundancy, status) of given StorageDevice and
+            store it in given table. Base devices are computed first,
+            attributes, which are already in the table, are not computed
+            again.
+            If the attributes cannot be computed, the CIMError is stored in
+            the table instead and it is raised.
+        """
+        if device in table:
+            attributes = table[device]
+        else:
+            try:
+                provider = self.provider_manager.get_provider_for_device(
+                        device)
+                if not provider:
+                    raise pywbem.CIMError(pywbem.CIM_ERR_FAILED,
+                            "Cannot find provider for device " + device.path)
+                bases = [self._compute_device_attributes(base, table)
+                        for base in provider.get_base_devices(device)]
+                redundancy = provider.compute_redundancy(device,
+                        [base[0] for base in bases])
+                status = provider.compute_status(device,
+                        [base[1] for base in bases])
+                attributes = (redundancy, tuple(status))
+            except pywbem.CIMError, err:
+                attributes = err
+            table[device] = attributes
+        if isinstance(attributes, pywbem.CIMError):
+            raise attributes
+        return attributes
 
     @cmpi_logging.trace_method
     # pylint: disable-msg=W0613
@@ -155,14 +269,23 @@ class DeviceProvider(BaseProvider):
     def get_redundancy(self, device):
         """
             Returns redundancy characteristics for given Anaconda StorageDevice.
+            The redundancy is computed only once for each snapshot of the
+            device tree, see compute_redundancy(). The caller must not
+            modify the returned value.
         """
-        parents = self.get_base_devices(device)
-        if len(parents) > 0:
-            # find all parents and get their redundancy
-            redundancies = [self._find_redundancy(device) for device in parents]
+        return self._get_device_attributes(device)[0]
+
+    @cmpi_logging.trace_method
+    def compute_redundancy(self, device, base_redundancies):
+        """
+            Compute redundancy characteristics for given Anaconda
+            StorageDevice. base_redundancies is list of redundancies of its
+            base devices.
+        """
+        if len(base_redundancies) > 0:
             # iteratively call self.get_common_redundancy(r1, r2), ...
             final_redundancy = self.Redundancy.get_common_redundancy_list(
-                    redundancies)
+                    base_redundancies)
         else:
             # this device has no parents, assume it is simple disk
             final_redundancy = self.Redundancy(
@@ -176,7 +299,12 @@ class DeviceProvider(BaseProvider):
         """
             Class representing redundancy characteristics of a StorageExtent
             device, i.e. both StorageExtent and StoragePool
+
+            Instances are values - they can be compared and hashed and they
+            are shared by caches, so they must not be modified.
         """
+        __slots__ = ('no_single_point_of_failure', 'data_redundancy',
+                'package_redundancy', 'stripe_length', 'parity_layout')
 
         # constants for RAID levels
         RAID0 = 0
@@ -191,7 +319,11 @@ class DeviceProvider(BaseProvider):
         PARITY_ROTATED = 2
         PARITY_NON_ROTATED = 1
 
-        @cmpi_logging.trace_method
+        # Maximum nr. of items in the cache of get_common_redundancy_list().
+        CACHE_SIZE = 1024
+        # (tuple of member redundancies, raid_level) -> Redundancy
+        _cache = {}
+
         def __init__(self, no_single_point_of_failure=False,
                      data_redundancy=1,
                      package_redundancy=0,
@@ -203,138 +335,33 @@ class DeviceProvider(BaseProvider):
             self.stripe_length = stripe_length
             self.parity_layout = parity_layout
 
-        @cmpi_logging.trace_method
-        def get_redundancy_raid0(self, second):
-            """
-                Return the combined data redundancy characteristics for
-                two devices combined in RAID0.
-            """
-            # data is spread on all devices -> DataRedundancy is sum of base
-            # DataRedundancies
-            # PackageRedundancy is the minimum of PackageRedundancies
-            data_redundancy = min(self.data_redundancy, second.data_redundancy)
-            package_redundancy = min(self.package_redundancy,
-                    second.package_redundancy)
-            no_single_point_of_failure = (self.no_single_point_of_failure
-                    and second.no_single_point_of_failure)
-            stripe_length = self.stripe_length + second.stripe_length
+        def _key(self):
+            """ Return tuple with all characteristics. """
+            return (self.no_single_point_of_failure, self.data_redundancy,
+                    self.package_redundancy, self.stripe_length,
+                    self.parity_layout)
 
-            return DeviceProvider.Redundancy(
-                    no_single_point_of_failure=no_single_point_of_failure,
-                    data_redundancy=data_redundancy,
-                    package_redundancy=package_redundancy,
-                    stripe_length=stripe_length)
+        def __eq__(self, other):
+            if not isinstance(other, DeviceProvider.Redundancy):
+                return NotImplemented
+            return self._key() == other._key()
 
-        @cmpi_logging.trace_method
-        def get_redundancy_raid1(self, second):
-            """
-                Return the combined data redundancy characteristics for
-                two devices combined in RAID1.
-            """
-            data_redundancy = self.data_redundancy + second.data_redundancy
-            package_redundancy = (self.package_redundancy
-                    + second.package_redundancy)
-            no_single_point_of_failure = True
-            stripe_length = min(self.stripe_length, second.stripe_length)
+        def __ne__(self, other):
+            if not isinstance(other, DeviceProvider.Redundancy):
+                return NotImplemented
+            return self._key() != other._key()
 
-            return DeviceProvider.Redundancy(
-                    no_single_point_of_failure=no_single_point_of_failure,
-                    data_redundancy=data_redundancy,
-                    package_redundancy=package_redundancy,
-                    stripe_length=stripe_length)
+        def __hash__(self):
+            return hash(self._key())
 
-        @cmpi_logging.trace_method
-        def get_redundancy_raid5(self, second):
-            """
-                Return the combined data redundancy characteristics for
-                two devices combined in RAID5.
-            """
-            data_redundancy = min(self.data_redundancy, second.data_redundancy)
-            package_redundancy = min(self.package_redundancy,
-                    second.package_redundancy)
-            no_single_point_of_failure = True
-            stripe_length = self.stripe_length + second.stripe_length
+        def __repr__(self):
+            return ("Redundancy(no_single_point_of_failure=%s, "
+                    "data_redundancy=%s, package_redundancy=%s, "
+                    "stripe_length=%s, parity_layout=%s)" % self._key())
 
-            return DeviceProvider.Redundancy(
-                    no_single_point_of_failure=no_single_point_of_failure,
-                    data_redundancy=data_redundancy,
-                    package_redundancy=package_redundancy,
-                    stripe_length=stripe_length,
-                    parity_layout=self.PARITY_ROTATED)
-
-        @cmpi_logging.trace_method
-        def get_redundancy_raid4(self, second):
-            """
-                Return the combined data redundancy characteristics for
-                two devices combined in RAID4.
-            """
-            redundancy = self.get_redundancy_raid5(second)
-            redundancy.parity_layout = self.PARITY_NON_ROTATED
-            return redundancy
-
-
-        @cmpi_logging.trace_method
-        def get_redundancy_raid6(self, second):
-            """
-                Return the combined data redundancy characteristics for
-                two devices combined in RAID6.
-            """
-            data_redundancy = min(self.data_redundancy, second.data_redundancy)
-            package_redundancy = min(self.package_redundancy,
-                    second.package_redundancy)
-            no_single_point_of_failure = True
-            stripe_length = self.stripe_length + second.stripe_length
-
-            return DeviceProvider.Redundancy(
-                    no_single_point_of_failure=no_single_point_of_failure,
-                    data_redundancy=data_redundancy,
-                    package_redundancy=package_redundancy,
-                    stripe_length=stripe_length,
-                    parity_layout=self.PARITY_ROTATED)
-
-        @cmpi_logging.trace_method
-        def get_redundancy_raid10(self, second):
-            """
-                Return the combined data redundancy characteristics for
-                two devices combined in RAID10.
-            """
-            data_redundancy = self.data_redundancy + second.data_redundancy
-            package_redundancy = min(self.package_redundancy,
-                    second.package_redundancy)
-            no_single_point_of_failure = True
-            stripe_length = self.stripe_length + second.stripe_length
-
-            return DeviceProvider.Redundancy(
-                    no_single_point_of_failure=no_single_point_of_failure,
-                    data_redundancy=data_redundancy,
-                    package_redundancy=package_redundancy,
-                    stripe_length=stripe_length)
-
-
-        @cmpi_logging.trace_method
-        def get_redundancy_linear(self, second):
-            """
-                Return the combined data redundancy characteristics for
-                two devices.
-                Linear device is assumed, i.e. the data are either on self or
-                on B.
-            """
-            # assume linear device, i.e. a data is either on A or on B
-            # hence data_redundancy is the minimum of both
-            data_redundancy = min(self.data_redundancy, second.data_redundancy)
-            # assume the worst
-            package_redundancy = min(self.package_redundancy,
-                    second.package_redundancy)
-            # both NoSinglePointOfFailure must be true to be the result true
-            no_single_point_of_failure = (self.no_single_point_of_failure
-                    and second.no_single_point_of_failure)
-            #  we don't know if the data are on A or B, so assume the worst
-            stripe_length = min(self.stripe_length, second.stripe_length)
-            return DeviceProvider.Redundancy(
-                    no_single_point_of_failure=no_single_point_of_failure,
-                    data_redundancy=data_redundancy,
-                    package_redundancy=package_redundancy,
-                    stripe_length=stripe_length)
+        def copy(self):
+            """ Return copy of the redundancy. """
+            return DeviceProvider.Redundancy(*self._key())
 
         @staticmethod
         @cmpi_logging.trace_function
@@ -346,71 +373,99 @@ class DeviceProvider(BaseProvider):
                 on B.
                 
                 raid_level: LINEAR = Linear, 0,1,5,6 - raidX
+
+                The redundancies in redundancy_list are not modified. The
+                result is cached and it must not be modified by the caller.
+                None is returned for unknown raid_level.
             """
+            key = (tuple(redundancy_list), raid_level)
+            cache = DeviceProvider.Redundancy._cache
+            redundancy = cache.get(key)
+            if redundancy is None:
+                redundancy = DeviceProvider.Redundancy._compute_common(
+                        key[0], raid_level)
+                if redundancy is None:
+                    return None
+                if len(cache) >= DeviceProvider.Redundancy.CACHE_SIZE:
+                    cache.clear()
+                cache[key] = redundancy
+            return redundancy
+
+        @staticmethod
+        def _compute_common(members, raid_level):
+            """
+                Compute common redundancy characteristics of given tuple of
+                member redundancies in one pass.
+            """
+            count = len(members)
+            data = [m.data_redundancy for m in members]
+            package = [m.package_redundancy for m in members]
+            stripes = [m.stripe_length for m in members]
+            parity_layout = None
+
             if raid_level == DeviceProvider.Redundancy.LINEAR:
-                redundancy = reduce(
-                        lambda a, b: a.get_redundancy_linear(b),
-                        redundancy_list)
+                # the data are on one of the members, assume the worst
+                no_single_point_of_failure = all(
+                        m.no_single_point_of_failure for m in members)
+                data_redundancy = min(data)
+                package_redundancy = min(package)
+                stripe_length = min(stripes)
             elif raid_level == DeviceProvider.Redundancy.RAID0:
-                redundancy = reduce(
-                        lambda a, b: a.get_redundancy_raid0(b),
-                        redundancy_list)
+                # data are spread on all members
+                no_single_point_of_failure = all(
+                        m.no_single_point_of_failure for m in members)
+                data_redundancy = min(data)
+                package_redundancy = min(package)
+                stripe_length = sum(stripes)
             elif raid_level == DeviceProvider.Redundancy.RAID1:
-                redundancy = reduce(
-                        lambda a, b: a.get_redundancy_raid1(b),
-                        redundancy_list)
-                redundancy.package_redundancy = \
-                        redundancy.package_redundancy + len(redundancy_list) - 1
-            elif raid_level == DeviceProvider.Redundancy.RAID4:
-                redundancy = reduce(
-                        lambda a, b: a.get_redundancy_raid4(b),
-                        redundancy_list)
-                redundancy.package_redundancy = \
-                    redundancy.package_redundancy + 1
-            elif raid_level == DeviceProvider.Redundancy.RAID5:
-                redundancy = reduce(
-                        lambda a, b: a.get_redundancy_raid5(b),
-                        redundancy_list)
-                redundancy.package_redundancy = \
-                    redundancy.package_redundancy + 1
-            elif raid_level == DeviceProvider.Redundancy.RAID6:
-                redundancy = reduce(
-                        lambda a, b: a.get_redundancy_raid6(b),
-                        redundancy_list)
-                redundancy.package_redundancy = \
-                    redundancy.package_redundancy + 2
+                # all members contain the same data
+                no_single_point_of_failure = True
+                data_redundancy = sum(data)
+                package_redundancy = sum(package) + count - 1
+                stripe_length = min(stripes)
+            elif raid_level in (DeviceProvider.Redundancy.RAID4,
+                    DeviceProvider.Redundancy.RAID5,
+                    DeviceProvider.Redundancy.RAID6):
+                no_single_point_of_failure = True
+                data_redundancy = min(data)
+                stripe_length = sum(stripes)
+                if raid_level == DeviceProvider.Redundancy.RAID4:
+                    package_redundancy = min(package) + 1
+                    parity_layout = DeviceProvider.Redundancy.PARITY_NON_ROTATED
+                elif raid_level == DeviceProvider.Redundancy.RAID5:
+                    package_redundancy = min(package) + 1
+                    parity_layout = DeviceProvider.Redundancy.PARITY_ROTATED
+                else:
+                    package_redundancy = min(package) + 2
+                    parity_layout = DeviceProvider.Redundancy.PARITY_ROTATED
             elif raid_level == DeviceProvider.Redundancy.RAID10:
-                redundancy = reduce(
-                        lambda a, b: a.get_redundancy_raid10(b),
-                        redundancy_list)
-
-                # stripe-length needs to be calculated separately
+                no_single_point_of_failure = True
+                # data redundancy is always 2 (at least for now),
+                # i.e. sum of two lowest data redundancies
+                data_redundancy = sum(sorted(data)[:2])
+                package_redundancy = min(package) + 1
                 # nr. of stripes for N=2: 1, N=3: 2, N=4: 2, N=5: 3, ...
-                stripes = len(redundancy_list) // 2 + len(redundancy_list) % 2
-                stripe_lengths = [x.stripe_length for x in redundancy_list]
-                stripe_lengths.sort()
                 # final stripe_length = sum of the 'stripes' lowest stripe
                 # lengths
-                stripe_lengths = stripe_lengths[:stripes]
-                redundancy.stripe_length = reduce(
-                        lambda a, b: a + b,
-                        stripe_lengths)
-
-                # data redundancy needs to be calculated separately
-                # it's always 2 (at least for now),
-                # i.e. sum of two lowest data redundancies
-                data_redundancies = [x.data_redundancy for x in redundancy_list]
-                data_redundancies.sort()
-                redundancy.data_redundancy = (data_redundancies[0]
-                        + data_redundancies[1])
-
-                redundancy.package_redundancy = \
-                    redundancy.package_redundancy + 1
+                nr_stripes = count // 2 + count % 2
+                stripe_length = sum(sorted(stripes)[:nr_stripes])
             else:
                 cmpi_logging.logger.trace_warn(
                         "Unknown raid_level: " + str(raid_level))
                 return None
-            return redundancy
+
+            if count == 1:
+                # nothing to combine the device with
+                no_single_point_of_failure = \
+                        members[0].no_single_point_of_failure
+                parity_layout = members[0].parity_layout
+
+            return DeviceProvider.Redundancy(
+                    no_single_point_of_failure=no_single_point_of_failure,
+                    data_redundancy=data_redundancy,
+                    package_redundancy=package_redundancy,
+                    stripe_length=stripe_length,
+                    parity_layout=parity_layout)
 
     class Values(object):
         class OperationalStatus(object):
@@ -40,7 +40,7 @@ class ExtentProvider(DeviceProvider):
             Get Anaconda StorageDevice for given name, without any checks.
         """
         path = object_name['DeviceID']
-        device = self.storage.devicetree.getDeviceByPath(path)
+        device = self.storage.get_device_by_path(path)
         return device
 
     @cmpi_logging.trace_method
@@ -116,15 +116,16 @@ class ExtentProvider(DeviceProvider):
             
             The ConsumableBlocks should be reduced by partition table size.
         """
-        if device.partedDevice:
-            block_size = pywbem.Uint64(device.partedDevice.sectorSize)
-            total_blocks = device.partedDevice.length
-            consumable_blocks = device.partedDevice.length
-            if (device.format and isinstance(device.format,
-                    blivet.formats.disklabel.DiskLabel)):
+        size = self.storage.get_size(device)
+        if size:
+            (block_size, total_blocks) = size
+            block_size = pywbem.Uint64(block_size)
+            consumable_blocks = total_blocks
+            fmt = self.storage.get_format(device)
+            if fmt and isinstance(fmt, blivet.formats.disklabel.DiskLabel):
                 # reduce by partition table size
                 consumable_blocks -= storage.get_partition_table_size(
-                        device)
+                        device, fmt)
         else:
             block_size = None
             total_blocks = None
@@ -146,8 +147,8 @@ class ExtentProvider(DeviceProvider):
             It must return array of strings.
         """
         discriminator = []
-        if device.format and isinstance(device.format,
-                    blivet.formats.lvmpv.LVMPhysicalVolume):
+        fmt = self.storage.get_format(device)
+        if fmt and isinstance(fmt, blivet.formats.lvmpv.LVMPhysicalVolume):
             discriminator.append(self.Values.Discriminator.Pool_Component)
         return discriminator
 
@@ -156,7 +157,7 @@ class ExtentProvider(DeviceProvider):
     def get_instance(self, env, model, device=None):
         """
             Provider implementation of GetInstance intrinsic method.
-            It fills common StorageExtent properties.
+            The properties are filled by render_instance().
         """
         if not self.provides_name(model):
             raise pywbem.CIMError(pywbem.CIM_ERR_NOT_FOUND, "Wrong keys.")
@@ -165,55 +166,76 @@ class ExtentProvider(DeviceProvider):
         if not device:
             raise pywbem.CIMError(pywbem.CIM_ERR_NOT_FOUND,
                     "Cannot find the extent.")
+        return self.get_cached_instance(env, model, device)
 
+    @cmpi_logging.trace_method
+    def render_instance(self, env, model, device):
+        """
+            Fill common StorageExtent properties.
+            Subclasses can override this method to fill additional
+            properties.
+        """
         model['ElementName'] = self.get_element_name(device)
         model['NameNamespace'] = self.Values.NameNamespace.OS_Device_Namespace
         model['NameFormat'] = self.Values.NameFormat.OS_Device_Name
         model['Name'] = device.path
 
-        extent_status = self.get_extent_status(device)
-        model['ExtentStatus'] = pywbem.CIMProperty(
-                name='ExtentStatus',
-                value=extent_status,
-                type='uint16',
-                array_size=len(extent_status),
-                is_array=True)
-
-        operational_status = self.get_status(device)
-        model['OperationalStatus'] = pywbem.CIMProperty(
-                name='OperationalStatus',
-                value=operational_status,
-                type='uint16',
-                array_size=len(operational_status),
-                is_array=True)
-
-        (block_size, total_blocks, consumable_blocks) = self.get_size(device)
-        if block_size:
-            model['BlockSize'] = pywbem.Uint64(block_size)
-        if total_blocks:
-            model['NumberOfBlocks'] = pywbem.Uint64(total_blocks)
-        if consumable_blocks:
-            model['ConsumableBlocks'] = pywbem.Uint64(consumable_blocks)
-
-        redundancy = self.get_redundancy(device)
-        model['NoSinglePointOfFailure'] = redundancy.no_single_point_of_failure
-        model['DataRedundancy'] = pywbem.Uint16(redundancy.data_redundancy)
-        model['PackageRedundancy'] = pywbem.Uint16(
-                redundancy.package_redundancy)
-        model['ExtentStripeLength'] = pywbem.Uint64(redundancy.stripe_length)
-        model['IsComposite'] = (len(device.parents) > 1)
+        # Compute only properties requested by the client, some of them
+        # are expensive.
+        if self.is_requested(model, 'ExtentStatus'):
+            extent_status = self.get_extent_status(device)
+            model['ExtentStatus'] = pywbem.CIMProperty(
+                    name='ExtentStatus',
+                    value=extent_status,
+                    type='uint16',
+                    array_size=len(extent_status),
+                    is_array=True)
+
+        if self.is_requested(model, 'OperationalStatus'):
+            operational_status = self.get_status(device)
+            model['OperationalStatus'] = pywbem.CIMProperty(
+                    name='OperationalStatus',
+                    value=operational_status,
+                    type='uint16',
+                    array_size=len(operational_status),
+                    is_array=True)
+
+        if self.is_requested(model, 'BlockSize', 'NumberOfBlocks',
+                'ConsumableBlocks'):
+            (block_size, total_blocks, consumable_blocks) = \
+                    self.get_size(device)
+            if block_size:
+                model['BlockSize'] = pywbem.Uint64(block_size)
+            if total_blocks:
+                model['NumberOfBlocks'] = pywbem.Uint64(total_blocks)
+            if consumable_blocks:
+                model['ConsumableBlocks'] = pywbem.Uint64(consumable_blocks)
+
+        if self.is_requested(model, 'NoSinglePointOfFailure',
+                'DataRedundancy', 'PackageRedundancy', 'ExtentStripeLength'):
+            redundancy = self.get_redundancy(device)
+            model['NoSinglePointOfFailure'] = \
+                    redundancy.no_single_point_of_failure
+            model['DataRedundancy'] = pywbem.Uint16(redundancy.data_redundancy)
+            model['PackageRedundancy'] = pywbem.Uint16(
+                    redundancy.package_redundancy)
+            model['ExtentStripeLength'] = pywbem.Uint64(
+                    redundancy.stripe_length)
+        model['IsComposite'] = (len(self.storage.get_parents(device)) > 1)
 
         # TODO: add DeltaReservation (mandatory in SMI-S)
 
-        model['Primordial'] = self.get_primordial(device)
-
-        discriminator = self.get_discriminator(device)
-        model['ExtentDiscriminator'] = pywbem.CIMProperty(
-                name='ExtentDiscriminator',
-                value=discriminator,
-                type='string',
-                array_size=len(discriminator),
-                is_array=True)
+        if self.is_requested(model, 'Primordial'):
+            model['Primordial'] = self.get_primordial(device)
+
+        if self.is_requested(model, 'ExtentDiscriminator'):
+            discriminator = self.get_discriminator(device)
+            model['ExtentDiscriminator'] = pywbem.CIMProperty(
+                    name='ExtentDiscriminator',
+                    value=discriminator,
+                    type='string',
+                    array_size=len(discriminator),
+                    is_array=True)
 
         return model
 
@@ -95,15 +95,15 @@ class FormatProvider(BaseProvider):
 
         if name.startswith("DEVICE="):
             (_unused, devname) = name.split("=")
-            device = self.storage.devicetree.getDeviceByPath(devname)
+            device = self.storage.get_device_by_path(devname)
         elif name.startswith("UUID="):
             (_unused, uuid) = name.split("=")
-            device = self.storage.devicetree.getDeviceByUuid(uuid)
+            device = self.storage.get_device_by_uuid(uuid)
         else:
             return None
         if not device:
             return None
-        return device.format
+        return self.storage.get_format(device)
 
     @cmpi_logging.trace_method
     def get_name_for_format(self, device, fmt):
@@ -126,15 +126,30 @@ class FormatProvider(BaseProvider):
         model.path.update({'CSName': None, 'CreationClassName': None,
             'CSCreationClassName': None, 'Name': None})
 
-        for device in self.storage.devices:
-            fmt = device.format
+        for (device, fmt) in self.enumerate_formats():
+            name = self.get_name_for_format(device, fmt)
+            model.update(name)
+            if keys_only:
+                yield model
+            else:
+                yield self.get_instance(env, model, fmt)
+
+    @cmpi_logging.trace_method
+    def enumerate_formats(self):
+        """
+            Return iterable with (device, fmt) tuples of all formats, that
+            this provider provides.
+        """
+        snapshot = self.storage.snapshot
+        if self in self.provider_manager.format_providers:
+            return self.provider_manager.get_formats(snapshot, self)
+        # not registered in ProviderManager, scan all devices
+        formats = []
+        for device in snapshot.devices:
+            fmt = snapshot.formats[device]
             if fmt and self.provides_format(device, fmt):
-                name = self.get_name_for_format(device, fmt)
-                model.update(name)
-                if keys_only:
-                    yield model
-                else:
-                    yield self.get_instance(env, model, fmt)
+                formats.append((device, fmt))
+        return formats
 
     @cmpi_logging.trace_method
     def get_format_for_name(self, instance_name):
@@ -207,21 +222,19 @@ class LMI_ResidesOnExtent(BaseProvider):
         """
         model.path.update({'Dependent': None, 'Antecedent': None})
 
-        for device in self.storage.devices:
-            fmt = device.format
-            if not fmt or not fmt.type:
-                continue
-            provider = self.provider_manager.get_provider_for_format(
-                    device, fmt)
-            if not provider:
-                continue
-            fmtname = provider.get_name_for_format(device, fmt)
-            devname = self.provider_manager.get_name_for_device(device)
-            if not devname:
-                continue
-            model['Dependent'] = fmtname
-            model['Antecedent'] = devname
-            yield model
+        snapshot = self.storage.snapshot
+        for provider in self.provider_manager.format_providers:
+            for (device, fmt) in self.provider_manager.get_formats(
+                    snapshot, provider):
+                if not fmt.type:
+                    continue
+                fmtname = provider.get_name_for_format(device, fmt)
+                devname = self.provider_manager.get_name_for_device(device)
+                if not devname:
+                    continue
+                model['Dependent'] = fmtname
+                model['Antecedent'] = devname
+                yield model
 
     @cmpi_logging.trace_method
     def get_instance(self, env, model):
@@ -235,7 +248,7 @@ class LMI_ResidesOnExtent(BaseProvider):
             raise pywbem.CIMError(pywbem.CIM_ERR_NOT_FOUND,
                     "Cannot find Antecedent device.")
 
-        fmt = device.format
+        fmt = self.storage.get_format(device)
         if not fmt:
             raise pywbem.CIMError(pywbem.CIM_ERR_NOT_FOUND,
                     "The Antecedent device has no format.")
@@ -25,7 +25,10 @@ import pywbem
 import openlmi.common.cmpi_logging as cmpi_logging
 import socket
 import threading
-from Queue import Queue
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from pywbem.cim_provider2 import CIMProvider2
 
 class IndicationManager(object):
     """
@@ -35,7 +38,7 @@ class IndicationManager(object):
     
     Usage:
 
-    1. Subclass CIM_InstCreation and CIM_InstModification.
+    1. Subclass CIM_InstCreation, CIM_InstModification and CIM_InstDeletion.
     
     2. In your initialization routine, create one ``IndicationManager``
     instance. E.g. one for whole ``LMI_Storage`` may be is enough.
@@ -73,6 +76,9 @@ class IndicationManager(object):
         def disable_indications(env):
             indication_manager.disable_indications(env)
                     
+    5. Optionally, call ``indication_manager.set_coalescing()`` for filters,
+    which may generate too many indications, e.g. progress of a job.
+
     From now on, the ``IndicationManager`` will track all subscribed filters.
     You can query the ``indication_manager.is_subscribed()`` before you create
     and send an indication. Use ``indication_manager.send_indication()`` to send
@@ -99,11 +105,29 @@ class IndicationManager(object):
       
     As side-effect, indication can be sent from any thread, there is no need
     to call ``PrepareAttachThread``/``AttachThread``.
+
+    The queue of indications waiting for delivery can be limited. When it is
+    full, new indication is handled according to overflow policy:
+
+    * ``OVERFLOW_BLOCK``: the sender waits until there is space in the
+      queue.
+    * ``OVERFLOW_DROP_OLDEST``: the oldest indication in the queue is
+      dropped.
+    * ``OVERFLOW_COALESCE``: ``InstModification`` indication is merged with
+      the last queued indication for the same source instance, if it has the
+      same filter. Otherwise the oldest indication is dropped.
     """
     SEVERITY_INFO = pywbem.Uint16(2)  # CIM_Indication.PerceivedSeverity
 
+    OVERFLOW_BLOCK = "block"
+    OVERFLOW_DROP_OLDEST = "drop_oldest"
+    OVERFLOW_COALESCE = "coalesce"
+    OVERFLOW_POLICIES = [OVERFLOW_BLOCK, OVERFLOW_DROP_OLDEST,
+            OVERFLOW_COALESCE]
+
     @cmpi_logging.trace_method
-    def __init__(self, env, nameprefix, namespace):
+    def __init__(self, env, nameprefix, namespace, queue_size=0,
+            overflow_policy=OVERFLOW_BLOCK):
         """
         Create new ``IndicationManager``. Usually only one instance
         is necessary for one provider process.
@@ -115,19 +139,75 @@ class IndicationManager(object):
             ``LMI_StorageInstCreation``.
         :param namespace: (``string``) Namespace, which will be set to outgoing
             indications instances.
+        :param queue_size: (``int``) Maximum number of indications waiting
+            for delivery. Zero means no limit.
+        :param overflow_policy: (``string``) What to do with new indication
+            when the queue is full, one of ``OVERFLOW_*`` values.
         """
 
         self.filters = {}
+        # Query -> filter_id
+        self.filter_queries = {}
+        # filter_id -> IndicationFilterName
+        self.filter_names = {}
         self.enabled = False
         self.subscribed_filters = set()
+        # callbacks called when set of subscribed filters changes
+        self.subscription_listeners = []
         self.nameprefix = nameprefix
         self.instcreation_classname = "LMI_" + nameprefix + "InstCreation"
         self.instmodification_classname = ("LMI_" + nameprefix
                 + "InstModification")
         self.instdeletion_classname = "LMI_" + nameprefix + "InstDeletion"
+        self.statistics_classname = ("LMI_" + nameprefix
+                + "IndicationQueueStatistics")
         self.namespace = namespace
+        self.hostname = socket.gethostname()
+
+        # classname -> CIMInstance with properties common to all indications
+        # of the class
+        self.templates = {}
+        for classname in (self.instcreation_classname,
+                self.instmodification_classname,
+                self.instdeletion_classname):
+            self.templates[classname] = self._create_template(classname)
+
+        # filter_id -> coalescing window in seconds
+        self.coalesced_filters = {}
+        # InstModification indications waiting for end of their coalescing
+        # window, (filter_id, SourceInstanceModelPath) -> [deadline,
+        # indication]
+        self.coalesced = {}
+        self.coalescing_lock = threading.Lock()
+
+        if overflow_policy not in self.OVERFLOW_POLICIES:
+            cmpi_logging.logger.error("Unknown indication overflow policy %s,"
+                    " using %s" % (overflow_policy, self.OVERFLOW_COALESCE))
+            overflow_policy = self.OVERFLOW_COALESCE
+        self.queue_size = queue_size
+        self.overflow_policy = overflow_policy
+        # Indications waiting for delivery, [time of enqueue, indication].
+        self.queue = deque()
+        # SourceInstanceModelPath -> the last queued entry with this path.
+        self.queue_last = {}
+        # Condition to guard the queue and statistics and to wake up sender
+        # thread.
+        self.queue_condition = threading.Condition()
+
+        # Statistics.
+        # Time when the statistics were started.
+        self.statistics_start = datetime.utcnow()
+        # Nr. of delivered indications.
+        self.delivered = 0
+        # Nr. of indications dropped because of full queue.
+        self.dropped = 0
+        # Nr. of indications merged to queued ones because of full queue.
+        self.merged = 0
+        # Total and maximum time between enqueuing and delivery of
+        # an indication (in seconds).
+        self.total_latency = 0.0
+        self.max_latency = 0.0
 
-        self.queue = Queue()
         # prepare indication thread
         ch = env.get_cimom_handle()
         new_broker = ch.PrepareAttachThread()
@@ -135,6 +215,20 @@ class IndicationManager(object):
                 target=self._send_indications_loop, args=(new_broker,))
         self.indication_sender.start()
 
+    @cmpi_logging.trace_method
+    def _create_template(self, classname):
+        """
+        Create instance of given indication class with all properties, which
+        do not depend on the source instance.
+        """
+        path = pywbem.CIMInstanceName(
+                classname=classname,
+                namespace=self.namespace)
+        ind = pywbem.CIMInstance(classname, path=path)
+        ind['SourceInstanceHost'] = self.hostname
+        ind['PerceivedSeverity'] = self.SEVERITY_INFO
+        return ind
+
     @cmpi_logging.trace_method
     def add_filters(self, filters):
         """
@@ -148,6 +242,48 @@ class IndicationManager(object):
             as 'LMI:CIM_IndicationFilter:<filter_id>'.
         """
         self.filters.update(filters)
+        for (filter_id, fltr) in filters.iteritems():
+            self.filter_queries[fltr['Query']] = filter_id
+            self.filter_names[filter_id] = \
+                    "LMI:CIM_IndicationFilter:" + filter_id
+
+    @cmpi_logging.trace_method
+    def add_subscription_listener(self, callback):
+        """
+        Add a callback, which is called without parameters when
+        ``is_subscribed()`` may return different value for any filter,
+        i.e. when a filter is activated or deactivated or indications are
+        enabled or disabled.
+        """
+        self.subscription_listeners.append(callback)
+
+    def _subscriptions_changed(self):
+        """ Call all subscription listeners. """
+        for callback in self.subscription_listeners:
+            callback()
+
+    @cmpi_logging.trace_method
+    def set_coalescing(self, filter_id, window):
+        """
+        Coalesce ``InstModification`` indications for given filter.
+        The first indication for a source instance is delayed by given
+        window. Subsequent indications for the same source instance and
+        filter in this window are merged into it, the resulting
+        indication has the first ``PreviousInstance`` and the latest
+        ``SourceInstance``.
+
+        Indications for other filters are not delayed. Any pending
+        coalesced indication for the same source instance is sent before
+        them.
+
+        :param filter_id: (``string``) ID of the filter.
+        :param window: (``float``) The window in seconds. Zero disables the
+            coalescing.
+        """
+        if window > 0:
+            self.coalesced_filters[filter_id] = window
+        elif filter_id in self.coalesced_filters:
+            del self.coalesced_filters[filter_id]
 
     @cmpi_logging.trace_method
     def authorize_filter(self, _env, fltr, _ns, _classes, _owner):
@@ -155,11 +291,11 @@ class IndicationManager(object):
         AuthorizeFilter callback from CIMOM. Call this method from appropriate
         CIMOM callback.
         """
-        for (_id, _fltr) in self.filters.iteritems():
-            if _fltr['Query'] == fltr:
-                cmpi_logging.logger.info("InstanceFilter %s: %s authorized"
-                        % (_id, fltr))
-                return True
+        _id = self.filter_queries.get(fltr, None)
+        if _id is not None:
+            cmpi_logging.logger.info("InstanceFilter %s: %s authorized"
+                    % (_id, fltr))
+            return True
         cmpi_logging.logger.info("InstanceFilter %s denied" % (fltr,))
         return False
 
@@ -170,11 +306,12 @@ class IndicationManager(object):
         CIMOM callback.
         """
         if first_activation:
-            for (_id, _fltr) in self.filters.iteritems():
-                if _fltr['Query'] == fltr:
-                    self.subscribed_filters.add(_id)
-                    cmpi_logging.logger.info("InstanceFilter %s: %s "
-                            "started" % (id, fltr))
+            _id = self.filter_queries.get(fltr, None)
+            if _id is not None:
+                self.subscribed_filters.add(_id)
+                cmpi_logging.logger.info("InstanceFilter %s: %s "
+                        "started" % (_id, fltr))
+                self._subscriptions_changed()
 
     @cmpi_logging.trace_method
     def deactivate_filter(self, _env, fltr, _ns, _classes, last_activation):
@@ -183,11 +320,12 @@ class IndicationManager(object):
         CIMOM callback.
         """
         if last_activation:
-            for (_id, _fltr) in self.filters.iteritems():
-                if _fltr['Query'] == fltr:
-                    self.subscribed_filters.remove(_id)
-                    cmpi_logging.logger.info("InstanceFilter %s: %s "
-                            "stopped" % (_id, fltr))
+            _id = self.filter_queries.get(fltr, None)
+            if _id is not None:
+                self.subscribed_filters.discard(_id)
+                cmpi_logging.logger.info("InstanceFilter %s: %s "
+                        "stopped" % (_id, fltr))
+                self._subscriptions_changed()
 
     @cmpi_logging.trace_method
     def enable_indications(self, _env):
@@ -197,6 +335,7 @@ class IndicationManager(object):
         """
         self.enabled = True
         cmpi_logging.logger.info("Indications enabled")
+        self._subscriptions_changed()
 
     @cmpi_logging.trace_method
     def disable_indications(self, _env):
@@ -206,14 +345,109 @@ class IndicationManager(object):
         """
         self.enabled = False
         cmpi_logging.logger.info("Indications disabled")
+        self._subscriptions_changed()
 
     @cmpi_logging.trace_method
-    def send_indication(self, indication):
+    def send_indication(self, indication, block=True):
         """
         Send indication to all subscribers. Call this method from appropriate
         CIMOM callback.
+
+        :param indication: (``CIMInstance``) The indication to send.
+        :param block: (``bool``) False, if the indication must be enqueued
+            even when the queue is full and overflow policy is
+            ``OVERFLOW_BLOCK``.
+        """
+        entry = [time.time(), indication]
+        path = indication.get('SourceInstanceModelPath', None)
+        self.queue_condition.acquire()
+        try:
+            if self.queue_size and len(self.queue) >= self.queue_size:
+                if self.overflow_policy == self.OVERFLOW_BLOCK:
+                    while block and len(self.queue) >= self.queue_size:
+                        self.queue_condition.wait()
+                elif (self.overflow_policy == self.OVERFLOW_COALESCE
+                        and self._merge_queued(path, indication)):
+                    return
+                else:
+                    self._drop_oldest()
+            self.queue.append(entry)
+            if path:
+                self.queue_last[path] = entry
+            self.queue_condition.notify_all()
+        finally:
+            self.queue_condition.release()
+
+    def _merge_queued(self, path, indication):
+        """
+        Merge given InstModification indication into the last queued
+        indication for the same source instance, if it has the same filter.
+        Return True if the indication was merged.
+        The caller must hold queue_condition lock.
+        """
+        if not path or indication.get('PreviousInstance', None) is None:
+            return False
+        last = self.queue_last.get(path, None)
+        if not last:
+            return False
+        queued = last[1]
+        if (queued.get('PreviousInstance', None) is None
+                or queued['IndicationFilterName']
+                    != indication['IndicationFilterName']):
+            return False
+        queued['SourceInstance'] = indication['SourceInstance']
+        self.merged += 1
+        return True
+
+    def _drop_oldest(self):
         """
-        self.queue.put(indication)
+        Drop the oldest indication from the queue.
+        The caller must hold queue_condition lock.
+        """
+        entry = self.queue.popleft()
+        self._forget_entry(entry)
+        self.dropped += 1
+        cmpi_logging.logger.warn("Indication queue is full, dropping %s"
+                % (entry[1].get('IndicationFilterName', None),))
+
+    def _forget_entry(self, entry):
+        """
+        Remove the entry, which was removed from the queue, from queue_last.
+        The caller must hold queue_condition lock.
+        """
+        path = entry[1].get('SourceInstanceModelPath', None)
+        if path and self.queue_last.get(path, None) is entry:
+            del self.queue_last[path]
+
+    @cmpi_logging.trace_method
+    def get_statistics(self):
+        """
+        Return statistics of the indication queue.
+
+        :rtype: dictionary with keys 'queued', 'delivered', 'dropped',
+            'merged', 'average_latency' and 'max_latency'. Latencies are in
+            seconds.
+
+        The statistics are available as instance of
+        ``LMI_<nameprefix>IndicationQueueStatistics``, see
+        ``LMI_IndicationQueueStatistics``.
+        """
+        self.queue_condition.acquire()
+        try:
+            if self.delivered:
+                average = self.total_latency / self.delivered
+            else:
+                average = 0.0
+            return {
+                    'queued': len(self.queue),
+                    'delivered': self.delivered,
+                    'dropped': self.dropped,
+                    'merged': self.merged,
+                    'average_latency': average,
+                    'max_latency': self.max_latency,
+            }
+        finally:
+            self.queue_condition.release()
 
     @cmpi_logging.trace_method
     def send_instcreation(self, instance, filter_id):
@@ -226,24 +460,20 @@ class IndicationManager(object):
         """
         if not self.is_subscribed(filter_id):
             return
-        path = pywbem.CIMInstanceName(
-                classname=self.instcreation_classname,
-                namespace=self.namespace)
-        ind = pywbem.CIMInstance(
-                self.instcreation_classname,
-                path=path)
+        path = str(instance.path)
+        self._flush_coalesced(path)
+        ind = self.templates[self.instcreation_classname].copy()
         ind['SourceInstance'] = instance
-        ind['SourceInstanceHost'] = socket.gethostname()
-        ind['SourceInstanceModelPath'] = str(instance.path)
-        ind['IndicationFilterName'] = "LMI:CIM_IndicationFilter:" + filter_id
-        ind['PerceivedSeverity'] = self.SEVERITY_INFO
+        ind['SourceInstanceModelPath'] = path
+        ind['IndicationFilterName'] = self.filter_names[filter_id]
 
         cmpi_logging.logger.info("Sending indication %s for %s" %
-                (filter_id, str(path)))
+                (filter_id, path))
         self.send_indication(ind)
 
     @cmpi_logging.trace_method
-    def send_instmodification(self, old_instance, new_instance, filter_id):
+    def send_instmodification(self, old_instance, new_instance, filter_id,
+            coalesce=True):
         """
         Send ``LMI_<nameprefix>InstModification`` indication with given
         instance.
@@ -252,26 +482,104 @@ class IndicationManager(object):
         :param new_instance: (``CIMInstance``) The instance after modification.
         :param filter_id: (``string``) The ID of registered filter which
             corresponds to this indication.
+        :param coalesce: (``bool``) If False, the indication is sent
+            immediately even if coalescing is set for the filter. Use it for
+            the last modification of an instance.
         """
         if not self.is_subscribed(filter_id):
             return
-        path = pywbem.CIMInstanceName(
-                classname=self.instmodification_classname,
-                namespace=self.namespace)
-        ind = pywbem.CIMInstance(
-                self.instcreation_classname,
-                path=path)
+        path = str(new_instance.path)
+        ind = self.templates[self.instmodification_classname].copy()
         ind['SourceInstance'] = new_instance
         ind['PreviousInstance'] = old_instance
-        ind['SourceInstanceHost'] = socket.gethostname()
-        ind['SourceInstanceModelPath'] = str(new_instance.path)
-        ind['IndicationFilterName'] = "LMI:CIM_IndicationFiler:" + filter_id
-        ind['PerceivedSeverity'] = self.SEVERITY_INFO
+        ind['SourceInstanceModelPath'] = path
+        ind['IndicationFilterName'] = self.filter_names[filter_id]
+
+        window = self.coalesced_filters.get(filter_id, 0)
+        if window and coalesce:
+            self._coalesce(filter_id, ind, window)
+            return
+
+        self._flush_coalesced(path)
+        cmpi_logging.logger.info("Sending indication %s for %s" %
+                (filter_id, path))
+        self.send_indication(ind)
+
+    @cmpi_logging.trace_method
+    def send_instdeletion(self, instance, filter_id):
+        """
+        Send ``LMI_<nameprefix>InstDeletion`` indication with given instance.
+
+        :param instance: (``CIMInstance``) The deleted instance.
+        :param filter_id: (``string``) The ID of registered filter which
+            corresponds to this indication.
+        """
+        if not self.is_subscribed(filter_id):
+            return
+        path = str(instance.path)
+        self._flush_coalesced(path)
+        ind = self.templates[self.instdeletion_classname].copy()
+        ind['SourceInstance'] = instance
+        ind['SourceInstanceModelPath'] = path
+        ind['IndicationFilterName'] = self.filter_names[filter_id]
 
         cmpi_logging.logger.info("Sending indication %s for %s" %
-                (filter_id, str(path)))
+                (filter_id, path))
         self.send_indication(ind)
 
+    @cmpi_logging.trace_method
+    def _coalesce(self, filter_id, indication, window):
+        """
+        Merge given InstModification indication with pending one for the
+        same filter and source instance or delay it by given window.
+        """
+        key = (filter_id, indication['SourceInstanceModelPath'])
+        self.coalescing_lock.acquire()
+        try:
+            pending = self.coalesced.get(key, None)
+            if pending:
+                # keep the first PreviousInstance
+                pending[1]['SourceInstance'] = indication['SourceInstance']
+                return
+            self.coalesced[key] = [time.time() + window, indication]
+        finally:
+            self.coalescing_lock.release()
+        # wake up the sender thread to watch the new deadline
+        self.queue_condition.acquire()
+        try:
+            self.queue_condition.notify_all()
+        finally:
+            self.queue_condition.release()
+
+    @cmpi_logging.trace_method
+    def _flush_coalesced(self, path=None, block=True):
+        """
+        Send pending coalesced indications, whose window has expired or
+        whose SourceInstanceModelPath is given path.
+        Return the nearest deadline of remaining pending indications or None,
+        if there is no pending indication.
+        """
+        now = time.time()
+        ready = []
+        next_deadline = None
+        self.coalescing_lock.acquire()
+        try:
+            for (key, (deadline, indication)) in self.coalesced.items():
+                if deadline <= now or key[1] == path:
+                    ready.append((deadline, indication))
+                    del self.coalesced[key]
+                elif next_deadline is None or deadline < next_deadline:
+                    next_deadline = deadline
+        finally:
+            self.coalescing_lock.release()
+
+        ready.sort()
+        for (_deadline, indication) in ready:
+            cmpi_logging.logger.info("Sending coalesced indication %s" %
+                    (indication['IndicationFilterName'],))
+            self.send_indication(indication, block)
+        return next_deadline
+
     @cmpi_logging.trace_method
     def is_subscribed(self, fltr_id):
         """
@@ -285,6 +593,32 @@ class IndicationManager(object):
             return True
         return False
 
+    @cmpi_logging.trace_method
+    def _get_indication(self, deadline):
+        """
+        Wait for an indication in the queue until given deadline and return
+        its queue entry. Return None, if the deadline passed.
+
+        :param deadline: (``float``) Time as returned by ``time.time()`` or
+            None to wait without a deadline.
+        """
+        self.queue_condition.acquire()
+        try:
+            if not self.queue:
+                if deadline is None:
+                    self.queue_condition.wait()
+                else:
+                    self.queue_condition.wait(max(deadline - time.time(), 0))
+            if not self.queue:
+                return None
+            entry = self.queue.popleft()
+            self._forget_entry(entry)
+            # wake up blocked senders
+            self.queue_condition.notify_all()
+            return entry
+        finally:
+            self.queue_condition.release()
+
     @cmpi_logging.trace_method
     def _send_indications_loop(self, broker):
         """
@@ -295,8 +629,74 @@ class IndicationManager(object):
         """
         broker.AttachThread()
         while True:
-            indication = self.queue.get()
+            # this thread must not block on full queue, it empties it
+            next_deadline = self._flush_coalesced(block=False)
+            entry = self._get_indication(next_deadline)
+            if entry is None:
+                # some coalesced indication is ready or new one was added
+                continue
+            (enqueued, indication) = entry
             cmpi_logging.logger.trace_info("Delivering indication %s" %
                 (str(indication.path)))
             broker.DeliverIndication(self.namespace, indication)
-            self.queue.task_done()
+
+            latency = time.time() - enqueued
+            self.queue_condition.acquire()
+            try:
+                self.delivered += 1
+                self.total_latency += latency
+                self.max_latency = max(self.max_latency, latency)
+            finally:
+                self.queue_condition.release()
+
+
+class LMI_IndicationQueueStatistics(CIMProvider2):
+    """
+        Instrumentation of LMI_<nameprefix>IndicationQueueStatistics class.
+        There is only one instance, which describes the queue of
+        ``IndicationManager``.
+    """
+
+    @cmpi_logging.trace_method
+    def __init__(self, classname, indication_manager):
+        self.classname = classname
+        self.indication_manager = indication_manager
+
+    @cmpi_logging.trace_method
+    def get_instance_id(self):
+        """ Return InstanceID of the only instance."""
+        return 'LMI:' + self.classname
+
+    @cmpi_logging.trace_method
+    def enum_instances(self, env, model, keys_only):
+        """Enumerate instances."""
+        model.path.update({'InstanceID': None})
+        model['InstanceID'] = self.get_instance_id()
+        if keys_only:
+            yield model
+        else:
+            yield self.get_instance(env, model)
+
+    @cmpi_logging.trace_method
+    def get_instance(self, env, model):
+        """Return an instance."""
+        if model['InstanceID'] != self.get_instance_id():
+            raise pywbem.CIMError(pywbem.CIM_ERR_NOT_FOUND,
+                    "Statistics not found.")
+
+        manager = self.indication_manager
+        stats = manager.get_statistics()
+        model['ElementName'] = manager.nameprefix + ' indication queue'
+        model['StartStatisticTime'] = pywbem.CIMDateTime(
+                manager.statistics_start)
+        model['StatisticTime'] = pywbem.CIMDateTime(datetime.utcnow())
+        model['QueuedIndications'] = pywbem.Uint32(stats['queued'])
+        model['MaxQueuedIndications'] = pywbem.Uint32(manager.queue_size)
+        model['DeliveredIndications'] = pywbem.Uint64(stats['delivered'])
+        model['DroppedIndications'] = pywbem.Uint64(stats['dropped'])
+        model['MergedIndications'] = pywbem.Uint64(stats['merged'])
+        model['AverageLatency'] = pywbem.CIMDateTime(
+                timedelta(seconds=stats['average_latency']))
+        model['MaxLatency'] = pywbem.CIMDateTime(
+                timedelta(seconds=stats['max_latency']))
+        return model
@@ -0,0 +1,195 @@
+# Copyright (C) 2013 Red Hat, Inc.  All rights reserved.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#
+# Authors: Jan Safranek <jsafrane@redhat.com>
+# -*- coding: utf-8 -*-
+"""
+    .. autoclass:: InstanceCache
+        :members:
+
+    .. autoclass:: LMI_InstanceCacheStatistics
+        :members:
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import datetime
+import pywbem
+from pywbem.cim_provider2 import CIMProvider2
+import openlmi.common.cmpi_logging as cmpi_logging
+
+class InstanceCache(object):
+    """
+    Cache of rendered properties of CIM instances.
+
+    Each entry is tagged with generation of the device tree, i.e.
+    ``StorageSnapshot.generation``. An entry of older generation is never
+    returned and all entries are discarded as soon as newer generation is
+    seen, so the cache holds only instances of the current device tree.
+
+    The cache can be limited in size, the least recently used entries are
+    then discarded.
+    """
+    def __init__(self, max_size=0):
+        """
+        :param max_size: (``int``) Maximum number of entries. Zero means no
+            limit.
+        """
+        self.max_size = max_size
+        self.generation = None
+        # key -> value, the least recently used first
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Time when the statistics were started.
+        self.statistics_start = datetime.utcnow()
+        self.hits = 0
+        self.misses = 0
+
+    def _set_generation(self, generation):
+        """
+        Discard all entries, if given generation is newer than the cached
+        one. Return False, if given generation is older than the cached
+        one. The caller must hold the lock.
+        """
+        if generation < self.generation:
+            return False
+        if generation > self.generation:
+            self._entries.clear()
+            self.generation = generation
+        return True
+
+    def get(self, key, generation):
+        """
+        Return cached value for given key and generation or None, if it is
+        not cached.
+        """
+        self._lock.acquire()
+        try:
+            if self._set_generation(generation):
+                value = self._entries.pop(key, None)
+                if value is not None:
+                    # move to the end
+                    self._entries[key] = value
+                    self.hits += 1
+                    return value
+            self.misses += 1
+            return None
+        finally:
+            self._lock.release()
+
+    def put(self, key, generation, value):
+        """
+        Store value for given key and generation.
+        """
+        self._lock.acquire()
+        try:
+            if not self._set_generation(generation):
+                return
+            self._entries.pop(key, None)
+            self._entries[key] = value
+            if self.max_size:
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        finally:
+            self._lock.release()
+
+    def clear(self):
+        """ Discard all entries. """
+        self._lock.acquire()
+        try:
+            self._entries.clear()
+        finally:
+            self._lock.release()
+
+    def get_statistics(self):
+        """
+        Return dictionary with cache statistics: 'hits', 'misses' and
+        'size'.
+
+        The statistics are available as instances of
+        ``LMI_StorageInstanceCacheStatistics``, see
+        ``LMI_InstanceCacheStatistics``.
+        """
+        self._lock.acquire()
+        try:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+            }
+        finally:
+            self._lock.release()
+
+
+class LMI_InstanceCacheStatistics(CIMProvider2):
+    """
+        Instrumentation of LMI_StorageInstanceCacheStatistics class.
+        There is one instance for each device provider with
+        ``InstanceCache``.
+    """
+
+    @cmpi_logging.trace_method
+    def __init__(self, classname, provider_manager):
+        self.classname = classname
+        self.provider_manager = provider_manager
+
+    @cmpi_logging.trace_method
+    def get_instance_id(self, provider):
+        """ Return InstanceID of statistics of given device provider. """
+        return 'LMI:' + self.classname + ':' + provider.classname
+
+    @cmpi_logging.trace_method
+    def get_caching_providers(self):
+        """ Return list of device providers, which have InstanceCache. """
+        return [provider for provider in self.provider_manager.device_providers
+                if getattr(provider, 'instance_cache', None) is not None]
+
+    @cmpi_logging.trace_method
+    def enum_instances(self, env, model, keys_only):
+        """Enumerate instances."""
+        model.path.update({'InstanceID': None})
+        for provider in self.get_caching_providers():
+            model['InstanceID'] = self.get_instance_id(provider)
+            if keys_only:
+                yield model
+            else:
+                yield self.get_instance(env, model, provider)
+
+    # pylint: disable-msg=W0221
+    @cmpi_logging.trace_method
+    def get_instance(self, env, model, provider=None):
+        """Return an instance."""
+        if not provider:
+            for candidate in self.get_caching_providers():
+                if self.get_instance_id(candidate) == model['InstanceID']:
+                    provider = candidate
+                    break
+            else:
+                raise pywbem.CIMError(pywbem.CIM_ERR_NOT_FOUND,
+                        "Statistics not found.")
+
+        cache = provider.instance_cache
+        stats = cache.get_statistics()
+        model['ElementName'] = provider.classname + ' instance cache'
+        model['CachedClassName'] = provider.classname
+        model['StartStatisticTime'] = pywbem.CIMDateTime(
+                cache.statistics_start)
+        model['StatisticTime'] = pywbem.CIMDateTime(datetime.utcnow())
+        model['Hits'] = pywbem.Uint64(stats['hits'])
+        model['Misses'] = pywbem.Uint64(stats['misses'])
+        model['CachedInstances'] = pywbem.Uint32(stats['size'])
+        model['MaxCachedInstances'] = pywbem.Uint32(cache.max_size)
+        return model
@@ -26,6 +26,9 @@
     .. autoclass:: Job
         :members:
 
+    .. autoclass:: FinishedJob
+        :members:
+
     .. autoclass:: LMI_ConcreteJob
         :members:
 
@@ -44,25 +47,22 @@
 
 from datetime import datetime, timedelta
 import threading
-from Queue import Queue
+import heapq
+import itertools
+import time
+from collections import OrderedDict
 import pywbem
 import openlmi.common.cmpi_logging as cmpi_logging
 from pywbem.cim_provider2 import CIMProvider2
 import socket
 
-# Too many instance attributes
-# pylint: disable-msg=R0902
-class Job(object):
+class BaseJob(object):
     """
-        Generic abstract class representing one CIM_ConcreteJob.
-        It remembers input and output arguments, affected ManagedElements and
-        owning ManagedElement (to be able to create associations to them)
-        and all CIM_ConcreteJob properties.
-        
-        Due to multiple threads processing the job, each job has its own 
-        lock to guard its status changes. It is expected that number of jobs
-        is quite low. 
+        Common part of ``Job`` and ``FinishedJob``. It provides CIM names and
+        CIM_InstMethodCall indications of a job and it manages its removal
+        after TimeBeforeRemoval.
     """
+    __slots__ = ()
 
     DEFAULT_TIME_BEFORE_REMOVAL = 60  # in seconds
 
@@ -75,9 +75,243 @@ class Job(object):
 
     FINAL_STATES = [STATE_FINISHED_OK, STATE_FAILED, STATE_SUSPENDED,
             STATE_TERMINATED]
+    # Final states, which cannot be changed anymore.
+    COMPLETED_STATES = [STATE_FINISHED_OK, STATE_FAILED, STATE_TERMINATED]
+
+    # Job priorities, the same meaning as CIM_Job.Priority, i.e. lower
+    # number means higher priority.
+    PRIORITY_HIGH = 1  # quick metadata operations
+    PRIORITY_NORMAL = 5
+    PRIORITY_LOW = 10  # slow bulk operations, e.g. formatting
 
     # There is no way how to suspend/terminate running job!
 
+    @cmpi_logging.trace_method
+    def _expire(self):
+        """
+        Callback when a Job completes and time_before_removal second passed.
+        The job gets removed from its JobManager.
+        """
+        cmpi_logging.logger.debug("Got timeout for job %s: '%s', removing"
+                " the job" % (self.the_id, self.job_name))
+        self.job_manager.remove_job(self)
+
+    @cmpi_logging.trace_method
+    def _restart_timer(self):
+        """
+        Re-schedule timer for TimeBeforeRemoval because some property has
+        changed.
+        """
+        if not self.job_state in self.FINAL_STATES:
+            # e.g. suspended job was started again
+            self.job_manager.cancel_expiry(self)
+            return
+
+        if self.delete_on_completion:
+            now = datetime.utcnow()
+            passed = now - self.finish_time
+            timeout = self.time_before_removal - passed.total_seconds()
+            cmpi_logging.logger.debug("Starting timer for job %s: '%s' for %f"
+                    " seconds" % (self.the_id, self.job_name, timeout))
+            self.job_manager.schedule_expiry(self, timeout)
+        else:
+            # Stop the old timer.
+            self.job_manager.cancel_expiry(self)
+
+    @cmpi_logging.trace_method
+    def lock(self):
+        """ 
+        Lock internal mutex. Other threads will block on subsequent lock().
+        The lock is recursive, i.e. can be called multiple times from
+        single thread.
+        """
+        self._lock.acquire()
+
+    @cmpi_logging.trace_method
+    def unlock(self):
+        """ Unlock internal mutex."""
+        self._lock.release()
+
+    @cmpi_logging.trace_method
+    def get_name(self):
+        """
+        Return CIMInstanceName of the job.
+        
+        :rtype: ``CIMInstanceName``
+        """
+        name = pywbem.CIMInstanceName(
+                classname=self.job_manager.job_classname,
+                namespace=self.job_manager.namespace,
+                keybindings={
+                        'InstanceID': self.get_instance_id()
+        })
+        return name
+
+    @cmpi_logging.trace_method
+    def get_instance_id(self, classname=None):
+        """
+        Return InstanceID.
+        
+        :param classname: (``string``) Optional classname to generate InstanceID
+            for different class, e.g. for LMI_<name>MethodResult.
+        :rtype: ``string``
+        """
+        if classname is None:
+            classname = self.job_manager.job_classname
+        return 'LMI:' + classname + ':' + str(self.the_id)
+
+    @staticmethod
+    def parse_instance_id(instance_id, job_manager, classname=None):
+        """
+        Return the last part of instance_id.
+        
+        :param instance_id: (``string``) InstanceID to parse.
+        :param job_manager: (``JobManager``) JobManager to query for Job's
+            classname.
+        :param classname: (``string``) Optional classname. If not given,
+            JobManager's job_classname will be used for parsing. Other
+            classnames may be used to parse e.g. LMI_<name>MethodResult
+            InstanceIDs.
+        
+        :rtype: ``string`` or None if the ``instance_id`` has wrong format.
+        """
+        if classname is None:
+            classname = job_manager.job_classname
+        parts = instance_id.split(":")
+        if len(parts) != 3:
+            return None
+        if parts[0] != 'LMI':
+            return None
+        if parts[1] != classname:
+            return None
+        if not parts[2].isdigit():
+            return None
+        return parts[2]
+
+    @cmpi_logging.trace_method
+    def get_pre_call(self):
+        """ 
+        Return indication that describes the pre-execution values of the
+        job's invocation.
+        
+        :rtype: ``CIMInstance of CIM_InstMethodCall``
+        """
+        path = pywbem.CIMInstanceName(
+                classname="CIM_InstMethodCall",
+                keybindings={},
+                host=socket.gethostname(),
+                namespace=self.job_manager.namespace)
+        inst = pywbem.CIMInstance(
+                classname="CIM_InstMethodCall",
+                path=path,
+                properties={
+                        'MethodName' : self.method_name,
+                        'MethodParameters' : pywbem.CIMProperty(
+                                name="MethodParameters",
+                                type='instance',
+                                value=self._get_method_params(False)),
+                        'PreCall' : True,
+                })
+        src_instance = self._get_cim_instance()
+        inst['SourceInstance'] = src_instance
+        inst['SourceInstanceModelPath'] = str(src_instance.path)
+        return inst
+
+    @cmpi_logging.trace_method
+    def get_post_call(self):
+        """ 
+        Return indication that describes the post-execution values of the
+        job's invocation.
+        
+        :rtype: ``CIMInstance of CIM_InstMethodCall``
+        """
+        path = pywbem.CIMInstanceName(
+                classname="CIM_InstMethodCall",
+                keybindings={},
+                host=socket.gethostname(),
+                namespace=self.job_manager.namespace)
+        inst = pywbem.CIMInstance(
+                classname="CIM_InstMethodCall",
+                path=path,
+                properties={
+                        'MethodName' : self.method_name,
+                        'MethodParameters' : self._get_method_params(True),
+                        'PreCall' : False
+        })
+        src_instance = self._get_cim_instance()
+        inst['SourceInstance'] = src_instance
+        inst['SourceInstanceModelPath'] = str(src_instance.path)
+
+        if self.return_value_type is not None:
+            inst['ReturnValueType'] = self.return_value_type
+        if self.return_value is not None:
+            inst['ReturnValue'] = self.return_value
+        if self.error is not None:
+            inst['Error'] = self.error
+        return inst
+
+    @cmpi_logging.trace_method
+    def _get_cim_instance(self):
+        """
+        Return CIMInstance of this job.
+        
+        :rtype: CIMInstance
+        """
+        return self.job_manager.get_job_instance(self)
+
+    @cmpi_logging.trace_method
+    def _get_method_params(self, output=True):
+        """
+        Assemble __MethodParameters for CIM_InstMethodCall indication.
+        
+        :rtype: CIMInstance of __MethodParameters.
+        """
+        path = pywbem.CIMInstanceName(
+                classname="__MethodParameters",
+                namespace=self.job_manager.namespace,
+                keybindings={})
+        inst = pywbem.CIMInstance(classname="__MethodParameters", path=path)
+        for (name, value) in self.input_arguments.iteritems():
+            inst[name] = value
+        if output and self.output_arguments:
+            # overwrite any input parameter
+            for (name, value) in self.output_arguments.iteritems():
+                inst[name] = value
+        return inst
+
+    # pylint: disable-msg=R0903
+    class ReturnValueType(object):
+        """ CIM_InstMethodCall.ReturnValueType values."""
+        Boolean = pywbem.Uint16(2)
+        String = pywbem.Uint16(3)
+        Char16 = pywbem.Uint16(4)
+        Uint8 = pywbem.Uint16(5)
+        Sint8 = pywbem.Uint16(6)
+        Uint16 = pywbem.Uint16(7)
+        Sint16 = pywbem.Uint16(8)
+        Uint32 = pywbem.Uint16(9)
+        Sint32 = pywbem.Uint16(10)
+        Uint64 = pywbem.Uint16(11)
+        Sint64 = pywbem.Uint16(12)
+        Datetime = pywbem.Uint16(13)
+        Real32 = pywbem.Uint16(14)
+        Real64 = pywbem.Uint16(15)
+        Reference = pywbem.Uint16(16)
+
+# Too many instance attributes
+# pylint: disable-msg=R0902
+class Job(BaseJob):
+    """
+        Generic abstract class representing one CIM_ConcreteJob.
+        It remembers input and output arguments, affected ManagedElements and
+        owning ManagedElement (to be able to create associations to them)
+        and all CIM_ConcreteJob properties.
+        
+        Due to multiple threads processing the job, each job has its own 
+        lock to guard its status changes. It is expected that number of jobs
+        is quite low. 
+    """
+
     @cmpi_logging.trace_method
     def __init__(self, job_manager, job_name, input_arguments,
             method_name, affected_elements, owning_element):
@@ -158,8 +392,20 @@ class Job(object):
         # instances.
         self.owning_element = owning_element
 
-        # Timer used to delete the job after time_before_removal seconds
-        self.timer = None
+        # Priority of the job, one of PRIORITY_* values. Lower number means
+        # higher priority.
+        self.priority = self.PRIORITY_NORMAL
+
+        # Set of hashable keys of resources (e.g. device names), which
+        # the job modifies. Jobs with overlapping resources are never
+        # executed in parallel. None means that the job can conflict with
+        # anything and must run alone.
+        self.resources = None
+
+        # Time (as returned by time.time()) when the job should be deleted,
+        # None if it is not scheduled for deletion. It is managed by
+        # JobManager.
+        self.expiry_time = None
 
         # CIMError with result code
         self.error = None
@@ -191,6 +437,35 @@ class Job(object):
         self._execargs = args
         self._execkwargs = kwargs
 
+    @cmpi_logging.trace_method
+    def set_resources(self, resources):
+        """
+        Set resources, which the job modifies. ``JobManager`` does not
+        execute jobs with overlapping resources in parallel, they are
+        executed in order in which they were enqueued.
+        It must be called before the job is enqueued.
+
+        :param resources: (``iterable of hashable objects``) Resources
+            of the job, e.g. names of affected devices. None means that the
+            job conflicts with all other jobs.
+        """
+        if resources is None:
+            self.resources = None
+        else:
+            self.resources = frozenset(resources)
+
+    @cmpi_logging.trace_method
+    def conflicts_with(self, other):
+        """
+        Return True, if this job cannot be executed in parallel with
+        the other job, i.e. if their resources overlap.
+
+        :param other: (``Job``) The other job.
+        """
+        if self.resources is None or other.resources is None:
+            return True
+        return not self.resources.isdisjoint(other.resources)
+
     @cmpi_logging.trace_method
     def set_cancel_action(self, callback, *args, **kwargs):
         """
@@ -301,254 +576,105 @@ class Job(object):
             indication_ids.append(JobManager.IND_JOB_PERCENT_UPDATED)
             self.percent_complete = percent
 
-        if send_indication:
-            current_instance = self.job_manager.get_job_instance(self)
-            self.job_manager.send_modify_indications(
-                    prev_instance, current_instance, indication_ids)
-
-        # start / update the timer if necesasry
-        self._restart_timer()
-        self.unlock()
-
-    @cmpi_logging.trace_method
-    def _expire(self):
-        """
-        Callback when a Job completes and time_before_removal second passed.
-        The job gets removed from its JobManager.
-        """
-        cmpi_logging.logger.debug("Got timeout for job %s: '%s', removing"
-                " the job" % (self.the_id, self.job_name))
-        self.job_manager.remove_job(self)
-
-    @cmpi_logging.trace_method
-    def _restart_timer(self):
-        """
-        Re-schedule timer for TimeBeforeRemoval because some property has
-        changed.
-        """
-        if not self.job_state in self.FINAL_STATES:
-            return
-
-        # Stop the old timer.
-        if self.timer:
-            self.timer.cancel()
-            self.timer = None
-
-        # Start the new timer.
-        if self.delete_on_completion:
-            now = datetime.utcnow()
-            passed = now - self.finish_time
-            timeout = self.time_before_removal - passed.total_seconds()
-            cmpi_logging.logger.debug("Starting timer for job %s: '%s' for %f"
-                    " seconds" % (self.the_id, self.job_name, timeout))
-            self.timer = threading.Timer(timeout, self._expire)
-            self.timer.start()
-
-    @cmpi_logging.trace_method
-    def lock(self):
-        """ 
-        Lock internal mutex. Other threads will block on subsequent lock().
-        The lock is recursive, i.e. can be called multiple times from
-        single thread.
-        """
-        self._lock.acquire()
-
-    @cmpi_logging.trace_method
-    def unlock(self):
-        """ Unlock internal mutex."""
-        self._lock.release()
-
-    @cmpi_logging.trace_method
-    def execute(self):
-        """
-        Start executing the job. It calls the execute callback, set by
-        ``set_execute_action()``.
-        
-        job_state must be already set to STATE_RUNNING.
-        Any exception is translated to CIMError and appropriate state is set.
-        """
-        try:
-            self._execute(*(self._execargs), **(self._execkwargs))
-        except pywbem.CIMError, error:
-            self.finish_method(Job.STATE_FAILED, error=error)
-        except Exception, ex:
-            error = pywbem.CIMError(pywbem.CIM_ERR_FAILED, str(ex))
-            self.finish_method(Job.STATE_FAILED, error=error)
-
-    @cmpi_logging.trace_method
-    def cancel(self):
-        """
-        Cancels queued action. The action must have not been started.
-        """
-        self.change_state(self.STATE_TERMINATED)
-        if self._cancel:
-            self._cancel(*(self._cancelargs), **(self._cancelkwargs))
-
-    @cmpi_logging.trace_method
-    def get_name(self):
-        """
-        Return CIMInstanceName of the job.
-        
-        :rtype: ``CIMInstanceName``
-        """
-        name = pywbem.CIMInstanceName(
-                classname=self.job_manager.job_classname,
-                namespace=self.job_manager.namespace,
-                keybindings={
-                        'InstanceID': self.get_instance_id()
-        })
-        return name
-
-    @cmpi_logging.trace_method
-    def get_instance_id(self, classname=None):
-        """
-        Return InstanceID.
-        
-        :param classname: (``string``) Optional classname to generate InstanceID
-            for different class, e.g. for LMI_<name>MethodResult.
-        :rtype: ``string``
-        """
-        if classname is None:
-            classname = self.job_manager.job_classname
-        return 'LMI:' + classname + ':' + str(self.the_id)
-
-    @staticmethod
-    def parse_instance_id(instance_id, job_manager, classname=None):
-        """
-        Return the last part of instance_id.
-        
-        :param instance_id: (``string``) InstanceID to parse.
-        :param job_manager: (``JobManager``) JobManager to query for Job's
-            classname.
-        :param classname: (``string``) Optional classname. If not given,
-            JobManager's job_classname will be used for parsing. Other
-            classnames may be used to parse e.g. LMI_<name>MethodResult
-            InstanceIDs.
-        
-        :rtype: ``string`` or None if the ``instance_id`` has wrong format.
-        """
-        if classname is None:
-            classname = job_manager.job_classname
-        parts = instance_id.split(":")
-        if len(parts) != 3:
-            return None
-        if parts[0] != 'LMI':
-            return None
-        if parts[1] != classname:
-            return None
-        if not parts[2].isdigit():
-            return None
-        return parts[2]
-
-    @cmpi_logging.trace_method
-    def get_pre_call(self):
-        """ 
-        Return indication that describes the pre-execution values of the
-        job's invocation.
-        
-        :rtype: ``CIMInstance of CIM_InstMethodCall``
-        """
-        path = pywbem.CIMInstanceName(
-                classname="CIM_InstMethodCall",
-                keybindings={},
-                host=socket.gethostname(),
-                namespace=self.job_manager.namespace)
-        inst = pywbem.CIMInstance(
-                classname="CIM_InstMethodCall",
-                path=path,
-                properties={
-                        'MethodName' : self.method_name,
-                        'MethodParameters' : pywbem.CIMProperty(
-                                name="MethodParameters",
-                                type='instance',
-                                value=self._get_method_params(False)),
-                        'PreCall' : True,
-                })
-        src_instance = self._get_cim_instance()
-        inst['SourceInstance'] = src_instance
-        inst['SourceInstanceModelPath'] = str(src_instance.path)
-        return inst
+        if send_indication:
+            current_instance = self.job_manager.get_job_instance(self)
+            # Do not delay the last progress indication after JobChanged.
+            self.job_manager.send_modify_indications(
+                    prev_instance, current_instance, indication_ids,
+                    coalesce=(self.job_state not in self.FINAL_STATES))
+
+        if self.job_state in self.COMPLETED_STATES:
+            # replace the job with compact record, it starts its own timer
+            self.job_manager.finish_job(self)
+        else:
+            # start / update the timer if necesasry
+            self._restart_timer()
+        self.unlock()
 
     @cmpi_logging.trace_method
-    def get_post_call(self):
-        """ 
-        Return indication that describes the post-execution values of the
-        job's invocation.
+    def execute(self):
+        """
+        Start executing the job. It calls the execute callback, set by
+        ``set_execute_action()``.
         
-        :rtype: ``CIMInstance of CIM_InstMethodCall``
+        job_state must be already set to STATE_RUNNING.
+        Any exception is translated to CIMError and appropriate state is set.
         """
-        path = pywbem.CIMInstanceName(
-                classname="CIM_InstMethodCall",
-                keybindings={},
-                host=socket.gethostname(),
-                namespace=self.job_manager.namespace)
-        inst = pywbem.CIMInstance(
-                classname="CIM_InstMethodCall",
-                path=path,
-                properties={
-                        'MethodName' : self.method_name,
-                        'MethodParameters' : self._get_method_params(True),
-                        'PreCall' : False
-        })
-        src_instance = self._get_cim_instance()
-        inst['SourceInstance'] = src_instance
-        inst['SourceInstanceModelPath'] = str(src_instance.path)
-
-        if self.return_value_type is not None:
-            inst['ReturnValueType'] = self.return_value_type
-        if self.return_value is not None:
-            inst['ReturnValue'] = self.return_value
-        if self.error is not None:
-            inst['Error'] = self.error
-        return inst
+        try:
+            self._execute(*(self._execargs), **(self._execkwargs))
+        except pywbem.CIMError, error:
+            self.finish_method(Job.STATE_FAILED, error=error)
+        except Exception, ex:
+            error = pywbem.CIMError(pywbem.CIM_ERR_FAILED, str(ex))
+            self.finish_method(Job.STATE_FAILED, error=error)
 
     @cmpi_logging.trace_method
-    def _get_cim_instance(self):
+    def cancel(self):
         """
-        Return CIMInstance of this job.
-        
-        :rtype: CIMInstance
+        Cancels queued action. The action must have not been started.
         """
-        return self.job_manager.get_job_instance(self)
+        self.change_state(self.STATE_TERMINATED)
+        if self._cancel:
+            self._cancel(*(self._cancelargs), **(self._cancelkwargs))
+
+class FinishedJob(BaseJob):
+    """
+        Compact record of a job, which has finished and which cannot change
+        its state anymore. ``JobManager`` replaces finished ``Job`` with this
+        record to save memory.
+
+        Only state, timestamps, return value, error and output arguments,
+        which are not embedded instances, are kept. Input arguments and
+        affected elements are dropped, therefore
+        ``LMI_Affected<name>JobElement`` and input parameters in
+        ``PreCallIndication`` are not available for finished jobs.
+    """
+    __slots__ = ('job_manager', 'the_id', 'job_name', 'method_name',
+            'job_state', 'percent_complete', 'return_value',
+            'return_value_type', 'output_arguments', 'error',
+            'time_submitted', 'time_of_last_state_change', 'start_time',
+            'finish_time', 'elapsed_time', 'time_before_removal',
+            'delete_on_completion', 'owning_element', 'expiry_time',
+            'priority')
+
+    # The records are not modified, except their removal timer, so they can
+    # share one lock.
+    _lock = threading.RLock()
+    input_arguments = {}
+    affected_elements = ()
 
     @cmpi_logging.trace_method
-    def _get_method_params(self, output=True):
+    def __init__(self, job):
         """
-        Assemble __MethodParameters for CIM_InstMethodCall indication.
-        
-        :rtype: CIMInstance of __MethodParameters.
+        Create compact record of given finished job.
+
+        :param job: (``Job``) The finished job.
         """
-        path = pywbem.CIMInstanceName(
-                classname="__MethodParameters",
-                namespace=self.job_manager.namespace,
-                keybindings={})
-        inst = pywbem.CIMInstance(classname="__MethodParameters", path=path)
-        for (name, value) in self.input_arguments.iteritems():
-            inst[name] = value
-        if output:
-            # overwrite any input parameter
-            for (name, value) in self.output_arguments.iteritems():
-                inst[name] = value
-        return inst
+        self.job_manager = job.job_manager
+        self.the_id = job.the_id
+        self.job_name = job.job_name
+        self.method_name = job.method_name
+        self.job_state = job.job_state
+        self.percent_complete = job.percent_complete
+        self.return_value = job.return_value
+        self.return_value_type = job.return_value_type
+        self.output_arguments = {}
+        if job.output_arguments:
+            for (name, value) in job.output_arguments.iteritems():
+                if not isinstance(value, pywbem.CIMInstance):
+                    self.output_arguments[name] = value
+        self.error = job.error
+        self.time_submitted = job.time_submitted
+        self.time_of_last_state_change = job.time_of_last_state_change
+        self.start_time = job.start_time
+        self.finish_time = job.finish_time
+        self.elapsed_time = job.elapsed_time
+        self.time_before_removal = job.time_before_removal
+        self.delete_on_completion = job.delete_on_completion
+        self.owning_element = job.owning_element
+        self.expiry_time = None
+        self.priority = job.priority
 
-    # pylint: disable-msg=R0903
-    class ReturnValueType(object):
-        """ CIM_InstMethodCall.ReturnValueType values."""
-        Boolean = pywbem.Uint16(2)
-        String = pywbem.Uint16(3)
-        Char16 = pywbem.Uint16(4)
-        Uint8 = pywbem.Uint16(5)
-        Sint8 = pywbem.Uint16(6)
-        Uint16 = pywbem.Uint16(7)
-        Sint16 = pywbem.Uint16(8)
-        Uint32 = pywbem.Uint16(9)
-        Sint32 = pywbem.Uint16(10)
-        Uint64 = pywbem.Uint16(11)
-        Sint64 = pywbem.Uint16(12)
-        Datetime = pywbem.Uint16(13)
-        Real32 = pywbem.Uint16(14)
-        Real64 = pywbem.Uint16(15)
-        Reference = pywbem.Uint16(16)
 
 class JobManager(object):
     """
@@ -567,6 +693,8 @@ class JobManager(object):
         * ``LMI_Owning<name>JobElement``
         
         * ``LMI_Associated<name>JobMethodResult``
+
+        * ``LMI_<name>JobQueueStatistics``
         
         Where ``<name>`` is prefix of your classes, for example 'Storage'
 
@@ -583,12 +711,19 @@ class JobManager(object):
         application. This callback will be called in context of CIMOM callback
         and should be quick!
         
-     6. Enqueue the job using ``JobManager.add_job()`` method.
+     6. Optionally, set resources of the job using ``set_resources()``.
+        Jobs with disjoint resources can be executed in parallel by
+        multiple worker threads, jobs without resources are executed
+        alone. Optionally, set ``job.priority``. Jobs with higher priority
+        are executed first, but never before conflicting jobs enqueued
+        earlier.
+
+     7. Enqueue the job using ``JobManager.add_job()`` method.
      
-     7. When your execute callback is called, you can optionally call
+     8. When your execute callback is called, you can optionally call
         ``job.change_state()`` to update percentage of completion.
         
-     8. When your execute callback is finished, don't forget to set method
+     9. When your execute callback is finished, don't forget to set method
         result using ``job.finish_method()``.
     
     * ``JobManager`` automatically sends all job-related indications.
@@ -606,10 +741,11 @@ class JobManager(object):
     IND_JOB_CREATED = "JobCreated"
 
     @cmpi_logging.trace_method
-    def __init__(self, name, namespace, indication_manager):
+    def __init__(self, name, namespace, indication_manager, worker_count=1,
+            max_finished_jobs=0, max_queued_jobs=0):
         """ 
         Initialize new Manager. It automatically registers all job-related
-        filters to indication_manager and starts a worker thread.
+        filters to indication_manager and starts worker threads.
             
         :param name: (``string``) String with classname infix. For example
             'Storage' for ``LMI_StorageJob``, ``LMI_StorageJobMethodResult``
@@ -617,11 +753,53 @@ class JobManager(object):
         :param namespace: (``string``) Namespace of all providers.    
         :param indication_manager: (``IndicationManager``): a manager where
             indications and filters should be added. 
+        :param worker_count: (``int``) Number of worker threads, i.e. the
+            maximum number of jobs executed in parallel.
+        :param max_finished_jobs: (``int``) Maximum number of finished jobs
+            to keep. Least recently used finished jobs are removed when
+            there are more of them, regardless of their TimeBeforeRemoval.
+            Zero means no limit.
+        :param max_queued_jobs: (``int``) Maximum number of jobs waiting for
+            execution. ``add_job()`` rejects new jobs when the limit is
+            reached. Zero means no limit.
         """
-        # List of all jobs. Dictionary job_id -> Job.
+        # List of all jobs. Dictionary job_id -> Job or FinishedJob.
         self.jobs = {}
-        # Queue of jobs scheduled to execute.
-        self.queue = Queue()
+        # Finished jobs, job_id -> FinishedJob, least recently used first.
+        self.finished_jobs = OrderedDict()
+        self.max_finished_jobs = max_finished_jobs
+        # Nr. of finished jobs removed because of max_finished_jobs.
+        self.evicted_jobs = 0
+        # Lock to guard replacing jobs with FinishedJobs.
+        self.retention_lock = threading.RLock()
+        # Condition to wake up threads waiting for completion of jobs.
+        self.completion = threading.Condition()
+        # List of jobs scheduled to execute, in order of their enqueueing.
+        self.pending = []
+        # List of jobs being executed by worker threads.
+        self.running = []
+        # Condition to guard pending and running lists, queue statistics
+        # and to wake up worker threads.
+        self.scheduler = threading.Condition()
+        self.max_queued_jobs = max_queued_jobs
+        # Queue statistics.
+        # Time when the statistics were started.
+        self.statistics_start = datetime.utcnow()
+        # Nr. of jobs rejected because of max_queued_jobs.
+        self.rejected_jobs = 0
+        # Nr. of started jobs and total and maximum time they waited in the
+        # queue (in seconds).
+        self.started_jobs = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+        # Heap of (expiry_time, sequence number, Job) of finished jobs,
+        # which should be removed after their TimeBeforeRemoval.
+        # Entries with expiry_time different from job.expiry_time are
+        # stale and they are just skipped.
+        self.expiry_queue = []
+        self.expiry_sequence = itertools.count()
+        # Condition to guard expiry_queue and to wake up the expiry thread.
+        self.expiry_condition = threading.Condition()
         # Last created job_id.
         self.last_instance_id = 0
         # Classname infix.
@@ -631,9 +809,15 @@ class JobManager(object):
         self.namespace = namespace
         self.indication_manager = indication_manager
 
-        # Start the worker thread (don't forget to register it at CIMOM)
-        self.worker = threading.Thread(target=self._worker_main)
-        self.worker.start()
+        # Start the worker threads (don't forget to register them at CIMOM)
+        self.workers = []
+        for _unused in xrange(max(worker_count, 1)):
+            worker = threading.Thread(target=self._worker_main)
+            worker.start()
+            self.workers.append(worker)
+        # Start thread to remove expired jobs.
+        self.expiry_worker = threading.Thread(target=self._expiry_main)
+        self.expiry_worker.start()
 
         # Various classnames for job-related classes, with correct infixes.
         self.job_classname = 'LMI_' + self.name + 'Job'
@@ -644,6 +828,8 @@ class JobManager(object):
                 + 'JobMethodResult')
         self.indication_filter_classname = ('LMI_' + self.name
                 + 'JobIndicationFilter')
+        self.statistics_classname = ('LMI_' + self.name
+                + 'JobQueueStatistics')
         self.job_provider = None
         self._add_indication_filters()
 
@@ -704,6 +890,7 @@ class JobManager(object):
         * ``LMI_Affected<name>JobElement``
         * ``LMI_Owning<name>JobElement``
         * ``LMI_Associated<name>JobMethodResult``
+        * ``LMI_<name>JobQueueStatistics``
             
         :rtype: dictionary class_name -> CIMProvider2
         """
@@ -729,20 +916,44 @@ class JobManager(object):
                     self.owning_classname, job_manager=self)
             self.providers[self.associated_result_classname] = provider
 
+            provider = LMI_JobQueueStatistics(
+                    self.statistics_classname, job_manager=self)
+            self.providers[self.statistics_classname] = provider
+
         return self.providers
 
     @cmpi_logging.trace_method
     def add_job(self, job):
         """
         Enqueue new job. Send indication when needed.
+        Raise CIMError, if there are too many queued jobs.
         
         :param job: (``Job``) A job to enqueue.
         """
+        self.scheduler.acquire()
+        try:
+            # The job may be already pending when it was suspended and
+            # started again before a worker skipped it.
+            if job not in self.pending:
+                # Suspended and terminated jobs stay in the list until
+                # a worker skips them, they do not count.
+                queued = len([j for j in self.pending
+                        if j.job_state == Job.STATE_QUEUED])
+                if self.max_queued_jobs and queued >= self.max_queued_jobs:
+                    self.rejected_jobs += 1
+                    cmpi_logging.logger.warn("Job %s: '%s' rejected, too"
+                            " many queued jobs" % (job.the_id, job.job_name))
+                    raise pywbem.CIMError(pywbem.CIM_ERR_FAILED,
+                            "Too many queued jobs (%d), try again later."
+                            % (queued,))
+                self.pending.append(job)
+            self.jobs[job.the_id] = job
+            self.scheduler.notify_all()
+        finally:
+            self.scheduler.release()
         cmpi_logging.logger.debug("Job %s: '%s' enqueued"
                 % (job.the_id, job.job_name))
 
-        self.jobs[job.the_id] = job
-        self.queue.put(job)
         # send indication
         if self.indication_manager.is_subscribed(self.IND_JOB_CREATED):
             job_instance = self.get_job_instance(job)
@@ -750,7 +961,7 @@ class JobManager(object):
                     job_instance, self.IND_JOB_CREATED)
 
     def send_modify_indications(self, prev_instance, current_instance,
-            indication_ids):
+            indication_ids, coalesce=True):
         """
         Send InstModification. This is helper method called by ``Job`` when
         needed.
@@ -759,10 +970,12 @@ class JobManager(object):
             modified.
         :param current_instance: Instance of ``LMI_<name>Job`` after it was
             modified.
+        :param coalesce: (``bool``) If False, the indications are sent
+            immediately, without coalescing.
         """
         for _id in indication_ids:
             self.indication_manager.send_instmodification(prev_instance,
-                    current_instance, _id)
+                    current_instance, _id, coalesce)
 
     @cmpi_logging.trace_method
     def remove_job(self, job):
@@ -774,10 +987,165 @@ class JobManager(object):
         """
         cmpi_logging.logger.debug("Removing job %s: '%s'"
                 % (job.the_id, job.job_name))
-        del self.jobs[job.the_id]
-        # The job may still be in the queue!
-        # There is no way, how to remove it, it will be skipped by the
-        # worker thread.
+        self.cancel_expiry(job)
+        self.retention_lock.acquire()
+        try:
+            if job.the_id in self.jobs:
+                del self.jobs[job.the_id]
+            if job.the_id in self.finished_jobs:
+                del self.finished_jobs[job.the_id]
+        finally:
+            self.retention_lock.release()
+        # The job may still be pending, it will be skipped by the
+        # worker threads.
+
+    @cmpi_logging.trace_method
+    def finish_job(self, job):
+        """
+        Replace finished job with its compact ``FinishedJob`` record and
+        remove least recently used finished jobs, if there are more than
+        max_finished_jobs of them.
+        This is helper method called by ``Job`` when needed.
+
+        :param job: (``Job``) Job, which cannot change its state anymore.
+        """
+        self.cancel_expiry(job)
+        evicted = []
+        self.retention_lock.acquire()
+        try:
+            if self.jobs.get(job.the_id) is not job:
+                # the job has been already replaced or removed
+                return
+            record = FinishedJob(job)
+            self.jobs[job.the_id] = record
+            self.finished_jobs[job.the_id] = record
+            if self.max_finished_jobs:
+                while len(self.finished_jobs) > self.max_finished_jobs:
+                    (_unused, oldest) = self.finished_jobs.popitem(last=False)
+                    evicted.append(oldest)
+                    self.evicted_jobs += 1
+        finally:
+            self.retention_lock.release()
+
+        # pylint: disable-msg=W0212
+        record._restart_timer()
+        for oldest in evicted:
+            cmpi_logging.logger.debug("Evicting job %s: '%s', too many"
+                    " finished jobs" % (oldest.the_id, oldest.job_name))
+            self.remove_job(oldest)
+
+        # wake up wait_for_jobs()
+        self.completion.acquire()
+        try:
+            self.completion.notify_all()
+        finally:
+            self.completion.release()
+
+    @cmpi_logging.trace_method
+    def wait_for_jobs(self, jobs, wait_for_all, timeout):
+        """
+        Wait until given jobs finish, fail or are terminated.
+        Return True, if the jobs completed, or False if the timeout
+        expired.
+
+        :param jobs: (``array of Job``) Jobs to wait for.
+        :param wait_for_all: (``bool``) True to wait for all the jobs, False
+            to wait for any of them.
+        :param timeout: (``float``) Maximum number of seconds to wait.
+        """
+        if wait_for_all:
+            check = all
+        else:
+            check = any
+        deadline = time.time() + timeout
+        self.completion.acquire()
+        try:
+            while True:
+                if check([job.job_state in Job.COMPLETED_STATES
+                        for job in jobs]):
+                    return True
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self.completion.wait(remaining)
+        finally:
+            self.completion.release()
+
+    @cmpi_logging.trace_method
+    def schedule_expiry(self, job, timeout):
+        """
+        (Re-)schedule removal of a job after given timeout. Any previously
+        scheduled removal of the job is cancelled.
+        This is helper method called by ``Job`` when needed.
+
+        :param job: (``Job``) Job to remove.
+        :param timeout: (``float``) Number of seconds before the job is
+            removed.
+        """
+        self.expiry_condition.acquire()
+        try:
+            job.expiry_time = time.time() + timeout
+            heapq.heappush(self.expiry_queue,
+                    (job.expiry_time, self.expiry_sequence.next(), job))
+            # the job may be the first one to expire
+            self.expiry_condition.notify()
+        finally:
+            self.expiry_condition.release()
+
+    @cmpi_logging.trace_method
+    def cancel_expiry(self, job):
+        """
+        Cancel scheduled removal of a job.
+
+        :param job: (``Job``) Job, which should not be removed.
+        """
+        self.expiry_condition.acquire()
+        try:
+            # the entry in expiry_queue is now stale
+            job.expiry_time = None
+        finally:
+            self.expiry_condition.release()
+
+    @cmpi_logging.trace_method
+    def _get_expired_job(self):
+        """
+        Wait until a job expires and return it.
+        The caller must hold the expiry_condition lock.
+        """
+        while True:
+            # drop stale entries
+            while (self.expiry_queue and self.expiry_queue[0][0]
+                    != self.expiry_queue[0][2].expiry_time):
+                heapq.heappop(self.expiry_queue)
+
+            if not self.expiry_queue:
+                self.expiry_condition.wait()
+                continue
+
+            (expiry_time, _unused, job) = self.expiry_queue[0]
+            now = time.time()
+            if expiry_time > now:
+                self.expiry_condition.wait(expiry_time - now)
+                continue
+
+            heapq.heappop(self.expiry_queue)
+            job.expiry_time = None
+            return job
+
+    @cmpi_logging.trace_method
+    def _expiry_main(self):
+        """
+        This is the main loop of the expiry thread. It removes jobs, whose
+        TimeBeforeRemoval has passed, and never ends.
+        """
+        while True:
+            self.expiry_condition.acquire()
+            try:
+                job = self._get_expired_job()
+            finally:
+                self.expiry_condition.release()
+            # pylint: disable-msg=W0212
+            job._expire()
 
     @cmpi_logging.trace_method
     def get_job_for_instance_id(self, instance_id, classname=None):
@@ -793,40 +1161,108 @@ class JobManager(object):
         if classname is None:
             classname = self.job_classname
         the_id = Job.parse_instance_id(instance_id, self, classname)
-        if the_id:
-            return self.jobs.get(the_id, None)
-        else:
+        if not the_id:
             return None
+        self.retention_lock.acquire()
+        try:
+            if the_id in self.finished_jobs:
+                # mark the finished job as recently used
+                self.finished_jobs[the_id] = self.finished_jobs.pop(the_id)
+            return self.jobs.get(the_id, None)
+        finally:
+            self.retention_lock.release()
+
+    @cmpi_logging.trace_method
+    def _pick_job(self):
+        """
+        Remove and return pending job with the highest priority, which does
+        not conflict with any running job nor with any job enqueued before
+        it. Return None if there is no such job.
+        Jobs, which are no longer queued (i.e. suspended or terminated), are
+        dropped from the pending list.
+        The caller must hold the scheduler lock.
+        """
+        # jobs the candidate must not conflict with
+        blocking = list(self.running)
+        best = None
+        for job in list(self.pending):
+            if job.job_state != Job.STATE_QUEUED:
+                # just skip suspended and terminated jobs
+                self.pending.remove(job)
+                continue
+            conflict = False
+            for other in blocking:
+                if job.conflicts_with(other):
+                    conflict = True
+                    break
+            if not conflict and (best is None or job.priority < best.priority):
+                best = job
+            # keep FIFO order of conflicting jobs, regardless of priority
+            blocking.append(job)
+        if best:
+            self.pending.remove(best)
+        return best
 
     @cmpi_logging.trace_method
     def _worker_main(self):
         """
-        This is the main loop of the job queue. It just processes enqueued
+        This is the main loop of a worker thread. It just processes enqueued
         jobs and never ends.
         """
         while True:
-            job = self.queue.get()
-            # we need to protect from changes between checking state and
-            # setting new state
-            job.lock()
-            if job.job_state == Job.STATE_QUEUED:
-                # the job was not cancelled
-                job.change_state(Job.STATE_RUNNING)
-                job.unlock()
-                cmpi_logging.logger.info("Starting job %s: '%s'" %
-                        (job.the_id, job.job_name))
+            self.scheduler.acquire()
+            try:
+                job = self._pick_job()
+                while job is None:
+                    self.scheduler.wait()
+                    job = self._pick_job()
+                self.running.append(job)
+
+                wait_time = (datetime.utcnow()
+                        - job.time_submitted).total_seconds()
+                self.started_jobs += 1
+                self.total_wait_time += wait_time
+                self.max_wait_time = max(self.max_wait_time, wait_time)
+            finally:
+                self.scheduler.release()
+
+            try:
+                self._run_job(job)
+            finally:
+                self.scheduler.acquire()
+                try:
+                    self.running.remove(job)
+                    # conflicting jobs may be runnable now
+                    self.scheduler.notify_all()
+                finally:
+                    self.scheduler.release()
 
-                job.execute()
-                if job.error:
-                    cmpi_logging.logger.warn("Job %s: '%s' finished with error:"
-                            " %s" % (job.the_id, job.job_name, str(job.error)))
-                else:
-                    cmpi_logging.logger.info("Job %s: '%s' finished OK" %
-                            (job.the_id, job.job_name))
+    @cmpi_logging.trace_method
+    def _run_job(self, job):
+        """
+        Execute given job, unless it was cancelled in the meantime.
+        This method is called from a worker thread.
+        """
+        # we need to protect from changes between checking state and
+        # setting new state
+        job.lock()
+        if job.job_state == Job.STATE_QUEUED:
+            # the job was not cancelled
+            job.change_state(Job.STATE_RUNNING)
+            job.unlock()
+            cmpi_logging.logger.info("Starting job %s: '%s'" %
+                    (job.the_id, job.job_name))
+
+            job.execute()
+            if job.error:
+                cmpi_logging.logger.warn("Job %s: '%s' finished with error:"
+                        " %s" % (job.the_id, job.job_name, str(job.error)))
             else:
-                # just skip suspended and terminated jobs
-                job.unlock()
-            self.queue.task_done()
+                cmpi_logging.logger.info("Job %s: '%s' finished OK" %
+                        (job.the_id, job.job_name))
+        else:
+            # just skip suspended and terminated jobs
+            job.unlock()
 
     @cmpi_logging.trace_method
     def get_next_id(self):
@@ -860,6 +1296,12 @@ class LMI_ConcreteJob(CIMProvider2):
     """
     Provider of LMI_ConcreteJob class or its subclass.
     """
+    # Maximum time, LMI_WaitForCompletion waits (in seconds). The waiting
+    # blocks a CIMOM thread and Python 2 implements timed wait by polling,
+    # so keep it short. Clients can call the method again or subscribe
+    # for job indications.
+    MAX_WAIT_TIME = 30
+
     @cmpi_logging.trace_method
     def __init__(self, classname, job_manager):
         self.classname = classname
@@ -955,6 +1397,7 @@ class LMI_ConcreteJob(CIMProvider2):
         model['Description'] = job.job_name
         model['LocalOrUtcTime'] = self.Values.LocalOrUtcTime.UTC_Time
         model['PercentComplete'] = pywbem.Uint16(job.percent_complete)
+        model['Priority'] = pywbem.Uint32(job.priority)
         if job.start_time:
             model['StartTime'] = pywbem.CIMDateTime(job.start_time)
         else:
@@ -1036,7 +1479,7 @@ class LMI_ConcreteJob(CIMProvider2):
         if not job:
             raise pywbem.CIMError(pywbem.CIM_ERR_NOT_FOUND,
                     "Job not found.")
-        if not job.job_status in Job.FINAL_STATES:
+        if not job.job_state in Job.FINAL_STATES:
             raise pywbem.CIMError(pywbem.CIM_ERR_FAILED,
                     "Job has not finished.")
 
@@ -1166,10 +1609,14 @@ class LMI_ConcreteJob(CIMProvider2):
                     rval = retcodes.Invalid_State_Transition
                 else:
                     job.change_state(Job.STATE_QUEUED)
-                    # Enqueue the job again, it may be already processed
-                    # (we might get the job in the queue twice, but
-                    # we have only one worker thread so it won't collide).
-                    self.job_manager.add_job(job)
+                    # Enqueue the job again, it may be already dropped
+                    # from pending jobs (add_job won't add it twice).
+                    try:
+                        self.job_manager.add_job(job)
+                    except pywbem.CIMError:
+                        # too many queued jobs
+                        job.change_state(Job.STATE_SUSPENDED)
+                        raise
                     rval = retcodes.Completed_with_No_Error
 
             else:
@@ -1178,6 +1625,109 @@ class LMI_ConcreteJob(CIMProvider2):
             job.unlock()
         return (rval, [])
 
+    @cmpi_logging.trace_method
+    def cim_method_lmi_waitforcompletion(self, env, object_name,
+            param_jobs=None, param_waitforall=None, param_timeout=None):
+        """Implements LMI_StorageJob.LMI_WaitForCompletion()
+
+        Wait until given jobs finish, fail or are terminated.
+
+        :param env: -- Provider Environment (pycimmb.ProviderEnvironment)
+        :param object_name: -- A pywbem.CIMInstanceName or pywbem.CIMCLassName 
+            specifying the object on which the method LMI_WaitForCompletion() 
+            should be invoked.
+        :param param_jobs: -- The input parameter Jobs (type REF
+            (pywbem.CIMInstanceName(classname='LMI_StorageJob', ...)) 
+            Jobs to wait for. If not set, the job on which the method is
+            invoked is used.
+        :param param_waitforall: -- The input parameter WaitForAll
+            (type bool)
+            Wait until all the jobs complete (True, default) or until any
+            of them completes (False).
+        :param param_timeout: -- The input parameter Timeout
+            (type pywbem.CIMDateTime) 
+            Maximum time to wait, as time interval. It is limited by
+            MAX_WAIT_TIME (30 seconds).
+
+        Output parameters:
+
+        * JobStates -- (type pywbem.Uint16) 
+            JobState of each job from Jobs parameter.
+        * CompletedJobs -- (type REF (pywbem.CIMInstanceName(...)) 
+            Jobs, which completed.
+        * PostCallIndications -- (type pywbem.CIMInstance(
+            classname='CIM_InstMethodCall', ...)) 
+            Results of methods of the completed jobs, in the same order
+            as CompletedJobs.
+        """
+        if param_jobs:
+            names = param_jobs
+        elif isinstance(object_name, pywbem.CIMInstanceName):
+            names = [object_name]
+        else:
+            raise pywbem.CIMError(pywbem.CIM_ERR_INVALID_PARAMETER,
+                    "Parameter Jobs must be specified.")
+
+        jobs = []
+        for name in names:
+            job = self.job_manager.get_job_for_instance_id(name['InstanceID'])
+            if not job:
+                raise pywbem.CIMError(pywbem.CIM_ERR_INVALID_PARAMETER,
+                        "Job %s not found." % (name['InstanceID'],))
+            jobs.append(job)
+
+        timeout = self.MAX_WAIT_TIME
+        if param_timeout is not None:
+            if not param_timeout.is_interval:
+                raise pywbem.CIMError(pywbem.CIM_ERR_INVALID_PARAMETER,
+                        "Parameter Timeout must be time interval.")
+            timeout = min(timeout, param_timeout.timedelta.total_seconds())
+
+        if param_waitforall is None:
+            param_waitforall = True
+
+        retvals = self.Values.LMI_WaitForCompletion
+        if self.job_manager.wait_for_jobs(jobs, param_waitforall, timeout):
+            rval = retvals.Success
+        else:
+            rval = retvals.Timeout
+
+        states = []
+        completed = []
+        post_calls = []
+        for job in jobs:
+            jobstate, _unused = self.get_job_states(job)
+            states.append(jobstate)
+            if job.job_state in Job.COMPLETED_STATES:
+                try:
+                    post_calls.append(job.get_post_call())
+                except pywbem.CIMError:
+                    # the job was removed in the meantime
+                    continue
+                completed.append(job.get_name())
+
+        out_params = [
+                pywbem.CIMParameter(
+                        name='jobstates',
+                        value=states,
+                        type='uint16',
+                        is_array=True,
+                        array_size=len(states)),
+                pywbem.CIMParameter(
+                        name='completedjobs',
+                        value=completed,
+                        type='reference',
+                        is_array=True,
+                        array_size=len(completed)),
+                pywbem.CIMParameter(
+                        name='postcallindications',
+                        value=post_calls,
+                        type='instance',
+                        is_array=True,
+                        array_size=len(post_calls)),
+        ]
+        return (rval, out_params)
+
     @cmpi_logging.trace_method
     def cim_method_killjob(self, env, object_name,
                            param_deleteonkill=None):
@@ -1284,6 +1834,14 @@ class LMI_ConcreteJob(CIMProvider2):
             # DMTF_Reserved = ..
             # Vendor_Specific = 32768..65535
 
+        class LMI_WaitForCompletion(object):
+            Success = pywbem.Uint32(0)
+            Not_Supported = pywbem.Uint32(1)
+            Unspecified_Error = pywbem.Uint32(2)
+            Timeout = pywbem.Uint32(3)
+            Failed = pywbem.Uint32(4)
+            Invalid_Parameter = pywbem.Uint32(5)
+
         class GetError(object):
             Success = pywbem.Uint32(0)
             Not_Supported = pywbem.Uint32(1)
@@ -1529,3 +2087,70 @@ class LMI_AssociatedJobMethodResult(CIMProvider2):
             return self.simple_refs(env, object_name, model,
                           result_class_name, role, result_role, keys_only)
 
+class LMI_JobQueueStatistics(CIMProvider2):
+    """
+        Instrumentation of LMI_JobQueueStatistics class and its subclasses.
+        There is only one instance, which describes the queue of
+        ``JobManager``.
+    """
+
+    @cmpi_logging.trace_method
+    def __init__(self, classname, job_manager):
+        self.classname = classname
+        self.job_manager = job_manager
+
+    @cmpi_logging.trace_method
+    def get_instance_id(self):
+        """ Return InstanceID of the only instance."""
+        return 'LMI:' + self.classname
+
+    @cmpi_logging.trace_method
+    def enum_instances(self, env, model, keys_only):
+        """Enumerate instances."""
+        model.path.update({'InstanceID': None})
+        model['InstanceID'] = self.get_instance_id()
+        if keys_only:
+            yield model
+        else:
+            yield self.get_instance(env, model)
+
+    @cmpi_logging.trace_method
+    def get_instance(self, env, model):
+        """Return an instance."""
+        if model['InstanceID'] != self.get_instance_id():
+            raise pywbem.CIMError(pywbem.CIM_ERR_NOT_FOUND,
+                    "Statistics not found.")
+
+        manager = self.job_manager
+        manager.scheduler.acquire()
+        try:
+            queued = len([job for job in manager.pending
+                    if job.job_state == Job.STATE_QUEUED])
+            running = len(manager.running)
+            rejected = manager.rejected_jobs
+            started = manager.started_jobs
+            total_wait_time = manager.total_wait_time
+            max_wait_time = manager.max_wait_time
+        finally:
+            manager.scheduler.release()
+
+        model['ElementName'] = manager.name + ' job queue'
+        model['StartStatisticTime'] = pywbem.CIMDateTime(
+                manager.statistics_start)
+        model['StatisticTime'] = pywbem.CIMDateTime(datetime.utcnow())
+        model['QueuedJobs'] = pywbem.Uint32(queued)
+        model['RunningJobs'] = pywbem.Uint32(running)
+        model['FinishedJobs'] = pywbem.Uint32(len(manager.finished_jobs))
+        model['MaxQueuedJobs'] = pywbem.Uint32(manager.max_queued_jobs)
+        model['RejectedJobs'] = pywbem.Uint64(rejected)
+        model['EvictedJobs'] = pywbem.Uint64(manager.evicted_jobs)
+        model['StartedJobs'] = pywbem.Uint64(started)
+        if started:
+            average = total_wait_time / started
+        else:
+            average = 0
+        model['AverageWaitTime'] = pywbem.CIMDateTime(
+                timedelta(seconds=average))
+        model['MaxWaitTime'] = pywbem.CIMDateTime(
+                timedelta(seconds=max_wait_time))
+        return model
@@ -43,7 +43,8 @@ class LMI_DiskPartition(ExtentProvider):
             StorageDevice class.
         """
         if  isinstance(device, blivet.devices.PartitionDevice):
-            if device.disk.format.labelType == 'msdos':
+            fmt = self.storage.get_format(device.disk)
+            if fmt and fmt.labelType == 'msdos':
                 return True
         return False
 
@@ -53,12 +54,10 @@ class LMI_DiskPartition(ExtentProvider):
             return super(LMI_DiskPartition, self).get_base_devices(device)
 
         # logical partitions depend on the extended partition
-        parted_ext = device.disk.format.partedDisk.getExtendedPartition()
-        if not parted_ext:
+        ext = self.storage.get_extended_partition(device.disk)
+        if not ext:
             raise pywbem.CIMError(pywbem.CIM_ERR_FAILED,
                     'Cannot find extended partition for device: ' + device.path)
-
-        ext = self.storage.devicetree.getDeviceByPath(parted_ext.path)
         return [ext, ]
 
 
@@ -73,21 +72,21 @@ class LMI_DiskPartition(ExtentProvider):
                 yield device
 
     @cmpi_logging.trace_method
-    def get_instance(self, env, model, device=None):
+    def render_instance(self, env, model, device):
         """
             Add partition-specific properties.
         """
-        model = super(LMI_DiskPartition, self).get_instance(env, model, device)
-        if not device:
-            device = self._get_device(model)
-
-        model['PrimaryPartition'] = device.isPrimary
-        if device.isPrimary:
-            model['PartitionType'] = self.Values.PartitionType.Primary
-        if device.isExtended:
-            model['PartitionType'] = self.Values.PartitionType.Extended
-        if device.isLogical:
-            model['PartitionType'] = self.Values.PartitionType.Logical
+        model = super(LMI_DiskPartition, self).render_instance(
+                env, model, device)
+
+        if self.is_requested(model, 'PrimaryPartition', 'PartitionType'):
+            model['PrimaryPartition'] = device.isPrimary
+            if device.isPrimary:
+                model['PartitionType'] = self.Values.PartitionType.Primary
+            if device.isExtended:
+                model['PartitionType'] = self.Values.PartitionType.Extended
+            if device.isLogical:
+                model['PartitionType'] = self.Values.PartitionType.Logical
 
         return model
 
@@ -179,9 +179,9 @@ class LMI_DiskPartitionConfigurationCapabilities(CapabilitiesProvider):
         self.check_capabilities_for_device(device, capabilities)
 
         if capabilities['PartitionStyle'] == self.Values.PartitionStyle.EMBR:
-            device = device.parents[0]
+            device = self.storage.get_parents(device)[0]
 
-        alignment = device.partedDevice.optimumAlignment.grainSize
+        alignment = self.storage.get_alignment(device)
 
         out_params = [pywbem.CIMParameter('alignment', type='uint64',
                 value=pywbem.Uint64(alignment))]
@@ -201,12 +201,13 @@ class LMI_DiskPartitionConfigurationCapabilities(CapabilitiesProvider):
             return None
 
         fmt_class = blivet.formats.disklabel.DiskLabel
-        if (not device.format) or (not isinstance(device.format, fmt_class)):
+        fmt = self.storage.get_format(device)
+        if (not fmt) or (not isinstance(fmt, fmt_class)):
             return None
 
-        if device.format.labelType == "msdos":
+        if fmt.labelType == "msdos":
             return self.get_capabilities_for_id(self.INSTANCE_ID_MBR)
-        if device.format.labelType == "gpt":
+        if fmt.labelType == "gpt":
             return self.get_capabilities_for_id(self.INSTANCE_ID_GPT)
 
     @cmpi_logging.trace_method
@@ -215,23 +216,24 @@ class LMI_DiskPartitionConfigurationCapabilities(CapabilitiesProvider):
             Check if the capabilities are the right one for the device and
             raise exception if something is wrong.
         """
+        fmt = self.storage.get_format(device)
         if capabilities['PartitionStyle'] == self.Values.PartitionStyle.MBR:
-            if (not device.format or not isinstance(
-                            device.format,
+            if (not fmt or not isinstance(
+                            fmt,
                             blivet.formats.disklabel.DiskLabel)):
                 raise pywbem.CIMError(pywbem.CIM_ERR_INVALID_PARAMETER,
                         "There is no partition table on the Extent.")
-            if device.format.labelType != "msdos":
+            if fmt.labelType != "msdos":
                 raise pywbem.CIMError(pywbem.CIM_ERR_INVALID_PARAMETER,
                         "Partition table does not have given Capabilities.")
 
         elif capabilities['PartitionStyle'] == self.Values.PartitionStyle.GPT:
-            if (not device.format or not isinstance(
-                            device.format,
+            if (not fmt or not isinstance(
+                            fmt,
                             blivet.formats.disklabel.DiskLabel)):
                 raise pywbem.CIMError(pywbem.CIM_ERR_INVALID_PARAMETER,
                         "There is no partition table on the Extent.")
-            if device.format.labelType != "gpt":
+            if fmt.labelType != "gpt":
                 raise pywbem.CIMError(pywbem.CIM_ERR_INVALID_PARAMETER,
                         "Partition table does not have given Capabilities.")
 
@@ -303,8 +305,8 @@ class LMI_DiskPartitionConfigurationCapabilities(CapabilitiesProvider):
 
         retval = self.Values.FindPartitionLocation.Success
 
-        sector_size = device.partedDevice.sectorSize
-        new_size = geometry.length * device.partedDevice.sectorSize
+        sector_size = self.storage.get_size(device)[0]
+        new_size = geometry.length * sector_size
 
         # anaconda returns the whole region size, we should make it smaller
         # to adjust to requested size
@@ -23,6 +23,7 @@ from openlmi.storage.SettingProvider import SettingProvider
 from openlmi.storage.SettingManager import Setting
 
 import parted
+import blivet
 import openlmi.common.cmpi_logging as cmpi_logging
 
 class LMI_DiskPartitionConfigurationSetting(SettingProvider):
@@ -83,11 +84,23 @@ class LMI_DiskPartitionConfigurationSetting(SettingProvider):
         if not path:
             return None
 
-        device = self.storage.devicetree.getDeviceByPath(path)
+        device = self.storage.get_device_by_path(path)
         if not device:
             return None
         return self.get_configuration(device)
 
+    @cmpi_logging.trace_method
+    def get_setting_id_for_element(self, element_name):
+        """
+            Return InstanceID of setting associated to ManagedElement with
+            given CIMInstanceName by ElementSettingData association.
+            Return None if no such setting exists.
+        """
+        device = self.provider_manager.get_device_for_name(element_name)
+        if not isinstance(device, blivet.devices.PartitionDevice):
+            return None
+        return self.create_setting_id(device.path)
+
     @cmpi_logging.trace_method
     def get_associated_element_name(self, instance_id):
         """
@@ -98,7 +111,7 @@ class LMI_DiskPartitionConfigurationSetting(SettingProvider):
         if not path:
             return None
 
-        device = self.storage.devicetree.getDeviceByPath(path)
+        device = self.storage.get_device_by_path(path)
         if not device:
             return None
 
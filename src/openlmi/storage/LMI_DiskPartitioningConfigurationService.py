@@ -19,6 +19,7 @@
 """ Module for LMI_DiskPartitionConfigurationService class."""
 
 from openlmi.storage.ServiceProvider import ServiceProvider
+from openlmi.storage.JobManager import Job
 from openlmi.storage.LMI_DiskPartitionConfigurationSetting \
         import LMI_DiskPartitionConfigurationSetting
 import pywbem
@@ -32,6 +33,12 @@ class LMI_DiskPartitionConfigurationService(ServiceProvider):
     """
         LMI_DiskPartitionConfigurationService provider implementation.
     """
+
+    # partitioning changes just metadata, it's fast
+    job_priorities = {
+            'LMI_CreateOrModifyPartition': Job.PRIORITY_HIGH,
+            'LMI_SetPartitionStyle': Job.PRIORITY_HIGH,
+    }
     @cmpi_logging.trace_method
     def __init__(self, *args, **kwargs):
         super(LMI_DiskPartitionConfigurationService, self).__init__(
@@ -61,6 +68,24 @@ class LMI_DiskPartitionConfigurationService(ServiceProvider):
             reserved by the partition table and associated metadata. This size
             is in the PartitionTableSize property of the associated
             DiskPartitionConfigurationCapabilities instance.
+            
+            This method is always synchronous, it has no Job parameter.
+        """
+        return self.cim_method_lmi_setpartitionstyle(env, object_name,
+                param_extent=param_extent,
+                param_partitionstyle=param_partitionstyle,
+                param_asynchronous=False)
+
+    @cmpi_logging.trace_method
+    def cim_method_lmi_setpartitionstyle(self, env, object_name,
+                                         param_extent=None,
+                                         param_partitionstyle=None,
+                                         param_asynchronous=None,
+                                         param_transaction=None):
+        """
+            Implements LMI_DiskPartitionConfigurationService.LMI_SetPartitionStyle()
+
+            The same as SetPartitionStyle, it just can be executed as a job.
         """
         # check parameters here, the real work is done in _setpartitionstyle
         self.check_instance(object_name)
@@ -107,12 +132,23 @@ class LMI_DiskPartitionConfigurationService(ServiceProvider):
             raise pywbem.CIMError(pywbem.CIM_ERR_NOT_SUPPORTED,
                     "Creation of extended partitions is not supported.")
 
+        if self.is_asynchronous(param_asynchronous, param_transaction):
+            return self.start_method_job(env, object_name,
+                    "LMI_SetPartitionStyle",
+                    "CREATE DISKLABEL ON " + device.path,
+                    {
+                        'Extent': param_extent,
+                        'PartitionStyle': param_partitionstyle,
+                    },
+                    [param_extent])
+
         retval = self._setpartitionstyle(
-                device, capabilities, capabilities_provider)
+                device, capabilities, capabilities_provider, param_transaction)
         return (retval, [])
 
     @cmpi_logging.trace_method
-    def _setpartitionstyle(self, device, capabilities, capabilities_provider):
+    def _setpartitionstyle(self, device, capabilities, capabilities_provider,
+            transaction=None):
         """
             Really set the partition style, all parameters were successfully
             checked.
@@ -131,8 +167,15 @@ class LMI_DiskPartitionConfigurationService(ServiceProvider):
                 {'label': label, 'device': device.path})
 
         fmt = blivet.formats.getFormat('disklabel', labelType=label)
-        action = blivet.deviceaction.ActionCreateFormat(device, fmt)
-        storage.do_storage_action(self.storage, action)
+        # the action modifies the device, register it at once
+        self.storage.acquire_write()
+        try:
+            action = blivet.deviceaction.ActionCreateFormat(device, fmt)
+            batch = storage.register_actions(self.storage, [action],
+                    transaction)
+        finally:
+            self.storage.release_write()
+        storage.process_actions(self.storage, batch)
 
         return self.Values.SetPartitionStyle.Success
 
@@ -398,7 +441,7 @@ class LMI_DiskPartitionConfigurationService(ServiceProvider):
         return part_type
 
     @cmpi_logging.trace_method
-    def _lmi_create_partition(self, device, goal, size):
+    def _lmi_create_partition(self, device, goal, size, transaction=None):
         """
             Create partition on given device with  given goal and size.
             Size can be null, which means the largest possible size.
@@ -463,7 +506,7 @@ class LMI_DiskPartitionConfigurationService(ServiceProvider):
 
         # finally, do the dirty job
         action = blivet.deviceaction.ActionCreateDevice(partition)
-        storage.do_storage_action(self.storage, action)
+        storage.do_storage_action(self.storage, action, transaction)
         size = partition.size * units.MEGABYTE
 
         ret = self.Values.LMI_CreateOrModifyPartition\
@@ -475,7 +518,9 @@ class LMI_DiskPartitionConfigurationService(ServiceProvider):
                                                param_partition=None,
                                                param_goal=None,
                                                param_extent=None,
-                                               param_size=None):
+                                               param_size=None,
+                                               param_asynchronous=None,
+                                               param_transaction=None):
         """
             Implements LMI_DiskPartitionConfigurationService.LMI_CreateOrModifyPartition()
 
@@ -524,6 +569,21 @@ class LMI_DiskPartitionConfigurationService(ServiceProvider):
         (device, _unused) = self._parse_extent(param_extent, goal)
         partition = self._parse_partition(param_partition, device)
 
+        if self.is_asynchronous(param_asynchronous, param_transaction):
+            if partition:
+                job_name = "MODIFY PARTITION " + partition.path
+            else:
+                job_name = "CREATE PARTITION ON " + device.path
+            return self.start_method_job(env, object_name,
+                    "LMI_CreateOrModifyPartition", job_name,
+                    {
+                        'Partition': param_partition,
+                        'Goal': param_goal,
+                        'Extent': param_extent,
+                        'Size': param_size,
+                    },
+                    [param_extent, param_partition])
+
         if partition:
             # modify
             (retval, partition, size) = self._lmi_modify_partition(
@@ -531,7 +591,7 @@ class LMI_DiskPartitionConfigurationService(ServiceProvider):
         else:
             # create
             (retval, partition, size) = self._lmi_create_partition(
-                    device, goal, param_size)
+                    device, goal, param_size, param_transaction)
 
         out_params = []
         if partition:
@@ -567,6 +627,18 @@ class LMI_DiskPartitionConfigurationService(ServiceProvider):
             # Method_Reserved = ..
             # Vendor_Specific = 0x8000..
 
+        class LMI_SetPartitionStyle(object):
+            Success = pywbem.Uint32(0)
+            Not_Supported = pywbem.Uint32(1)
+            Unknown = pywbem.Uint32(2)
+            Timeout = pywbem.Uint32(3)
+            Failed = pywbem.Uint32(4)
+            Invalid_Parameter = pywbem.Uint32(5)
+            # DMTF_Reserved = ..
+            Method_Parameters_Checked___Job_Started = pywbem.Uint32(4096)
+            # Method_Reserved = 4097..32767
+            # Vendor_Specific = 32768..65535
+
         class CreateOrModifyPartition(object):
             Success = pywbem.Uint32(0)
             Not_Supported = pywbem.Uint32(1)
@@ -198,6 +198,11 @@ class LMI_FileSystemConfigurationService(ServiceProvider):
                 owning_element=self._get_instance_name())
         job.set_execute_action(self._create_fs,
                 job, device_strings, fmt, param_elementname, goal)
+        job.set_resources(
+                openlmi.storage.util.storage.get_device_resources(
+                        self.storage, devices))
+        # mkfs may take long time, let quicker jobs go first
+        job.priority = Job.PRIORITY_LOW
 
         # prepare output arguments
         outparams = [ pywbem.CIMParameter(
@@ -239,15 +244,21 @@ class LMI_FileSystemConfigurationService(ServiceProvider):
         devices = []
         # convert strings back to devices
         for devname in device_strings:
-            device = self.storage.devicetree.getDeviceByPath(devname)
+            device = self.storage.get_device_by_path(devname)
             if not device:
                 raise pywbem.CIMError(pywbem.CIM_ERR_FAILED,
                         "One of the devices disappeared: " + devname)
             devices.append(device)
-        action = blivet.ActionCreateFormat(devices[0],
-                format=fmt)
-        openlmi.storage.util.storage.do_storage_action(
-                self.storage, action)
+        # the action modifies the device, register it at once
+        self.storage.acquire_write()
+        try:
+            action = blivet.ActionCreateFormat(devices[0],
+                    format=fmt)
+            batch = openlmi.storage.util.storage.register_actions(
+                    self.storage, [action])
+        finally:
+            self.storage.release_write()
+        openlmi.storage.util.storage.process_actions(self.storage, batch)
         fmtprovider = self.provider_manager.get_provider_for_format(
                 devices[0], fmt)
         outparams = {
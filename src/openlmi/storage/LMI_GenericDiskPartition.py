@@ -42,7 +42,8 @@ class LMI_GenericDiskPartition(ExtentProvider):
             StorageDevice class.
         """
         if isinstance(device, blivet.devices.PartitionDevice):
-            if device.parents[0].format.labelType == 'msdos':
+            fmt = self.storage.get_format(device.disk)
+            if fmt and fmt.labelType == 'msdos':
                 return False
             return True
         return False
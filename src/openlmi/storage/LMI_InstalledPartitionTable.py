@@ -79,7 +79,8 @@ class LMI_InstalledPartitionTable(BaseProvider):
 
         for device in self.storage.devices:
             fmt_class = blivet.formats.disklabel.DiskLabel
-            if device.format and isinstance(device.format, fmt_class):
+            fmt = self.storage.get_format(device)
+            if fmt and isinstance(fmt, fmt_class):
                 model['Antecedent'] = self.provider_manager.get_name_for_device(
                         device)
                 model['Dependent'] = self.get_capabilities_name_for_device(
@@ -18,80 +18,24 @@
 # -*- coding: utf-8 -*-
 """ Module for LMI_LVBasedOn class."""
 
-from openlmi.storage.BaseProvider import BaseProvider
-import pywbem
-import blivet
+from openlmi.storage.BasedOnProvider import BasedOnProvider
 import openlmi.common.cmpi_logging as cmpi_logging
 
-class LMI_LVBasedOn(BaseProvider):
+class LMI_LVBasedOn(BasedOnProvider):
     """
         Implementation of LMI_LVBasedOn class.
-        This class is not subclass of BasedOnProvider, because we need
-        to associate a LV with all PVs of the VG.
-        BasedOnProvider would associate LV with its VG.
+        It associates a LV with all PVs of the VG, base devices of
+        the LV would be its VG.
     """
     @cmpi_logging.trace_method
     def __init__(self, *args, **kwargs):
         super(LMI_LVBasedOn, self).__init__(*args, **kwargs)
 
     @cmpi_logging.trace_method
-    def enum_instances(self, env, model, keys_only):
+    def enumerate_edges(self):
         """
-            Provider implementation of EnumerateInstances intrinsic method.
+            Enumerate all (LV, PV) tuples.
         """
-        model.path.update({'Dependent': None, 'Antecedent': None})
-
         for device in self.storage.lvs:
-            provider = self.provider_manager.get_provider_for_device(device)
-            if not provider:
-                raise pywbem.CIMError(pywbem.CIM_ERR_FAILED,
-                        "Cannot find provider for device " + device.path)
-            vg = device.vg
-            for base in vg.parents:
-                model['Dependent'] = provider.get_name_for_device(device)
-                model['Antecedent'] = self.provider_manager.get_name_for_device(
-                        base)
-                if keys_only:
-                    yield model
-                else:
-                    yield self.get_instance(env, model, device, base)
-
-    @cmpi_logging.trace_method
-    # pylint: disable-msg=W0221
-    def get_instance(self, env, model, device=None, base=None):
-        """
-            Provider implementation of GetInstance intrinsic method.
-            It just checks if Dependent and Antecedent are related.
-        """
-        if not device:
-            device = self.provider_manager.get_device_for_name(
-                    model['Dependent'])
-        if not device:
-            raise pywbem.CIMError(pywbem.CIM_ERR_NOT_FOUND,
-                    "Cannot find Dependent device")
-
-        if not base:
-            base = self.provider_manager.get_device_for_name(
-                    model['Antecedent'])
-        if not base:
-            raise pywbem.CIMError(pywbem.CIM_ERR_NOT_FOUND,
-                    "Cannot find Antecedent device")
-
-        if not isinstance(device,
-                    blivet.devices.LVMLogicalVolumeDevice):
-            raise pywbem.CIMError(pywbem.CIM_ERR_NOT_FOUND,
-                    "Dependend device is not logical volume: " + device.path)
-        if not (base in device.vg.parents):
-            raise pywbem.CIMError(pywbem.CIM_ERR_NOT_FOUND,
-                    "Antecedent is not related to Dependent device")
-
-        return model
-
-    @cmpi_logging.trace_method
-    def references(self, env, object_name, model, result_class_name, role,
-                   result_role, keys_only):
-        """Instrument Associations."""
-        return self.simple_references(env, object_name, model,
-                result_class_name, role, result_role, keys_only,
-                "CIM_StorageExtent",
-                "CIM_StorageExtent")
+            for base in self.storage.get_parents(device.vg):
+                yield (device, base)
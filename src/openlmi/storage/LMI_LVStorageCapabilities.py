@@ -18,12 +18,12 @@
 # -*- coding: utf-8 -*-
 """ Module for LMI_LVStorageCapabilities class."""
 
-from openlmi.storage.CapabilitiesProvider import CapabilitiesProvider
+from openlmi.storage.CapabilitiesProvider import CapabilitiesProvider, \
+        ElementCapabilitiesProvider
 import openlmi.common.cmpi_logging as cmpi_logging
 from openlmi.storage.SettingManager import StorageSetting
 import pywbem
 import blivet.devices
-from openlmi.storage.BaseProvider import BaseProvider
 
 class LMI_LVStorageCapabilities(CapabilitiesProvider):
     """ Provider of LMI_LVStorageCapabilities class."""
@@ -42,7 +42,7 @@ class LMI_LVStorageCapabilities(CapabilitiesProvider):
         path = self.parse_instance_id(instance_id)
         if not path:
             return None
-        device = self.storage.devicetree.getDeviceByPath(path)
+        device = self.storage.get_device_by_path(path)
         if not device:
             return None
         if not isinstance(device,
@@ -159,7 +159,7 @@ class LMI_LVStorageCapabilities(CapabilitiesProvider):
         path = self.parse_instance_id(instance_id)
         if not path:
             return None
-        device = self.storage.devicetree.getDeviceByPath(path)
+        device = self.storage.get_device_by_path(path)
         if not device:
             return None
         if not isinstance(device,
@@ -229,23 +229,17 @@ class LMI_LVStorageCapabilities(CapabilitiesProvider):
                 Default = pywbem.Uint16(2)
                 Goal = pywbem.Uint16(3)
 
-class LMI_LVElementCapabilities(BaseProvider):
+class LMI_LVElementCapabilities(ElementCapabilitiesProvider):
     """
-        Base class for LMI_*ElementCapabilities providers.
-        
-        If all capabilities instances are associated only with appropriate
-        LMI_*Service, this class does not need to be subclasses.
-        
-        Otherwise, subclasses can associate capabilities to other managed
-        elements.
+        Implementation of LMI_LVElementCapabilities, which associates
+        LMI_LVStorageCapabilities to appropriate LMI_VGStoragePool.
     """
     @cmpi_logging.trace_method
     def __init__(self, classname, capabilities_provider, device_provider,
             *args, **kwargs):
-        self.classname = classname
-        self.capabilities_provider = capabilities_provider
         self.device_provider = device_provider
-        super(LMI_LVElementCapabilities, self).__init__(*args, **kwargs)
+        super(LMI_LVElementCapabilities, self).__init__(
+                classname, capabilities_provider, None, *args, **kwargs)
 
     @cmpi_logging.trace_method
     def enumerate_capabilities(self):
@@ -254,11 +248,7 @@ class LMI_LVElementCapabilities(BaseProvider):
             where managed_element_name and capabilities_name
             are CIMInstanceName.
             
-            By default, all capabilities provided by capabilities_provider
-            are associated to service_provider.
-            
-            Subclasses can override this method if different behavior is
-            requested.
+            All capabilities are associated to their storage pools.
         """
         for capabilities in self.capabilities_provider.enumerate_capabilities():
 
@@ -266,25 +256,33 @@ class LMI_LVElementCapabilities(BaseProvider):
             managed_element_name = provider.get_pool_name_for_capabilities(
                     capabilities['InstanceID'])
 
-            capabilities_name = pywbem.CIMInstanceName(
-                    classname=self.capabilities_provider.classname,
-                    namespace=self.config.namespace,
-                    keybindings={'InstanceID' : capabilities['InstanceID']})
+            capabilities_name = self._get_capabilities_name(
+                    capabilities['InstanceID'])
             yield (managed_element_name, capabilities_name)
 
     @cmpi_logging.trace_method
-    def enum_instances(self, env, model, keys_only):
+    def get_element_name_for_capabilities(self, instance_id):
         """
-            Provider implementation of EnumerateInstances intrinsic method.
+            Return CIMInstanceName of storage pool associated to
+            capabilities with given InstanceID.
+            Return None if there is no such capabilities.
         """
-        model.path.update({'Capabilities': None, 'ManagedElement': None})
-        for (managed_element, capabilities) in self.enumerate_capabilities():
-            model['Capabilities'] = capabilities
-            model['ManagedElement'] = managed_element
-            if keys_only:
-                yield model
-            else:
-                yield self.get_instance(env, model, capabilities)
+        return self.capabilities_provider.get_pool_name_for_capabilities(
+                instance_id)
+
+    @cmpi_logging.trace_method
+    def enumerate_capabilities_for_element(self, element_name):
+        """
+            Return iterable with (managed_element_name, capabilities_name)
+            of storage pool with given CIMInstanceName.
+        """
+        device = self.device_provider.get_device_for_name(element_name)
+        if not device:
+            return []
+        instance_id = self.capabilities_provider.create_capabilities_id(
+                device.path)
+        return [(self.device_provider.get_name_for_device(device),
+                self._get_capabilities_name(instance_id))]
 
     @cmpi_logging.trace_method
     # pylint: disable-msg=W0221
@@ -316,16 +314,6 @@ class LMI_LVElementCapabilities(BaseProvider):
 
         return model
 
-    @cmpi_logging.trace_method
-    def references(self, env, object_name, model, result_class_name, role,
-                   result_role, keys_only):
-        """Instrument Associations. """
-        return self.simple_references(env, object_name, model,
-                result_class_name, role, result_role, keys_only,
-                "CIM_Capabilities",
-                "CIM_ManagedElement")
-
-
     class Values(object):
         class Characteristics(object):
             Default = pywbem.Uint16(2)
@@ -63,16 +63,15 @@ class LMI_LVStorageExtent(ExtentProvider, SettingHelper):
         return device.lvname
 
     @cmpi_logging.trace_method
-    def get_instance(self, env, model, device=None):
+    def render_instance(self, env, model, device):
         """
             Add LV-specific properties.
         """
-        model = super(LMI_LVStorageExtent, self).get_instance(
+        model = super(LMI_LVStorageExtent, self).render_instance(
                 env, model, device)
-        if not device:
-            device = self._get_device(model)
 
-        model['UUID'] = device.uuid
+        if self.is_requested(model, 'UUID'):
+            model['UUID'] = device.uuid
 
         return model
 
@@ -107,7 +106,7 @@ class LMI_LVStorageExtent(ExtentProvider, SettingHelper):
         path = setting_provider.parse_setting_id(instance_id)
         if not path:
             return None
-        device = self.storage.devicetree.getDeviceByPath(path)
+        device = self.storage.get_device_by_path(path)
         if not path:
             return None
         if not isinstance(device,
@@ -117,6 +116,18 @@ class LMI_LVStorageExtent(ExtentProvider, SettingHelper):
             return None
         return self._get_setting_for_device(device, setting_provider)
 
+    @cmpi_logging.trace_method
+    def get_setting_id_for_element(self, setting_provider, element_name):
+        """
+            Return InstanceID of setting associated to ManagedElement with
+            given CIMInstanceName by ElementSettingData association.
+            Return None if no such setting exists.
+        """
+        device = self.get_device_for_name(element_name)
+        if not device or not self.provides_device(device):
+            return None
+        return setting_provider.create_setting_id(device.path)
+
     @cmpi_logging.trace_method
     def get_associated_element_name(self, setting_provider, instance_id):
         """
@@ -127,7 +138,7 @@ class LMI_LVStorageExtent(ExtentProvider, SettingHelper):
         path = setting_provider.parse_setting_id(instance_id)
         if not path:
             return None
-        device = self.storage.devicetree.getDeviceByPath(path)
+        device = self.storage.get_device_by_path(path)
         if not path:
             return None
         if not isinstance(device,
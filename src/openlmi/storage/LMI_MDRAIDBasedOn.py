@@ -51,6 +51,7 @@ class LMI_MDRAIDBasedOn(BasedOnProvider):
             base = self.provider_manager.get_device_for_name(
                     model['Antecedent'])
 
-        model['OrderIndex'] = pywbem.Uint16(device.parents.index(base) + 1)
+        parents = self.storage.get_parents(device)
+        model['OrderIndex'] = pywbem.Uint16(parents.index(base) + 1)
 
         return model
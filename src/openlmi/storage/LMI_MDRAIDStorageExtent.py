@@ -61,16 +61,15 @@ class LMI_MDRAIDStorageExtent(ExtentProvider, SettingHelper):
             yield device
 
     @cmpi_logging.trace_method
-    def get_redundancy(self, device):
+    def compute_redundancy(self, device, base_redundancies):
         """
-            Returns redundancy characteristics for given Anaconda StorageDevice.
+            Compute redundancy characteristics for given Anaconda
+            StorageDevice from redundancies of its RAID members.
         """
-        parents = self.get_base_devices(device)
-        # find all parents and get their redundancy
-        redundancies = [self._find_redundancy(dev) for dev in parents]
         if device.level in [0, 1, 4, 5, 6, 10]:
             final_redundancy = DeviceProvider.Redundancy \
-                    .get_common_redundancy_list(redundancies, device.level)
+                    .get_common_redundancy_list(base_redundancies,
+                            device.level)
         else:
             raise pywbem.CIMError(pywbem.CIM_ERR_FAILED,
                     "Unsupported raid type: " + str(device.level))
@@ -78,16 +77,17 @@ class LMI_MDRAIDStorageExtent(ExtentProvider, SettingHelper):
         return final_redundancy
 
     @cmpi_logging.trace_method
-    def get_instance(self, env, model, device=None):
+    def render_instance(self, env, model, device):
         """
             Add MD RAID-specific properties.
         """
-        model = super(LMI_MDRAIDStorageExtent, self).get_instance(
+        model = super(LMI_MDRAIDStorageExtent, self).render_instance(
                 env, model, device)
-        if not device:
-            device = self._get_device(model)
-        model['UUID'] = device.uuid
+        if self.is_requested(model, 'UUID'):
+            model['UUID'] = device.uuid
 
+        if not self.is_requested(model, 'Level'):
+            return model
         if device.level == 0:
             model['Level'] = self.Values.Level.RAID0
         elif device.level == 1:
@@ -136,7 +136,7 @@ class LMI_MDRAIDStorageExtent(ExtentProvider, SettingHelper):
         path = setting_provider.parse_setting_id(instance_id)
         if not path:
             return None
-        device = self.storage.devicetree.getDeviceByPath(path)
+        device = self.storage.get_device_by_path(path)
         if not path:
             return None
         if not isinstance(device, blivet.devices.MDRaidArrayDevice):
@@ -145,6 +145,18 @@ class LMI_MDRAIDStorageExtent(ExtentProvider, SettingHelper):
             return None
         return self._get_setting_for_device(device, setting_provider)
 
+    @cmpi_logging.trace_method
+    def get_setting_id_for_element(self, setting_provider, element_name):
+        """
+            Return InstanceID of setting associated to ManagedElement with
+            given CIMInstanceName by ElementSettingData association.
+            Return None if no such setting exists.
+        """
+        device = self.get_device_for_name(element_name)
+        if not device or not self.provides_device(device):
+            return None
+        return setting_provider.create_setting_id(device.path)
+
     @cmpi_logging.trace_method
     def get_associated_element_name(self, setting_provider, instance_id):
         """
@@ -155,7 +167,7 @@ class LMI_MDRAIDStorageExtent(ExtentProvider, SettingHelper):
         path = setting_provider.parse_setting_id(instance_id)
         if not path:
             return None
-        device = self.storage.devicetree.getDeviceByPath(path)
+        device = self.storage.get_device_by_path(path)
         if not path:
             return None
         if not isinstance(device, blivet.devices.MDRaidArrayDevice):
@@ -20,7 +20,6 @@
 
 from openlmi.storage.BasedOnProvider import BasedOnProvider
 import pywbem
-import openlmi.storage.util.storage as storage
 import openlmi.common.cmpi_logging as cmpi_logging
 
 class LMI_PartitionBasedOn(BasedOnProvider):
@@ -42,12 +41,28 @@ class LMI_PartitionBasedOn(BasedOnProvider):
         """
         return self.storage.partitions
 
+    @cmpi_logging.trace_method
+    def get_geometry(self, device):
+        """
+            Return (number, start, end, metadata start) of given partition,
+            as in the current snapshot.
+        """
+        geometry = self.storage.get_partition_geometry(device)
+        if not geometry:
+            raise pywbem.CIMError(pywbem.CIM_ERR_FAILED,
+                    'Cannot find the partition on the disk.')
+        return geometry
+
     @cmpi_logging.trace_method
     def get_logical_partition_start(self, device):
         """
             Return starting address of logical's partition metadata.
         """
-        return storage.get_logical_partition_start(device)
+        start = self.get_geometry(device)[3]
+        if start is None:
+            raise pywbem.CIMError(pywbem.CIM_ERR_FAILED,
+                    'Cannot find metadata for the partition.')
+        return start
 
     @cmpi_logging.trace_method
     def get_mbr_instance(self, model, device, base):
@@ -57,12 +72,12 @@ class LMI_PartitionBasedOn(BasedOnProvider):
             return self.get_gpt_instance(model, device, base)
 
         # startaddress is relative to the beginning of the extended partition
-        base_start = base.partedPartition.geometry.start
+        base_start = self.get_geometry(base)[1]
         # find the metadata
         start = self.get_logical_partition_start(device)
-        end = device.partedPartition.geometry.end
+        (number, _start, end, _metadata) = self.get_geometry(device)
 
-        model['OrderIndex'] = pywbem.Uint16(device.partedPartition.number)
+        model['OrderIndex'] = pywbem.Uint16(number)
         model['StartingAddress'] = pywbem.Uint64(start - base_start)
         model['EndingAddress'] = pywbem.Uint64(end - base_start)
         return model
@@ -71,11 +86,10 @@ class LMI_PartitionBasedOn(BasedOnProvider):
     # pylint: disable-msg=W0613
     def get_gpt_instance(self, model, device, base):
         """ Fill instance of PartitionBasedOn class with GPT positions. """
-        model['OrderIndex'] = pywbem.Uint16(device.partedPartition.number)
-        model['StartingAddress'] = \
-            pywbem.Uint64(device.partedPartition.geometry.start)
-        model['EndingAddress'] = \
-            pywbem.Uint64(device.partedPartition.geometry.end)
+        (number, start, end, _metadata) = self.get_geometry(device)
+        model['OrderIndex'] = pywbem.Uint16(number)
+        model['StartingAddress'] = pywbem.Uint64(start)
+        model['EndingAddress'] = pywbem.Uint64(end)
         return model
 
     @cmpi_logging.trace_method
@@ -90,10 +104,11 @@ class LMI_PartitionBasedOn(BasedOnProvider):
             base = self.provider_manager.get_device_for_name(
                     model['Antecedent'])
 
+        fmt = self.storage.get_format(base)
         if device.isLogical:
             model = self.get_mbr_instance(model, device, base)
-        elif base.format.labelType == 'msdos':
+        elif fmt.labelType == 'msdos':
             model = self.get_mbr_instance(model, device, base)
-        elif base.format.labelType == 'gpt':
+        elif fmt.labelType == 'gpt':
             model = self.get_gpt_instance(model, device, base)
         return model
@@ -135,7 +135,7 @@ class LMI_StorageConfigurationService(ServiceProvider):
         return self._check_redundancy_setting(redundancy, setting)
 
     @cmpi_logging.trace_method
-    def _modify_lv(self, device, name, size):
+    def _modify_lv(self, device, name, size, transaction=None):
         """
             Really modify the logical volume, all parameters were checked.
         """
@@ -152,11 +152,16 @@ class LMI_StorageConfigurationService(ServiceProvider):
             newsize = device.vg.align(float(size) / units.MEGABYTE, True)
             oldsize = device.vg.align(device.size, False)
             if newsize != oldsize:
-                action = blivet.deviceaction.ActionResizeDevice(
-                        device, newsize)
-                storage.do_storage_action(self.storage, action)
-                self.storage.devicetree.processActions(dryRun=False)
-                self.storage.reset()
+                # the action modifies the device, register it at once
+                self.storage.acquire_write()
+                try:
+                    action = blivet.deviceaction.ActionResizeDevice(
+                            device, newsize)
+                    batch = storage.register_actions(self.storage,
+                            [action], transaction)
+                finally:
+                    self.storage.release_write()
+                storage.process_actions(self.storage, batch)
 
         newsize = device.size * units.MEGABYTE
         outparams.append(pywbem.CIMParameter(
@@ -174,7 +179,7 @@ class LMI_StorageConfigurationService(ServiceProvider):
 
 
     @cmpi_logging.trace_method
-    def _create_lv(self, pool, name, size):
+    def _create_lv(self, pool, name, size, transaction=None):
         """
             Really create the logical volume, all parameters were checked.
         """
@@ -188,7 +193,7 @@ class LMI_StorageConfigurationService(ServiceProvider):
 
         lv = self.storage.newLV(**args)
         action = blivet.deviceaction.ActionCreateDevice(lv)
-        storage.do_storage_action(self.storage, action)
+        storage.do_storage_action(self.storage, action, transaction)
 
         newsize = lv.size * units.MEGABYTE
         outparams = [
@@ -274,7 +279,9 @@ class LMI_StorageConfigurationService(ServiceProvider):
                                     param_goal=None,
                                     param_theelement=None,
                                     param_inpool=None,
-                                    param_size=None):
+                                    param_size=None,
+                                    param_asynchronous=None,
+                                    param_transaction=None):
         """
             Implements LMI_StorageConfigurationService.CreateOrModifyLV()
 
@@ -330,10 +337,28 @@ class LMI_StorageConfigurationService(ServiceProvider):
                     "Parameter Size must be set when creating a logical"\
                     " volume.")
 
+        if self.is_asynchronous(param_asynchronous, param_transaction):
+            if device:
+                job_name = "MODIFY LV " + device.path
+            else:
+                job_name = "CREATE LV ON " + pool.path
+            return self.start_method_job(env, object_name,
+                    "CreateOrModifyLV", job_name,
+                    {
+                        'ElementName': param_elementname,
+                        'Goal': param_goal,
+                        'TheElement': param_theelement,
+                        'InPool': param_inpool,
+                        'Size': param_size,
+                    },
+                    [param_theelement, param_inpool])
+
         if device:
-            return self._modify_lv(device, param_elementname, param_size)
+            return self._modify_lv(device, param_elementname, param_size,
+                    param_transaction)
         else:
-            return self._create_lv(pool, param_elementname, param_size)
+            return self._create_lv(pool, param_elementname, param_size,
+                    param_transaction)
 
 
     @cmpi_logging.trace_method
@@ -415,19 +440,10 @@ class LMI_StorageConfigurationService(ServiceProvider):
 
 
     @cmpi_logging.trace_method
-    def _create_vg(self, goal, devices, name):
+    def _create_vg(self, goal, devices, name, transaction=None):
         """
             Create new  Volume Group. The parameters were already checked.
         """
-        for device in devices:
-            # TODO: check if it is unused!
-            if not (device.format
-                    and isinstance(device.format,
-                        blivet.formats.lvmpv.LVMPhysicalVolume)):
-                # create the pv format there
-                pv = blivet.formats.getFormat('lvmpv')
-                self.storage.formatDevice(device, pv)
-
         args = {}
         args['parents'] = devices
         if goal and goal['ExtentSize']:
@@ -437,9 +453,37 @@ class LMI_StorageConfigurationService(ServiceProvider):
 
         storage.log_storage_call("CREATE VG", args)
 
-        vg = self.storage.newVG(**args)
-        action = blivet.ActionCreateDevice(vg)
-        storage.do_storage_action(self.storage, action)
+        # The format actions modify the devices as soon as they are
+        # created, so hold the write lock until they are registered.
+        self.storage.acquire_write()
+        try:
+            actions = []
+            try:
+                for device in devices:
+                    # TODO: check if it is unused!
+                    if not (device.format
+                            and isinstance(device.format,
+                                blivet.formats.lvmpv.LVMPhysicalVolume)):
+                        # create the pv format there
+                        pv = blivet.formats.getFormat('lvmpv')
+                        actions.append(
+                                blivet.deviceaction.ActionDestroyFormat(
+                                        device))
+                        actions.append(
+                                blivet.deviceaction.ActionCreateFormat(
+                                        device, pv))
+
+                vg = self.storage.newVG(**args)
+                actions.append(blivet.ActionCreateDevice(vg))
+            except Exception:
+                for action in reversed(actions):
+                    action.cancel()
+                raise
+            batch = storage.register_actions(self.storage, actions,
+                    transaction)
+        finally:
+            self.storage.release_write()
+        storage.process_actions(self.storage, batch)
 
         newsize = vg.size * units.MEGABYTE
         outparams = [
@@ -489,7 +533,9 @@ class LMI_StorageConfigurationService(ServiceProvider):
                                     param_elementname=None,
                                     param_goal=None,
                                     param_inextents=None,
-                                    param_pool=None):
+                                    param_pool=None,
+                                    param_asynchronous=None,
+                                    param_transaction=None):
         """
             Implements LMI_StorageConfigurationService.CreateOrModifyVG()
 
@@ -525,10 +571,26 @@ class LMI_StorageConfigurationService(ServiceProvider):
             raise pywbem.CIMError(pywbem.CIM_ERR_INVALID_PARAMETER,
                     "Either Pool or InExtents must be specified")
 
+        if self.is_asynchronous(param_asynchronous, param_transaction):
+            if pool:
+                job_name = "MODIFY VG " + pool.name
+            else:
+                job_name = "CREATE VG ON " + " ".join(
+                        [device.path for device in devices])
+            return self.start_method_job(env, object_name,
+                    "CreateOrModifyVG", job_name,
+                    {
+                        'ElementName': param_elementname,
+                        'Goal': param_goal,
+                        'InExtents': param_inextents,
+                        'Pool': param_pool,
+                    },
+                    (param_inextents or []) + [param_pool])
+
         if pool:
             return self._modify_vg(pool, goal, devices, name)
         else:
-            return self._create_vg(goal, devices, name)
+            return self._create_vg(goal, devices, name, param_transaction)
 
 
     @cmpi_logging.trace_method
@@ -695,7 +757,7 @@ class LMI_StorageConfigurationService(ServiceProvider):
 
     @cmpi_logging.trace_method
     # pylint: disable-msg=W0613
-    def _create_mdraid(self, level, goal, devices, name):
+    def _create_mdraid(self, level, goal, devices, name, transaction=None):
         """
             Create new  MD RAID. The parameters were already checked.
         """
@@ -711,7 +773,7 @@ class LMI_StorageConfigurationService(ServiceProvider):
 
         raid = self.storage.newMDArray(**args)
         action = blivet.ActionCreateDevice(raid)
-        storage.do_storage_action(self.storage, action)
+        storage.do_storage_action(self.storage, action, transaction)
 
         newsize = raid.size * units.MEGABYTE
         outparams = [
@@ -742,7 +804,9 @@ class LMI_StorageConfigurationService(ServiceProvider):
                                         param_theelement=None,
                                         param_goal=None,
                                         param_level=None,
-                                        param_inextents=None):
+                                        param_inextents=None,
+                                        param_asynchronous=None,
+                                        param_transaction=None):
         """
             Implements LMI_StorageConfigurationService.CreateOrModifyMDRAID()
 
@@ -755,6 +819,9 @@ class LMI_StorageConfigurationService(ServiceProvider):
         """
         # check parameters
         self.check_instance(object_name)
+        # Level may be computed from Goal below, remember the original one
+        # for a job
+        level = param_level
 
         goal = self._parse_goal(param_goal, "LMI_MDRAIDStorageSetting")
         raid = self._parse_element(param_theelement,
@@ -813,13 +880,102 @@ class LMI_StorageConfigurationService(ServiceProvider):
             raise pywbem.CIMError(pywbem.CIM_ERR_INVALID_PARAMETER,
                     "Either TheElement or InExtents must be specified")
 
+        if self.is_asynchronous(param_asynchronous, param_transaction):
+            if raid:
+                job_name = "MODIFY MDRAID " + raid.path
+            else:
+                job_name = "CREATE MDRAID ON " + " ".join(
+                        [device.path for device in devices])
+            return self.start_method_job(env, object_name,
+                    "CreateOrModifyMDRAID", job_name,
+                    {
+                        'ElementName': param_elementname,
+                        'TheElement': param_theelement,
+                        'Goal': param_goal,
+                        'Level': level,
+                        'InExtents': param_inextents,
+                    },
+                    (param_inextents or []) + [param_theelement])
+
         if raid:
             return self._modify_mdraid(raid, param_level, goal, devices, name)
         else:
-            return self._create_mdraid(param_level, goal, devices, name)
+            return self._create_mdraid(param_level, goal, devices, name,
+                    param_transaction)
+
+
+    @cmpi_logging.trace_method
+    def cim_method_begintransaction(self, env, object_name,
+                                    param_timeout=None):
+        """
+            Implements LMI_StorageConfigurationService.BeginTransaction()
+
+            Start a transaction and return its ID in Transaction output
+            parameter. Subsequent modifications of storage devices with
+            this Transaction parameter are only checked and planned in
+            a private copy of the device tree, they are performed all at
+            once by CommitTransaction(). Other modifications are not
+            blocked, CommitTransaction() fails if they modify the same
+            devices.
+        """
+        self.check_instance(object_name)
+        if param_timeout is None:
+            param_timeout = self.config.transaction_timeout
+        transaction_id = storage.begin_transaction(self.storage,
+                param_timeout)
+        outparams = [pywbem.CIMParameter(
+                name='transaction',
+                type='string',
+                value=transaction_id)]
+        return (self.Values.BeginTransaction.Success, outparams)
+
+    @cmpi_logging.trace_method
+    def cim_method_committransaction(self, env, object_name,
+                                     param_transaction=None):
+        """
+            Implements LMI_StorageConfigurationService.CommitTransaction()
+
+            Perform all modifications planned in given transaction.
+        """
+        self.check_instance(object_name)
+        if not param_transaction:
+            raise pywbem.CIMError(pywbem.CIM_ERR_INVALID_PARAMETER,
+                    "Parameter Transaction is mandatory.")
+        storage.commit_transaction(self.storage, param_transaction)
+        return (self.Values.CommitTransaction.Success, [])
+
+    @cmpi_logging.trace_method
+    def cim_method_rollbacktransaction(self, env, object_name,
+                                       param_transaction=None):
+        """
+            Implements LMI_StorageConfigurationService.RollbackTransaction()
+
+            Cancel all modifications planned in given transaction.
+        """
+        self.check_instance(object_name)
+        if not param_transaction:
+            raise pywbem.CIMError(pywbem.CIM_ERR_INVALID_PARAMETER,
+                    "Parameter Transaction is mandatory.")
+        storage.rollback_transaction(self.storage, param_transaction)
+        return (self.Values.RollbackTransaction.Success, [])
 
 
     class Values(ServiceProvider.Values):
+        class BeginTransaction(object):
+            Success = pywbem.Uint32(0)
+            Not_Supported = pywbem.Uint32(1)
+            Failed = pywbem.Uint32(4)
+
+        class CommitTransaction(object):
+            Success = pywbem.Uint32(0)
+            Not_Supported = pywbem.Uint32(1)
+            Failed = pywbem.Uint32(4)
+
+        class RollbackTransaction(object):
+            Success = pywbem.Uint32(0)
+            Not_Supported = pywbem.Uint32(1)
+            Failed = pywbem.Uint32(4)
+
         class CreateOrModifyElementFromStoragePool(object):
             Job_Completed_with_No_Error = pywbem.Uint32(0)
             Not_Supported = pywbem.Uint32(1)
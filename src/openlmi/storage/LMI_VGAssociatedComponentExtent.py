@@ -18,79 +18,27 @@
 # -*- coding: utf-8 -*-
 """ Module for LMI_VGAssociatedComponentExtent class."""
 
-from openlmi.storage.BaseProvider import BaseProvider
-import pywbem
-import blivet
+from openlmi.storage.BasedOnProvider import BasedOnProvider
 import openlmi.common.cmpi_logging as cmpi_logging
 
-class LMI_VGAssociatedComponentExtent(BaseProvider):
+class LMI_VGAssociatedComponentExtent(BasedOnProvider):
     """
         Implementation of LMI_VGAssociatedComponentExtent class.
+        It associates VGs with their PVs, using the same index as BasedOn
+        associations.
     """
+    dependent_role = 'GroupComponent'
+    antecedent_role = 'PartComponent'
+
     @cmpi_logging.trace_method
     def __init__(self, *args, **kwargs):
         super(LMI_VGAssociatedComponentExtent, self).__init__(*args, **kwargs)
 
     @cmpi_logging.trace_method
-    def enum_instances(self, env, model, keys_only):
+    def enumerate_edges(self):
         """
-            Provider implementation of EnumerateInstances intrinsic method.
+            Enumerate all (VG, PV) tuples.
         """
-        model.path.update({'GroupComponent': None, 'PartComponent': None})
-
         for vg in self.storage.vgs:
-            vgprovider = self.provider_manager.get_provider_for_device(vg)
-            if not vgprovider:
-                raise pywbem.CIMError(pywbem.CIM_ERR_FAILED,
-                        "Cannot find provider for device " + vg.path)
             for pv in vg.pvs:
-                pvprovider = self.provider_manager.get_provider_for_device(pv)
-                if not pvprovider:
-                    raise pywbem.CIMError(pywbem.CIM_ERR_FAILED,
-                            "Cannot find provider for device " + pv.path)
-
-                model['GroupComponent'] = vgprovider.get_name_for_device(vg)
-                model['PartComponent'] = pvprovider.get_name_for_device(pv)
-                if keys_only:
-                    yield model
-                else:
-                    yield self.get_instance(env, model, vg, pv)
-
-    @cmpi_logging.trace_method
-    # pylint: disable-msg=W0221
-    def get_instance(self, env, model, vg=None, pv=None):
-        """
-            Provider implementation of GetInstance intrinsic method.
-            It just checks if GroupComponent and PartComponent are related.
-        """
-        if not vg:
-            vg = self.provider_manager.get_device_for_name(
-                    model['GroupComponent'])
-        if not vg:
-            raise pywbem.CIMError(pywbem.CIM_ERR_NOT_FOUND,
-                    "Cannot find GroupComponent device")
-
-        if not pv:
-            pv = self.provider_manager.get_device_for_name(
-                    model['PartComponent'])
-        if not pv:
-            raise pywbem.CIMError(pywbem.CIM_ERR_NOT_FOUND,
-                    "Cannot find PartComponent device")
-
-        if not isinstance(vg, blivet.devices.LVMVolumeGroupDevice):
-            raise pywbem.CIMError(pywbem.CIM_ERR_NOT_FOUND,
-                    "GroupComponent device is not volume group: " + vg.path)
-        if not (pv in vg.pvs):
-            raise pywbem.CIMError(pywbem.CIM_ERR_NOT_FOUND,
-                    "GroupComponent is not related to PartComponent device")
-
-        return model
-
-    @cmpi_logging.trace_method
-    def references(self, env, object_name, model, result_class_name, role,
-                   result_role, keys_only):
-        """Instrument Associations."""
-        return self.simple_references(env, object_name, model,
-                result_class_name, role, result_role, keys_only,
-                "CIM_StorageExtent",
-                "CIM_StoragePool")
+                yield (vg, pv)
@@ -35,6 +35,7 @@ class LMI_VGStoragePool(DeviceProvider, SettingHelper):
     """
     @cmpi_logging.trace_method
     def __init__(self, *args, **kwargs):
+        self.classname = "LMI_VGStoragePool"
         super(LMI_VGStoragePool, self).__init__(
                 setting_classname='LMI_LVStorageSetting',
                 *args, **kwargs)
@@ -77,9 +78,9 @@ class LMI_VGStoragePool(DeviceProvider, SettingHelper):
             instance_id = object_name['InstanceID']
             parts = instance_id.split(":")
             vgname = parts[2]
-            for vg in self.storage.vgs:
-                if vg.name == vgname:
-                    return vg
+            device = self.storage.get_device_by_name(vgname)
+            if device and self.provides_device(device):
+                return device
             return None
 
     @cmpi_logging.trace_method
@@ -101,7 +102,7 @@ class LMI_VGStoragePool(DeviceProvider, SettingHelper):
     def get_instance(self, env, model, device=None):
         """
             Provider implementation of GetInstance intrinsic method.
-            It fills all VGStoragePool properties.
+            The properties are filled by render_instance().
         """
         if not self.provides_name(model):
             raise pywbem.CIMError(pywbem.CIM_ERR_NOT_FOUND, "Wrong keys.")
@@ -110,19 +111,26 @@ class LMI_VGStoragePool(DeviceProvider, SettingHelper):
         if not device:
             raise pywbem.CIMError(pywbem.CIM_ERR_NOT_FOUND,
                     "Cannot find the VG.")
+        return self.get_cached_instance(env, model, device)
 
+    @cmpi_logging.trace_method
+    def render_instance(self, env, model, device):
+        """
+            Fill all VGStoragePool properties.
+        """
         model['Primordial'] = False
         model['ElementName'] = device.name
         model['PoolID'] = device.name
 
+        (pe_size, extents, free_extents) = self.storage.get_extents(device)
         model['TotalManagedSpace'] = pywbem.Uint64(
-                device.extents * device.peSize * units.MEGABYTE)
+                extents * pe_size * units.MEGABYTE)
         model['RemainingManagedSpace'] = pywbem.Uint64(
-                device.freeExtents * device.peSize * units.MEGABYTE)
+                free_extents * pe_size * units.MEGABYTE)
 
-        model['ExtentSize'] = pywbem.Uint64(device.peSize * units.MEGABYTE)
-        model['TotalExtents'] = pywbem.Uint64(device.extents)
-        model['RemainingExtents'] = pywbem.Uint64(device.freeExtents)
+        model['ExtentSize'] = pywbem.Uint64(pe_size * units.MEGABYTE)
+        model['TotalExtents'] = pywbem.Uint64(extents)
+        model['RemainingExtents'] = pywbem.Uint64(free_extents)
         model['UUID'] = device.uuid
 
         return model
@@ -239,9 +247,9 @@ class LMI_VGStoragePool(DeviceProvider, SettingHelper):
 
         # TODO: check Goal setting!
 
-        extent_size = long(device.peSize * units.MEGABYTE)
-        available_size = long(
-                device.peSize * device.freeExtents * units.MEGABYTE)
+        (pe_size, _extents, free_extents) = self.storage.get_extents(device)
+        extent_size = long(pe_size * units.MEGABYTE)
+        available_size = long(pe_size * free_extents * units.MEGABYTE)
 
         out_params = []
         out_params += [pywbem.CIMParameter('minimumvolumesize', type='uint64',
@@ -261,7 +269,8 @@ class LMI_VGStoragePool(DeviceProvider, SettingHelper):
                 StorageSetting.TYPE_CONFIGURATION,
                 setting_provider.create_setting_id(device.path))
         setting.set_setting(self.get_redundancy(device))
-        setting['ExtentSize'] = device.peSize * units.MEGABYTE
+        setting['ExtentSize'] = \
+                self.storage.get_extents(device)[0] * units.MEGABYTE
         setting['ElementName'] = device.path
         return setting
 
@@ -286,7 +295,7 @@ class LMI_VGStoragePool(DeviceProvider, SettingHelper):
         path = setting_provider.parse_setting_id(instance_id)
         if not path:
             return None
-        device = self.storage.devicetree.getDeviceByPath(path)
+        device = self.storage.get_device_by_path(path)
         if not path:
             return None
         if not isinstance(device,
@@ -296,6 +305,18 @@ class LMI_VGStoragePool(DeviceProvider, SettingHelper):
             return None
         return self._get_setting_for_device(device, setting_provider)
 
+    @cmpi_logging.trace_method
+    def get_setting_id_for_element(self, setting_provider, element_name):
+        """
+            Return InstanceID of setting associated to ManagedElement with
+            given CIMInstanceName by ElementSettingData association.
+            Return None if no such setting exists.
+        """
+        device = self.get_device_for_name(element_name)
+        if not device or not self.provides_device(device):
+            return None
+        return setting_provider.create_setting_id(device.path)
+
     @cmpi_logging.trace_method
     def get_associated_element_name(self, setting_provider, instance_id):
         """
@@ -306,7 +327,7 @@ class LMI_VGStoragePool(DeviceProvider, SettingHelper):
         path = setting_provider.parse_setting_id(instance_id)
         if not path:
             return None
-        device = self.storage.devicetree.getDeviceByPath(path)
+        device = self.storage.get_device_by_path(path)
         if not path:
             return None
         if not isinstance(device,
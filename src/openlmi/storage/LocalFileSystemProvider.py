@@ -297,6 +297,11 @@ class LocalFileSystemProvider(FormatProvider, SettingHelper):
             },
         }
 
+        # Setting properties are strings, convert the values only once.
+        self.fs_setting_templates = {}
+        for (fs_type, values) in self.fs_settings.iteritems():
+            self.fs_setting_templates[fs_type] = dict(
+                    [(key, str(value)) for (key, value) in values.iteritems()])
 
     @cmpi_logging.trace_method
     # pylint: disable-msg=W0221
@@ -331,13 +336,12 @@ class LocalFileSystemProvider(FormatProvider, SettingHelper):
             Return Setting for given format.
         """
         # Table of filesystems with Setting
-        values = self.fs_settings.get(fmt.type, None)
-        if values:
+        template = self.fs_setting_templates.get(fmt.type, None)
+        if template:
             # yes, we should create Setting for this FS
             setting = Setting(Setting.TYPE_CONFIGURATION,
                     setting_provider.create_setting_id(fmt.device))
-            for (key, value) in values.iteritems():
-                setting[key] = str(value)
+            setting.properties = dict(template)
 
             # TODO: add current block size, nr. of inodes, nr. of
             return setting
@@ -349,12 +353,10 @@ class LocalFileSystemProvider(FormatProvider, SettingHelper):
             This method returns iterable with all instances of LMI_*Setting
             as Setting instances.
         """
-        for device in self.storage.devices:
-            if self.provides_format(device, device.format):
-                setting = self._get_setting_for_format(
-                        setting_provider, device.format)
-                if setting:
-                    yield setting
+        for (_device, fmt) in self.enumerate_formats():
+            setting = self._get_setting_for_format(setting_provider, fmt)
+            if setting:
+                yield setting
 
 
     @cmpi_logging.trace_method
@@ -368,12 +370,29 @@ class LocalFileSystemProvider(FormatProvider, SettingHelper):
         path = setting_provider.parse_setting_id(instance_id)
         if not path:
             return None
-        device = self.storage.devicetree.getDeviceByPath(path)
+        device = self.storage.get_device_by_path(path)
         if not device:
             return None
-        if not device.format:
+        fmt = self.storage.get_format(device)
+        if not fmt:
+            return None
+        return self._get_setting_for_format(setting_provider, fmt)
+
+    @cmpi_logging.trace_method
+    def get_setting_id_for_element(self, setting_provider, element_name):
+        """
+            Return InstanceID of setting associated to ManagedElement with
+            given CIMInstanceName by ElementSettingData association.
+            Return None if no such setting exists.
+        """
+        for key in ('CSName', 'CSCreationClassName', 'CreationClassName',
+                'Name'):
+            if not element_name.has_key(key):
+                return None
+        fmt = self.get_format_for_name(element_name)
+        if not fmt or fmt.type not in self.fs_settings:
             return None
-        return self._get_setting_for_format(setting_provider, device.format)
+        return setting_provider.create_setting_id(fmt.device)
 
     @cmpi_logging.trace_method
     def get_associated_element_name(self, setting_provider, instance_id):
@@ -386,10 +405,10 @@ class LocalFileSystemProvider(FormatProvider, SettingHelper):
         path = setting_provider.parse_setting_id(instance_id)
         if not path:
             return None
-        device = self.storage.devicetree.getDeviceByPath(path)
+        device = self.storage.get_device_by_path(path)
         if not device:
             return None
-        fmt = device.format
+        fmt = self.storage.get_format(device)
         provider = self.provider_manager.get_provider_for_format(device, fmt)
         return provider.get_name_for_format(device, fmt)
 
@@ -47,6 +47,21 @@ class ProviderManager(object):
         the LMI_HostedService can easily enumerate all services.
         The service providers must be registered by add_service_provider().
         The service providers must be subclasses of ServiceProvider class.
+
+        All lookups are dispatched through indexes, which are built when
+        the providers are registered:
+          - device providers are indexed by CIM class name of their
+            instances (provider.classname),
+          - device and format providers are memoized by type of Anaconda
+            StorageDevice / DeviceFormat (device.type / fmt.type) as they are
+            resolved,
+          - setting and capabilities providers are indexed by their class
+            names.
+        The lookup cost therefore does not depend on number of registered
+        providers.
+
+        Formats in the device tree are sorted to their format providers
+        once per StorageSnapshot, see get_formats().
     """
 
     @cmpi_logging.trace_method
@@ -57,12 +72,32 @@ class ProviderManager(object):
         self.capabilities_providers = []
         self.format_providers = []
 
+        # hash CIM classname -> device provider
+        self._name_index = {}
+        # hash device.type -> list of device providers, which provide
+        # at least one device of this type
+        self._device_index = {}
+        # hash fmt.type -> list of format providers, which provide
+        # at least one format of this type
+        self._format_index = {}
+        # hash setting classname -> setting provider
+        self._setting_index = {}
+        # hash capabilities classname -> capabilities provider
+        self._capabilities_index = {}
+
     @cmpi_logging.trace_method
     def add_device_provider(self, provider):
         """
             Add new device provider to the manager.
         """
+        if provider in self.device_providers:
+            return
         self.device_providers.append(provider)
+        classname = getattr(provider, 'classname', None)
+        if classname:
+            self._name_index[classname] = provider
+        # new provider may provide already memoized device types
+        self._device_index = {}
 
     @cmpi_logging.trace_method
     def add_setting_provider(self, provider):
@@ -70,6 +105,7 @@ class ProviderManager(object):
             Add new setting provider to the manager.
         """
         self.setting_providers.append(provider)
+        self._setting_index.setdefault(provider.setting_classname, provider)
 
     @cmpi_logging.trace_method
     def add_service_provider(self, provider):
@@ -84,6 +120,7 @@ class ProviderManager(object):
             Add new service provider to the manager.
         """
         self.capabilities_providers.append(provider)
+        self._capabilities_index.setdefault(provider.classname, provider)
 
     @cmpi_logging.trace_method
     def add_format_provider(self, provider):
@@ -91,6 +128,8 @@ class ProviderManager(object):
             Add new service provider to the manager.
         """
         self.format_providers.append(provider)
+        # new provider may provide already memoized format types
+        self._format_index = {}
 
     @cmpi_logging.trace_method
     def get_device_provider_for_name(self, object_name):
@@ -98,8 +137,18 @@ class ProviderManager(object):
             Return provider for given CIM InstanceName.
             Return None if no such provider is registered.
         """
+        if object_name.has_key('CreationClassName'):
+            classname = object_name['CreationClassName']
+        else:
+            classname = object_name.classname
+        indexed = self._name_index.get(classname, None)
+        if indexed and indexed.provides_name(object_name):
+            return indexed
+
+        # The name does not have CreationClassName of our provider,
+        # e.g. it has only InstanceID and generic classname -> full scan.
         for provider in self.device_providers:
-            if provider.provides_name(object_name):
+            if provider is not indexed and provider.provides_name(object_name):
                 return provider
         return None
 
@@ -120,10 +169,9 @@ class ProviderManager(object):
             Return provider for given Anaconda StorageDevice.
             Return None if no such provider is registered.
         """
-        for provider in self.device_providers:
-            if provider.provides_device(device):
-                return provider
-        return None
+        return self._resolve(self._device_index, device.type,
+                self.device_providers,
+                lambda provider: provider.provides_device(device))
 
     @cmpi_logging.trace_method
     def get_name_for_device(self, device):
@@ -141,9 +189,78 @@ class ProviderManager(object):
         """
             Return FormatProvider for given DeviceFormat subclass
         """
-        for prov in self.format_providers:
-            if prov.provides_format(device, fmt):
-                return prov
+        return self._resolve(self._format_index, fmt.type,
+                self.format_providers,
+                lambda provider: provider.provides_format(device, fmt))
+
+    @cmpi_logging.trace_method
+    def get_formats(self, snapshot, provider):
+        """
+            Return list of (device, fmt) tuples from given StorageSnapshot,
+            whose formats are provided by given FormatProvider.
+
+            The formats are sorted to providers in one pass over the
+            snapshot and the result is stored in the snapshot, i.e. it is
+            discarded when the device tree is refreshed.
+        """
+        index = snapshot.memo.get('formats')
+        if index is None:
+            snapshot.memo_lock.acquire()
+            try:
+                index = snapshot.memo.get('formats')
+                if index is None:
+                    index = self._build_format_index(snapshot)
+                    snapshot.memo['formats'] = index
+            finally:
+                snapshot.memo_lock.release()
+        return index.get(provider, ())
+
+    @cmpi_logging.trace_method
+    def _build_format_index(self, snapshot):
+        """
+            Return dictionary provider -> tuple of (device, fmt) with all
+            formats in given StorageSnapshot.
+        """
+        index = {}
+        for device in snapshot.devices:
+            fmt = snapshot.formats[device]
+            if not fmt:
+                continue
+            provider = self.get_provider_for_format(device, fmt)
+            if not provider:
+                continue
+            index.setdefault(provider, []).append((device, fmt))
+        for (key, formats) in index.items():
+            index[key] = tuple(formats)
+        return index
+
+    @cmpi_logging.trace_method
+    def _resolve(self, index, key, providers, check):
+        """
+            Return the first provider from given list, for which check()
+            returns True.
+            Only providers, which were already resolved for the given key,
+            are checked first. Full scan of the providers is performed only
+            when none of them matches, the result is then memoized in the
+            index.
+            
+            The check must be performed even on memoized providers, because
+            some providers do not depend on the type only (e.g. partitions
+            on msdos and gpt disks have the same type).
+        """
+        candidates = index.get(key, None)
+        if candidates:
+            for provider in candidates:
+                if check(provider):
+                    return provider
+
+        for provider in providers:
+            if check(provider):
+                if candidates is None:
+                    candidates = index[key] = []
+                if provider not in candidates:
+                    candidates.append(provider)
+                return provider
         return None
 
     @cmpi_logging.trace_method
@@ -164,9 +281,10 @@ class ProviderManager(object):
         classname = parts[1]
         if setting_classname and setting_classname != classname:
             return None
-        for provider in self.setting_providers:
-            if provider.setting_classname == classname:
-                return provider.find_instance(instance_id)
+        provider = self._setting_index.get(classname, None)
+        if provider:
+            return provider.find_instance(instance_id)
+        return None
 
     @cmpi_logging.trace_method
     def get_service_providers(self):
@@ -175,8 +293,5 @@ class ProviderManager(object):
 
     @cmpi_logging.trace_method
     def get_capabilities_provider_for_class(self, classname):
-        """ Return list of registered capabilities providers."""
-        for provider in self.capabilities_providers:
-            if provider.classname == classname:
-                return provider
-        return None
+        """ Return registered capabilities provider for given classname."""
+        return self._capabilities_index.get(classname, None)
@@ -19,8 +19,10 @@
 """ Module for ServiceProvider class."""
 
 from openlmi.storage.BaseProvider import BaseProvider
+from openlmi.storage.JobManager import Job
 import pywbem
 import openlmi.common.cmpi_logging as cmpi_logging
+import openlmi.storage.util.storage as storage
 
 class ServiceProvider(BaseProvider):
     """
@@ -28,6 +30,11 @@ class ServiceProvider(BaseProvider):
         It implements get_instance and enum_instances methods.
     """
 
+    # Priorities of jobs started by start_method_job(),
+    # CIM method name -> Job.PRIORITY_* value. Jobs of other methods get
+    # Job.PRIORITY_NORMAL.
+    job_priorities = {}
+
     @cmpi_logging.trace_method
     def __init__(self, classname, *args, **kwargs):
         super(ServiceProvider, self).__init__(*args, **kwargs)
@@ -91,6 +98,139 @@ class ServiceProvider(BaseProvider):
                     'Name': self.classname})
         return name
 
+    # pylint: disable-msg=C0103
+    def MI_invokeMethod(self, env, objectName, methodName, inputParams):
+        """
+            CIMProvider2 method. Methods with Transaction parameter, except
+            CommitTransaction() and RollbackTransaction(), are called with
+            the private device tree of the transaction, so they see devices
+            planned in the transaction and plan their actions there.
+        """
+        transaction_id = None
+        for (name, value) in inputParams.items():
+            if name.lower() == 'transaction':
+                transaction_id = value
+        if (not transaction_id or methodName.lower() in (
+                'committransaction', 'rollbacktransaction')):
+            return super(ServiceProvider, self).MI_invokeMethod(
+                    env, objectName, methodName, inputParams)
+
+        transaction = storage.enter_transaction(self.storage, transaction_id)
+        try:
+            return super(ServiceProvider, self).MI_invokeMethod(
+                    env, objectName, methodName, inputParams)
+        finally:
+            storage.leave_transaction(self.storage, transaction)
+
+    @cmpi_logging.trace_method
+    def is_asynchronous(self, param_asynchronous, param_transaction=None):
+        """
+            Return True, if a method should be executed as a job.
+            The caller can request it using Asynchronous parameter of the
+            method. If the parameter is not set, 'asynchronous_methods'
+            option from storage.ini is used.
+            Jobs are never used in a transaction, the methods just plan
+            the actions there.
+        """
+        if param_transaction:
+            return False
+        if param_asynchronous is not None:
+            return param_asynchronous
+        return self.config.asynchronous_methods
+
+    @cmpi_logging.trace_method
+    def start_method_job(self, env, object_name, method_name, job_name,
+            arguments, affected_elements):
+        """
+            Enqueue a job, which will call cim_method_<method_name> again,
+            this time synchronously.
+            Return (return value, output parameters) tuple for the CIM
+            method.
+            
+            The method is called with all its parameters again, so it
+            checks them against actual state of devices when the job is
+            executed. Therefore all parameters must be given in
+            arguments, as dictionary CIM parameter name -> value.
+        """
+        # remember input parameters for Job
+        input_arguments = {}
+        kwargs = {'param_asynchronous': False}
+        for (name, value) in arguments.iteritems():
+            kwargs['param_' + name.lower()] = value
+            if value is not None:
+                input_arguments[name] = value
+
+        affected_elements = [elem for elem in affected_elements
+                if elem is not None]
+        job = Job(
+                job_manager=self.job_manager,
+                job_name=job_name,
+                input_arguments=input_arguments,
+                method_name=method_name,
+                affected_elements=affected_elements,
+                owning_element=self._get_instance_name())
+        job.set_resources(self.get_job_resources(affected_elements))
+        job.priority = self.job_priorities.get(
+                method_name, Job.PRIORITY_NORMAL)
+        method = getattr(self, 'cim_method_' + method_name.lower())
+        job.set_execute_action(self._execute_method_job,
+                job, method, env, object_name, kwargs)
+
+        outparams = [pywbem.CIMParameter(
+                name='job',
+                type='reference',
+                value=job.get_name())]
+        retvals = getattr(self.Values, method_name)
+
+        # enqueue the job
+        self.job_manager.add_job(job)
+        return (retvals.Method_Parameters_Checked___Job_Started, outparams)
+
+    @cmpi_logging.trace_method
+    def get_job_resources(self, affected_elements):
+        """
+            Return resources of a job, which modifies given
+            CIMInstanceNames of devices. Jobs, which modify the same
+            devices, their direct parents or their children, are not
+            executed in parallel. Other jobs run their actions in
+            parallel, see storage.register_actions().
+            Return None if no device can be found, i.e. the job
+            conflicts with all other jobs.
+        """
+        devices = []
+        for name in affected_elements:
+            device = self.provider_manager.get_device_for_name(name)
+            if device:
+                devices.append(device)
+        if not devices:
+            return None
+        return storage.get_device_resources(self.storage, devices)
+
+    @cmpi_logging.trace_method
+    def _execute_method_job(self, job, method, env, object_name, kwargs):
+        """
+            Call given CIM method and finish the job with its results.
+            The job fails, if the method returns non-zero value.
+            This method is called from JobManager worker thread!
+        """
+        (retval, outparams) = method(env, object_name, **kwargs)
+        output_arguments = {}
+        for param in outparams:
+            output_arguments[param.name] = param.value
+        if retval:
+            state = Job.STATE_FAILED
+            error = pywbem.CIMError(pywbem.CIM_ERR_FAILED,
+                    "Method %s returned %d." % (method.__name__, retval))
+        else:
+            state = Job.STATE_FINISHED_OK
+            error = None
+        job.finish_method(
+                state,
+                return_value=retval,
+                return_type=Job.ReturnValueType.Uint32,
+                output_arguments=output_arguments,
+                error=error)
+
     class Values(object):
         class EnabledDefault(object):
             Enabled = pywbem.Uint16(2)
@@ -66,6 +66,22 @@ class SettingHelper(object):
         """
         return None
 
+    @cmpi_logging.trace_method
+    def get_setting_id_for_element(self, setting_provider, element_name):
+        """
+            Return InstanceID of setting associated to ManagedElement with
+            given CIMInstanceName by ElementSettingData association.
+            Return None if no such setting exists.
+
+            Subclasses should override this method, the default
+            implementation scans all settings.
+        """
+        for setting in self.enumerate_settings(setting_provider):
+            if self.get_associated_element_name(
+                    setting_provider, setting.the_id) == element_name:
+                return setting.the_id
+        return None
+
     @cmpi_logging.trace_method
     # pylint: disable-msg=W0613
     def get_supported_setting_properties(self, setting_provider):
@@ -72,6 +72,12 @@ class SettingProvider(BaseProvider):
         self.validate_properties = validate_properties
         self.ignore_defaults = ignore_defaults
 
+        # keys of configurations and their converted properties in
+        # StorageSnapshot.memo
+        self._configurations_key = ('setting_configurations',
+                setting_classname)
+        self._converted_key = ('setting_properties', setting_classname)
+
         super(SettingProvider, self).__init__(*args, **kwargs)
 
     @cmpi_logging.trace_method
@@ -87,6 +93,28 @@ class SettingProvider(BaseProvider):
         """
         return []
 
+    @cmpi_logging.trace_method
+    def get_configurations(self):
+        """
+            Return list of Setting instances returned by
+            enumerate_configurations().
+
+            The list is computed only once for each snapshot of the device
+            tree.
+        """
+        snapshot = self.storage.snapshot
+        configurations = snapshot.memo.get(self._configurations_key)
+        if configurations is None:
+            snapshot.memo_lock.acquire()
+            try:
+                configurations = snapshot.memo.get(self._configurations_key)
+                if configurations is None:
+                    configurations = list(self.enumerate_configurations())
+                    snapshot.memo[self._configurations_key] = configurations
+            finally:
+                snapshot.memo_lock.release()
+        return configurations
+
     @cmpi_logging.trace_method
     def parse_setting_id(self, instance_id):
         """
@@ -133,6 +161,22 @@ class SettingProvider(BaseProvider):
         """
         return None
 
+    @cmpi_logging.trace_method
+    def get_setting_id_for_element(self, element_name):
+        """
+            Return InstanceID of setting associated to ManagedElement with
+            given CIMInstanceName by ElementSettingData association.
+            Return None if no such setting exists.
+
+            Subclasses should override this method, the default
+            implementation scans all configurations.
+        """
+        for setting in self.get_configurations():
+            if self.get_associated_element_name(
+                    setting.the_id) == element_name:
+                return setting.the_id
+        return None
+
     @cmpi_logging.trace_method
     def enum_instances(self, env, model, keys_only):
         """
@@ -152,7 +196,7 @@ class SettingProvider(BaseProvider):
                 yield self.get_instance(env, model, setting)
 
         # handle configurations
-        for setting in self.enumerate_configurations():
+        for setting in self.get_configurations():
             model['InstanceID'] = setting.the_id
             if keys_only:
                 yield model
@@ -173,6 +217,45 @@ class SettingProvider(BaseProvider):
         # find the setting in configurations
         return self.get_configuration_for_id(instance_id)
 
+    @cmpi_logging.trace_method
+    def get_converted_properties(self, setting):
+        """
+            Return list of (property_name, CIM value) of given Setting,
+            converted using supported_properties.
+
+            The converted values of configurations, i.e. settings of
+            managed elements, are computed only once for each snapshot of
+            the device tree. Other settings are converted on each call,
+            they can be modified and created by clients at any time.
+        """
+        if setting.type != Setting.TYPE_CONFIGURATION:
+            return self._convert_properties(setting)
+
+        snapshot = self.storage.snapshot
+        snapshot.memo_lock.acquire()
+        try:
+            converted = snapshot.memo.setdefault(self._converted_key, {})
+            properties = converted.get(setting.the_id)
+            if properties is None:
+                properties = self._convert_properties(setting)
+                converted[setting.the_id] = properties
+        finally:
+            snapshot.memo_lock.release()
+        return properties
+
+    def _convert_properties(self, setting):
+        """
+            Return list of (property_name, CIM value) of given Setting,
+            converted using supported_properties.
+        """
+        properties = []
+        for (name, value) in setting.items():
+            if value is not None:
+                if self.supported_properties.has_key(name):
+                    properties.append(
+                            (name, self.supported_properties[name](value)))
+        return properties
+
     # pylint: disable-msg=W0221
     @cmpi_logging.trace_method
     def get_instance(self, env, model, setting=None):
@@ -187,10 +270,11 @@ class SettingProvider(BaseProvider):
                     "Cannot find setting.")
 
         # convert setting to model using supported_properties
-        for (name, value) in setting.items():
-            if value is not None:
-                if self.supported_properties.has_key(name):
-                    model[name] = self.supported_properties[name](value)
+        for (name, value) in self.get_converted_properties(setting):
+            if isinstance(value, list):
+                # the cached value must not be shared
+                value = list(value)
+            model[name] = value
 
         types = self.Values.ChangeableType
         if setting.type == Setting.TYPE_CONFIGURATION:
@@ -516,7 +600,7 @@ class ElementSettingDataProvider(BaseProvider):
             Provider implementation of EnumerateInstances intrinsic method.
         """
         model.path.update({'ManagedElement': None, 'SettingData': None})
-        for setting in self.setting_provider.enumerate_configurations():
+        for setting in self.setting_provider.get_configurations():
             instance_id = setting.the_id
             provider = self.setting_provider
             model['ManagedElement'] = provider.get_associated_element_name(
@@ -533,12 +617,49 @@ class ElementSettingDataProvider(BaseProvider):
     @cmpi_logging.trace_method
     def references(self, env, object_name, model, result_class_name, role,
                                result_role, keys_only):
-        # If you want to get references for free, implemented in terms
-        # of enum_instances, just leave the code below unaltered.
-        return self.simple_references(env, object_name, model,
-                result_class_name, role, result_role, keys_only,
-                self.managed_element_classname,
-                self.setting_data_classname)
+        """
+            Instrument Associations.
+            The association is resolved directly from given object_name,
+            other settings or managed elements are not enumerated.
+        """
+        if role:
+            role = role.lower()
+        if result_role:
+            result_role = result_role.lower()
+
+        if object_name.classname.lower() == self.setting_data_classname.lower():
+            if role not in (None, '', 'settingdata'):
+                return
+            if result_role not in (None, '', 'managedelement'):
+                return
+            if not object_name.has_key('InstanceID'):
+                return
+            instance_id = object_name['InstanceID']
+        else:
+            if role not in (None, '', 'managedelement'):
+                return
+            if result_role not in (None, '', 'settingdata'):
+                return
+            instance_id = self.setting_provider.get_setting_id_for_element(
+                    object_name)
+            if not instance_id:
+                return
+
+        element_name = self.setting_provider.get_associated_element_name(
+                instance_id)
+        if not element_name:
+            return
+
+        model.path.update({'ManagedElement': None, 'SettingData': None})
+        model['ManagedElement'] = element_name
+        model['SettingData'] = pywbem.CIMInstanceName(
+                classname=self.setting_data_classname,
+                namespace=self.config.namespace,
+                keybindings={'InstanceID' : instance_id})
+        if keys_only:
+            yield model
+        else:
+            yield self.get_instance(env, model)
 
 
 class SettingHelperProvider(SettingProvider):
@@ -585,3 +706,13 @@ class SettingHelperProvider(SettingProvider):
         """
         return self.setting_helper.get_associated_element_name(
                 self, instance_id)
+
+    @cmpi_logging.trace_method
+    def get_setting_id_for_element(self, element_name):
+        """
+            Return InstanceID of setting associated to ManagedElement with
+            given CIMInstanceName by ElementSettingData association.
+            Return None if no such setting exists.
+        """
+        return self.setting_helper.get_setting_id_for_element(
+                self, element_name)
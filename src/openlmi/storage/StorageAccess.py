@@ -0,0 +1,598 @@
+# Copyright (C) 2013 Red Hat, Inc.  All rights reserved.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#
+# Authors: Jan Safranek <jsafrane@redhat.com>
+# -*- coding: utf-8 -*-
+"""
+    .. autoclass:: StorageAccess
+        :members:
+
+    .. autoclass:: StorageSnapshot
+        :members:
+
+    .. autoclass:: StorageView
+        :members:
+
+    .. autoclass:: ReadWriteLock
+        :members:
+"""
+
+import os
+import threading
+import pywbem
+import openlmi.common.cmpi_logging as cmpi_logging
+import openlmi.storage.util.storage as storage
+
+class ReadWriteLock(object):
+    """
+    Reader/writer lock. Any number of readers can hold the lock at the same
+    time, a writer holds it exclusively. Waiting writers have precedence
+    over new readers, so the writers do not starve.
+
+    The lock is recursive - a thread holding the write lock can acquire it
+    again and it can also acquire the read lock. A thread holding the read
+    lock can acquire the read lock again, but it must not acquire the write
+    lock.
+    """
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        # thread -> nr. of read locks it holds
+        self._readers = {}
+        # thread, which holds the write lock
+        self._writer = None
+        # nr. of write locks held by self._writer
+        self._write_count = 0
+        # nr. of threads waiting for the write lock
+        self._waiting_writers = 0
+
+    def acquire_read(self):
+        """ Acquire the lock for reading. """
+        me = threading.current_thread()
+        self._condition.acquire()
+        try:
+            if self._writer is me or me in self._readers:
+                self._readers[me] = self._readers.get(me, 0) + 1
+                return
+            while self._writer is not None or self._waiting_writers:
+                self._condition.wait()
+            self._readers[me] = 1
+        finally:
+            self._condition.release()
+
+    def release_read(self):
+        """ Release the lock acquired by acquire_read(). """
+        me = threading.current_thread()
+        self._condition.acquire()
+        try:
+            count = self._readers[me] - 1
+            if count:
+                self._readers[me] = count
+            else:
+                del self._readers[me]
+                if not self._readers:
+                    self._condition.notify_all()
+        finally:
+            self._condition.release()
+
+    def acquire_write(self):
+        """ Acquire the lock for writing. """
+        me = threading.current_thread()
+        self._condition.acquire()
+        try:
+            if self._writer is me:
+                self._write_count += 1
+                return
+            if me in self._readers:
+                raise RuntimeError("Cannot acquire write lock while holding"
+                        " read lock.")
+            self._waiting_writers += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._condition.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writer = me
+            self._write_count = 1
+        finally:
+            self._condition.release()
+
+    def release_write(self):
+        """ Release the lock acquired by acquire_write(). """
+        self._condition.acquire()
+        try:
+            self._write_count -= 1
+            if not self._write_count:
+                self._writer = None
+                self._condition.notify_all()
+        finally:
+            self._condition.release()
+
+
+def get_sectors(device):
+    """
+    Return ((sector size, number of sectors), optimal alignment in sectors)
+    of given device. Return (None, None) if the device has no partedDevice,
+    e.g. it does not exist yet.
+    """
+    parted_device = device.partedDevice
+    if not parted_device:
+        return (None, None)
+    return ((parted_device.sectorSize, parted_device.length),
+            parted_device.optimumAlignment.grainSize)
+
+def get_partition_geometry(partition):
+    """
+    Return (number, start, end, metadata start) of given partition, in
+    sectors. Metadata start is the first sector of metadata of a logical
+    partition and it is None for other partitions. Return None, if the
+    partition has not been allocated yet.
+    """
+    parted_partition = partition.partedPartition
+    if not parted_partition:
+        return None
+    metadata_start = None
+    if partition.isLogical:
+        try:
+            metadata_start = storage.get_logical_partition_start(partition)
+        except pywbem.CIMError:
+            cmpi_logging.logger.warn("Cannot find metadata of logical"
+                    " partition %s." % (partition.path,))
+    return (parted_partition.number, parted_partition.geometry.start,
+            parted_partition.geometry.end, metadata_start)
+
+def get_extents(vg):
+    """
+    Return (extent size in MB, nr. of extents, nr. of free extents) of given
+    volume group.
+    """
+    return (vg.peSize, vg.extents, vg.freeExtents)
+
+
+class StorageSnapshot(object):
+    """
+    Snapshot of the device tree. It contains list of devices, their paths,
+    formats, parent/child links and other attributes, which are rendered
+    by providers, as they were when the snapshot was created. The snapshot
+    is immutable, it can be read without any lock while the device tree is
+    modified.
+
+    Devices can be found by their path, name, kernel name (e.g. ``dm-0``)
+    and UUID in constant time.
+    """
+    def __init__(self, storage, generation=0):
+        """
+        Create snapshot of given ``blivet.Blivet`` instance. The caller
+        must ensure that the device tree is not modified meanwhile.
+
+        :param generation: (``int``) Number of the snapshot, it increases
+            with each refresh of the device tree. It is None for snapshots
+            of private copies of the device tree, see ``StorageView``.
+        """
+        self.generation = generation
+        self.devices = tuple(storage.devices)
+        self.partitions = tuple(storage.partitions)
+        self.lvs = tuple(storage.lvs)
+        self.vgs = tuple(storage.vgs)
+        self.mdarrays = tuple(storage.mdarrays)
+
+        # device -> value
+        self.paths = {}
+        self.formats = {}
+        self.parents = {}
+        self.children = {}
+        for device in self.devices:
+            self.paths[device] = device.path
+            self.formats[device] = device.format
+            self.parents[device] = tuple(device.parents)
+            self.children[device] = []
+        for device in self.devices:
+            for parent in self.parents[device]:
+                if parent in self.children:
+                    self.children[parent].append(device)
+        for device in self.devices:
+            self.children[device] = tuple(self.children[device])
+
+        # device -> (sector size, number of sectors), None if the device
+        # has no partedDevice
+        self.sizes = {}
+        # device -> optimal alignment in sectors, None if the device
+        # has no partedDevice
+        self.alignments = {}
+        for device in self.devices:
+            (self.sizes[device], self.alignments[device]) = \
+                    get_sectors(device)
+        # partition -> (number, start, end, metadata start), see
+        # get_partition_geometry()
+        self.geometries = {}
+        # disk -> its extended partition
+        self.extended = {}
+        for device in self.partitions:
+            self.geometries[device] = get_partition_geometry(device)
+            if device.isExtended and self.parents[device]:
+                self.extended[self.parents[device][0]] = device
+        # VG -> (extent size in MB, nr. of extents, nr. of free extents)
+        self.extents = {}
+        for device in self.vgs:
+            self.extents[device] = get_extents(device)
+
+        # value -> device, the first device wins
+        self._by_path = {}
+        self._by_name = {}
+        self._by_kernel_name = {}
+        self._by_uuid = {}
+        for device in self.devices:
+            self._by_path.setdefault(self.paths[device], device)
+            self._by_name.setdefault(device.name, device)
+            sysfs_path = getattr(device, 'sysfsPath', None)
+            if sysfs_path:
+                self._by_kernel_name.setdefault(
+                        os.path.basename(sysfs_path), device)
+            uuid = getattr(device, 'uuid', None)
+            if uuid:
+                self._by_uuid.setdefault(uuid, device)
+            uuid = getattr(self.formats[device], 'uuid', None)
+            if uuid:
+                self._by_uuid.setdefault(uuid, device)
+
+        # Values computed from this snapshot, e.g. by providers. They are
+        # discarded together with the snapshot when the device tree is
+        # refreshed. Use memo_lock to compute them only once.
+        self.memo = {}
+        self.memo_lock = threading.RLock()
+
+    def get_device_by_path(self, path):
+        """ Return device with given path or None, if there is no such. """
+        return self._by_path.get(path)
+
+    def get_device_by_name(self, name):
+        """ Return device with given name or None, if there is no such. """
+        return self._by_name.get(name)
+
+    def get_device_by_kernel_name(self, name):
+        """
+        Return device with given kernel name, i.e. the name in /sys/block,
+        or None, if there is no such.
+        """
+        return self._by_kernel_name.get(name)
+
+    def get_device_by_uuid(self, uuid):
+        """
+        Return device with given UUID or device with format with given UUID.
+        Return None, if there is no such device.
+        """
+        if not uuid:
+            return None
+        return self._by_uuid.get(uuid)
+
+    def get_dependent_devices(self, device):
+        """
+        Return list of all devices, which depend on given device, i.e. its
+        children, their children etc.
+        """
+        result = []
+        found = set()
+        todo = list(self.children.get(device, ()))
+        while todo:
+            child = todo.pop()
+            if child in found:
+                continue
+            found.add(child)
+            result.append(child)
+            todo.extend(self.children.get(child, ()))
+        return result
+
+
+class StorageView(object):
+    """
+    Private copy of the device tree and its snapshot, e.g. of a transaction.
+    It is used instead of the shared device tree by the thread, which
+    entered it, see ``StorageAccess.enter_view()``.
+    """
+    def __init__(self, storage):
+        """
+        :param storage: (``blivet.Blivet``) The private copy of the device
+            tree.
+        """
+        self.blivet = storage
+        self.snapshot = StorageSnapshot(storage, None)
+
+
+class StorageAccess(object):
+    """
+    Access layer to shared ``blivet.Blivet`` instance.
+
+    The device tree is modified only by threads holding the write lock, see
+    ``acquire_write()``. Actions, which run without the lock, reserve
+    their devices, see ``reserve_devices()``. After each refresh of the device tree, the writer
+    publishes new ``StorageSnapshot``, which is used by readers - device
+    lists (``devices``, ``partitions``, ``lvs``, ``vgs`` and
+    ``mdarrays``), ``get_device_by_*`` lookups and device attributes
+    (``get_format()``, ``get_parents()``, ``get_size()`` etc.) are taken
+    from the snapshot and they do not need any lock.
+
+    All other attributes are taken from the ``blivet.Blivet`` instance.
+
+    A thread can use a private copy of the device tree instead of the
+    shared one, see ``enter_view()``.
+    """
+    @cmpi_logging.trace_method
+    def __init__(self, storage):
+        """
+        :param storage: (``blivet.Blivet``) The storage to guard.
+        """
+        self._blivet = storage
+        self._snapshot = None
+        # StorageView of the current thread, see enter_view()
+        self._local = threading.local()
+        self.lock = ReadWriteLock()
+        # names of devices modified by actions, which run without the
+        # write lock, see reserve_devices()
+        self.reserved = set()
+        self.reserved_condition = threading.Condition(threading.Lock())
+        self.publish_snapshot()
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.blivet, name)
+
+    @property
+    def blivet(self):
+        """
+        The ``blivet.Blivet`` instance, i.e. the shared one or the private
+        copy of the current thread.
+        """
+        view = self.get_view()
+        if view is not None:
+            return view.blivet
+        return self._blivet
+
+    @property
+    def snapshot(self):
+        """ The current ``StorageSnapshot`` of ``blivet``. """
+        view = self.get_view()
+        if view is not None:
+            return view.snapshot
+        return self._snapshot
+
+    @cmpi_logging.trace_method
+    def create_view(self):
+        """
+        Return new ``StorageView`` with a copy of the shared device tree.
+        The caller must hold the write lock.
+        """
+        return StorageView(self._blivet.copy())
+
+    def enter_view(self, view):
+        """
+        Use given ``StorageView`` instead of the shared device tree in the
+        current thread, until ``leave_view()`` is called. The caller must
+        ensure that no other thread uses the view meanwhile.
+        """
+        self._local.view = view
+
+    def leave_view(self):
+        """ Use the shared device tree again in the current thread. """
+        self._local.view = None
+
+    def get_view(self):
+        """
+        Return ``StorageView`` of the current thread or None, if it uses
+        the shared device tree.
+        """
+        return getattr(self._local, 'view', None)
+
+    @cmpi_logging.trace_method
+    def publish_snapshot(self):
+        """
+        Create new snapshot of the device tree and publish it to readers.
+        It should be called after each refresh of the device tree.
+        In a private view, new snapshot of the view is created.
+        """
+        view = self.get_view()
+        if view is not None:
+            view.snapshot = StorageSnapshot(view.blivet, None)
+            return
+        self.lock.acquire_read()
+        try:
+            if self._snapshot is None:
+                generation = 0
+            else:
+                generation = self._snapshot.generation + 1
+            snapshot = StorageSnapshot(self._blivet, generation)
+        finally:
+            self.lock.release_read()
+        self._snapshot = snapshot
+
+    def acquire_read(self):
+        """
+        Lock the device tree for reading. Providers do not need it, they
+        use the snapshot.
+        """
+        self.lock.acquire_read()
+
+    def release_read(self):
+        """ Unlock the device tree locked by acquire_read(). """
+        self.lock.release_read()
+
+    def acquire_write(self):
+        """ Lock the device tree for modification. """
+        self.lock.acquire_write()
+
+    def release_write(self):
+        """ Unlock the device tree locked by acquire_write(). """
+        self.lock.release_write()
+
+    def reserve_devices(self, names):
+        """
+        Reserve devices with given names for an action, which runs without
+        the write lock. Wait until no other action has any of them
+        reserved.
+        The caller must hold the write lock, so nobody else reserves the
+        devices or modifies the device tree meanwhile. The running actions
+        do not need the lock to release their devices.
+
+        :param names: (``set`` of ``string``) Names of the devices.
+        """
+        self.reserved_condition.acquire()
+        try:
+            while self.reserved & names:
+                self.reserved_condition.wait()
+            self.reserved.update(names)
+        finally:
+            self.reserved_condition.release()
+
+    def release_devices(self, names):
+        """ Release devices reserved by reserve_devices(). """
+        self.reserved_condition.acquire()
+        try:
+            self.reserved.difference_update(names)
+            self.reserved_condition.notify_all()
+        finally:
+            self.reserved_condition.release()
+
+    def wait_for_devices(self):
+        """
+        Wait until all actions, which run without the write lock, release
+        their devices. The caller must hold the write lock, so no new
+        action reserves any device.
+        """
+        self.reserved_condition.acquire()
+        try:
+            while self.reserved:
+                self.reserved_condition.wait()
+        finally:
+            self.reserved_condition.release()
+
+    def get_reserved_devices(self):
+        """
+        Return set of names of devices, which are reserved by running
+        actions.
+        """
+        self.reserved_condition.acquire()
+        try:
+            return set(self.reserved)
+        finally:
+            self.reserved_condition.release()
+
+    @property
+    def devices(self):
+        """ List of all devices, as in the current snapshot. """
+        return self.snapshot.devices
+
+    @property
+    def partitions(self):
+        """ List of all partitions, as in the current snapshot. """
+        return self.snapshot.partitions
+
+    @property
+    def lvs(self):
+        """ List of all logical volumes, as in the current snapshot. """
+        return self.snapshot.lvs
+
+    @property
+    def vgs(self):
+        """ List of all volume groups, as in the current snapshot. """
+        return self.snapshot.vgs
+
+    @property
+    def mdarrays(self):
+        """ List of all MD RAID arrays, as in the current snapshot. """
+        return self.snapshot.mdarrays
+
+    def deviceDeps(self, device):
+        """
+        Return list of all devices, which depend on given device, as in the
+        current snapshot.
+        """
+        return self.snapshot.get_dependent_devices(device)
+
+    def get_device_by_path(self, path):
+        """ Return device with given path from the current snapshot. """
+        return self.snapshot.get_device_by_path(path)
+
+    def get_device_by_name(self, name):
+        """ Return device with given name from the current snapshot. """
+        return self.snapshot.get_device_by_name(name)
+
+    def get_device_by_kernel_name(self, name):
+        """ Return device with given kernel name from the current snapshot. """
+        return self.snapshot.get_device_by_kernel_name(name)
+
+    def get_device_by_uuid(self, uuid):
+        """ Return device with given UUID from the current snapshot. """
+        return self.snapshot.get_device_by_uuid(uuid)
+
+    def get_format(self, device):
+        """ Return format of given device, as in the current snapshot. """
+        formats = self.snapshot.formats
+        if device in formats:
+            return formats[device]
+        return device.format
+
+    def get_parents(self, device):
+        """ Return parents of given device, as in the current snapshot. """
+        parents = self.snapshot.parents
+        if device in parents:
+            return parents[device]
+        return tuple(device.parents)
+
+    def get_size(self, device):
+        """
+        Return (sector size, number of sectors) of given device, as in the
+        current snapshot. Return None if the device has no partedDevice.
+        """
+        sizes = self.snapshot.sizes
+        if device in sizes:
+            return sizes[device]
+        return get_sectors(device)[0]
+
+    def get_alignment(self, device):
+        """
+        Return optimal alignment of given device in sectors, as in the
+        current snapshot. Return None if the device has no partedDevice.
+        """
+        alignments = self.snapshot.alignments
+        if device in alignments:
+            return alignments[device]
+        return get_sectors(device)[1]
+
+    def get_partition_geometry(self, partition):
+        """
+        Return (number, start, end, metadata start) of given partition, as
+        in the current snapshot. See ``get_partition_geometry()``.
+        """
+        geometries = self.snapshot.geometries
+        if partition in geometries:
+            return geometries[partition]
+        return get_partition_geometry(partition)
+
+    def get_extended_partition(self, disk):
+        """
+        Return extended partition of given disk, as in the current snapshot.
+        Return None, if the disk has no extended partition.
+        """
+        return self.snapshot.extended.get(disk)
+
+    def get_extents(self, vg):
+        """
+        Return (extent size in MB, nr. of extents, nr. of free extents) of
+        given volume group, as in the current snapshot.
+        """
+        extents = self.snapshot.extents
+        if vg in extents:
+            return extents[vg]
+        return get_extents(vg)
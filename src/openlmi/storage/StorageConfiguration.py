@@ -39,15 +39,34 @@ class StorageConfiguration(object):
     defaults = {
         'namespace' : 'root/cimv2',
         'systemclassname' : 'Linux_ComputerSystem',
+        # empty string = use socket.getfqdn()
+        'systemname' : '',
+        'instance_cache': 'true',
+        'instance_cache_size': '0',
         'tracing': 'false',
         'blivet_tracing': 'false',
         'stderr': 'false',
+        'incremental_refresh': 'true',
+        'full_reset_interval': '3600',
+        'udev_settle_timeout': '120',
+        'transaction_timeout': '60',
+        'asynchronous_methods': 'false',
+        'workers': '1',
+        'max_finished_jobs': '1000',
+        'max_queued_jobs': '1000',
+        'coalescing_window': '1',
+        'queue_size': '1000',
+        'overflow_policy': 'coalesce',
+        'device_events': 'true',
+        'udev_monitor': 'true',
+        'device_settle_time': '1',
     }
 
     @cmpi_logging.trace_method
     def __init__(self):
         """ Initialize and load a configuration file."""
         self._listeners = set()
+        self._system_name = None
         self.config = ConfigParser.SafeConfigParser(defaults=self.defaults)
         self.load()
 
@@ -87,8 +106,28 @@ class StorageConfiguration(object):
             self.config.add_section('common')
         if not self.config.has_section('debug'):
             self.config.add_section('debug')
+        if not self.config.has_section('blivet'):
+            self.config.add_section('blivet')
+        if not self.config.has_section('jobs'):
+            self.config.add_section('jobs')
+        if not self.config.has_section('indications'):
+            self.config.add_section('indications')
+        self.refresh_system_name()
         self._call_listeners()
 
+    @cmpi_logging.trace_method
+    def refresh_system_name(self):
+        """
+            Resolve SystemName again. The name is either static one from
+            the configuration file or fully qualified name of this host.
+            It is resolved only here and cached, because the resolution
+            can be slow and the name is used in every instance name.
+        """
+        name = self.config.get('common', 'systemname')
+        if not name:
+            name = socket.getfqdn()
+        self._system_name = name
+
     @property
     def namespace(self):
         """ Return namespace of OpenLMI storage provider."""
@@ -102,7 +141,23 @@ class StorageConfiguration(object):
     @property
     def system_name(self):
         """ Return SystemName of OpenLMI storage provider."""
-        return socket.getfqdn()
+        return self._system_name
+
+    @property
+    def instance_cache(self):
+        """
+            Return True, if rendered instances of devices should be cached
+            until the device tree is refreshed.
+        """
+        return self.config.getboolean('common', 'instance_cache')
+
+    @property
+    def instance_cache_size(self):
+        """
+            Return maximum number of cached instances per CIM class. Zero
+            means no limit.
+        """
+        return self.config.getint('common', 'instance_cache_size')
 
     @property
     def tracing(self):
@@ -119,3 +174,114 @@ class StorageConfiguration(object):
         """ Return True if logging to stderr is enabled."""
         return self.config.getboolean('debug', 'stderr')
 
+    @property
+    def incremental_refresh(self):
+        """
+            Return True if only devices affected by an action should be
+            refreshed after the action.
+        """
+        return self.config.getboolean('blivet', 'incremental_refresh')
+
+    @property
+    def full_reset_interval(self):
+        """
+            Return maximum time (in seconds) between full resets of
+            the device tree. Zero means no periodic reset.
+        """
+        return self.config.getint('blivet', 'full_reset_interval')
+
+    @property
+    def udev_settle_timeout(self):
+        """
+            Return maximum time (in seconds) to wait for udev to process
+            events after an action.
+        """
+        return self.config.getint('blivet', 'udev_settle_timeout')
+
+    @property
+    def transaction_timeout(self):
+        """
+            Return default time (in seconds), after which unused storage
+            transaction is rolled back. Zero means no limit.
+        """
+        return self.config.getint('blivet', 'transaction_timeout')
+
+    @property
+    def asynchronous_methods(self):
+        """
+            Return True if methods, which modify storage devices, should
+            be executed as jobs by default.
+        """
+        return self.config.getboolean('jobs', 'asynchronous_methods')
+
+    @property
+    def job_workers(self):
+        """
+            Return number of threads, which execute jobs. Jobs, which
+            affect the same devices, are never executed in parallel.
+        """
+        return max(self.config.getint('jobs', 'workers'), 1)
+
+    @property
+    def max_finished_jobs(self):
+        """
+            Return maximum number of finished jobs kept in memory. Zero
+            means no limit.
+        """
+        return self.config.getint('jobs', 'max_finished_jobs')
+
+    @property
+    def max_queued_jobs(self):
+        """
+            Return maximum number of jobs waiting for execution. New jobs
+            are rejected when the limit is reached. Zero means no limit.
+        """
+        return self.config.getint('jobs', 'max_queued_jobs')
+
+    @property
+    def coalescing_window(self):
+        """
+            Return time (in seconds), in which indications about progress
+            of a job are merged together. Zero disables the merging.
+        """
+        return self.config.getfloat('indications', 'coalescing_window')
+
+    @property
+    def indication_queue_size(self):
+        """
+            Return maximum number of indications waiting for delivery.
+            Zero means no limit.
+        """
+        return self.config.getint('indications', 'queue_size')
+
+    @property
+    def indication_overflow_policy(self):
+        """
+            Return what to do with new indication when the indication queue
+            is full, one of 'block', 'drop_oldest' or 'coalesce'.
+        """
+        return self.config.get('indications', 'overflow_policy')
+
+    @property
+    def device_events(self):
+        """
+            Return True, if indications about changed devices should be sent.
+            It requires [blivet] udev_monitor.
+        """
+        return self.config.getboolean('indications', 'device_events')
+
+    @property
+    def udev_monitor(self):
+        """
+            Return True, if udev events of block devices should be watched
+            and changed devices refreshed in background.
+        """
+        return self.config.getboolean('blivet', 'udev_monitor')
+
+    @property
+    def device_settle_time(self):
+        """
+            Return time (in seconds) without any udev event, after which
+            the changed devices are refreshed.
+        """
+        return self.config.getfloat('blivet', 'device_settle_time')
@@ -72,13 +72,19 @@ from openlmi.storage.LMI_FileSystemConfigurationService \
 from openlmi.storage.LMI_FileSystemConfigurationCapabilities \
         import LMI_FileSystemConfigurationCapabilities
 from openlmi.storage.JobManager import JobManager
-from openlmi.storage.IndicationManager import IndicationManager
+from openlmi.storage.IndicationManager import IndicationManager, \
+        LMI_IndicationQueueStatistics
+from openlmi.storage.InstanceCache import LMI_InstanceCacheStatistics
+from openlmi.storage.DeviceMonitor import DeviceMonitor
+from openlmi.storage.StorageAccess import StorageAccess
 
 import openlmi.common.cmpi_logging as cmpi_logging
+import openlmi.storage.util.storage
 import blivet
 import logging
 
 indication_manager = None
+device_monitor = None
 
 def init_anaconda(log_manager, config):
     """ Initialize Anaconda storage module."""
@@ -97,7 +103,8 @@ def init_anaconda(log_manager, config):
     storage = blivet.Blivet()
     # identify the system's storage devices
     storage.reset()
-    return storage
+    openlmi.storage.util.storage.init_config(config)
+    return StorageAccess(storage)
 
 def change_anaconda_loglevel(config):
     """
@@ -147,8 +154,10 @@ def get_providers(env):
     config.load()
     log_manager.set_config(config)
 
-    global indication_manager
-    indication_manager = IndicationManager(env, "Storage", config.namespace)
+    global indication_manager, device_monitor
+    indication_manager = IndicationManager(env, "Storage", config.namespace,
+            queue_size=config.indication_queue_size,
+            overflow_policy=config.indication_overflow_policy)
 
     manager = ProviderManager()
     setting_manager = SettingManager(config)
@@ -157,7 +166,12 @@ def get_providers(env):
 
     providers = {}
 
-    job_manager = JobManager('Storage', config.namespace, indication_manager)
+    job_manager = JobManager('Storage', config.namespace, indication_manager,
+            worker_count=config.job_workers,
+            max_finished_jobs=config.max_finished_jobs,
+            max_queued_jobs=config.max_queued_jobs)
+    indication_manager.set_coalescing(JobManager.IND_JOB_PERCENT_UPDATED,
+            config.coalescing_window)
 
     # common construction options
     opts = {'storage': storage,
@@ -355,6 +369,19 @@ def get_providers(env):
     job_providers = job_manager.get_providers()
     providers.update(job_providers)
 
+    provider = LMI_IndicationQueueStatistics(
+            indication_manager.statistics_classname, indication_manager)
+    providers[indication_manager.statistics_classname] = provider
+    provider = LMI_InstanceCacheStatistics(
+            'LMI_StorageInstanceCacheStatistics', manager)
+    providers['LMI_StorageInstanceCacheStatistics'] = provider
+
+    if config.udev_monitor:
+        device_monitor = DeviceMonitor(storage, manager, indication_manager,
+                settle_time=config.device_settle_time,
+                send_indications=config.device_events)
+        device_monitor.start()
+
     print "providers:", providers
     return providers
 
@@ -20,6 +20,10 @@
 
 import subprocess
 import os
+import sys
+import threading
+import time
+import uuid
 import parted
 import pywbem
 import blivet
@@ -28,6 +32,33 @@ import openlmi.common.cmpi_logging as cmpi_logging
 GPT_TABLE_SIZE = 34 * 2  # there are two copies
 MBR_TABLE_SIZE = 1
 
+# StorageConfiguration instance, set by init_config()
+_config = None
+# time of last full reset of the device tree
+_last_reset = 0
+# device name -> time of last incremental refresh of the device
+_last_refresh = {}
+# True, if periodic full resets are performed by a background thread
+# and not after actions
+_background_reset = False
+# nr. of modifications of the device tree by actions
+_modifications = 0
+# device name -> value of _modifications, when the device was modified
+# last time. Both are guarded by the write lock of the storage.
+_last_modified = {}
+# transaction ID -> Transaction in progress, guarded by _transactions_lock
+_transactions = {}
+_transactions_lock = threading.Lock()
+
+def init_config(config):
+    """
+        Set StorageConfiguration for all functions in this module.
+        It must be called after initial storage.reset().
+    """
+    global _config, _last_reset
+    _config = config
+    _last_reset = time.time()
+
 def _align_up(address, alignment):
     """ Align address to nearest higher address divisible by alignment."""
     return (address / alignment + 1) * alignment
@@ -69,13 +100,15 @@ def get_logical_partition_start(partition):
     return metadata.geometry.start
 
 @cmpi_logging.trace_function
-def get_partition_table_size(device):
+def get_partition_table_size(device, fmt=None):
     """
         Return size of partition table (in blocks) for given Anaconda
         StorageDevice instance.
+        Format of the device can be given, device.format is used otherwise.
     """
-    if device.format:
+    if fmt is None:
         fmt = device.format
+    if fmt:
         if fmt.labelType == "gpt":
             return GPT_TABLE_SIZE * 2
         if fmt.labelType == "msdos":
@@ -118,55 +151,727 @@ def remove_partition(storage, device):
     action = blivet.deviceaction.ActionDestroyDevice(device)
     do_storage_action(storage, action)
 
+def _get_depth(device):
+    """ Return number of levels of parents of given device. """
+    if not device.parents:
+        return 0
+    return max([_get_depth(parent) for parent in device.parents]) + 1
+
+@cmpi_logging.trace_function
+def _get_subtree(storage, devices):
+    """
+        Return set of given devices and all their children, children of
+        the children etc., as they are in the device tree.
+    """
+    tree = storage.devicetree
+    subtree = set()
+    todo = list(devices)
+    while todo:
+        device = todo.pop()
+        if device in subtree:
+            continue
+        subtree.add(device)
+        if device in tree.devices:
+            todo.extend(tree.getChildren(device))
+    return subtree
+
+@cmpi_logging.trace_function
+def get_affected_devices(storage, devices):
+    """
+        Return set of devices, which can be changed by an action on
+        given devices. It contains the devices, their direct parents
+        and all their children, children of the children etc.
+        Parents of the children are not included.
+    """
+    affected = _get_subtree(storage, devices)
+    for device in devices:
+        affected.update(device.parents)
+    return affected
+
+@cmpi_logging.trace_function
+def get_published_affected_devices(storage, devices):
+    """
+        Same as get_affected_devices(), but the devices are looked up in
+        the current snapshot of the device tree, so it does not need any
+        lock.
+    """
+    snapshot = storage.snapshot
+    affected = set(devices)
+    for device in devices:
+        affected.update(storage.get_parents(device))
+        affected.update(snapshot.get_dependent_devices(device))
+    return affected
+
+@cmpi_logging.trace_function
+def get_device_resources(storage, devices):
+    """
+        Return set of names of devices, which can be modified by an action
+        on given devices, i.e. the devices, their direct parents and all
+        their children, children of the children etc.
+        It is suitable for Job.set_resources().
+        The devices are looked up in the current snapshot of the device
+        tree, so it does not wait for running actions.
+    """
+    affected = get_published_affected_devices(storage, devices)
+    return set([device.name for device in affected])
+
+@cmpi_logging.trace_function
+def refresh_devices(storage, devices, names=None):
+    """
+        Rescan only given devices (and their children) and update
+        storage.devicetree with the result.
+        Devices with given names are scanned too, which is useful
+        for devices which are not in the device tree yet.
+        The parents of the devices are not rescanned, other children
+        of the parents still refer to them.
+        Raise an exception if the device tree cannot be refreshed, the
+        caller should call storage.reset() in this case.
+    """
+    tree = storage.devicetree
+    # the tree may have been reset since the devices were looked up
+    devices = [tree.getDeviceByName(device.name) or device
+            for device in devices]
+    affected = _get_subtree(storage, devices)
+    names = set(names or [])
+    names.update([device.name for device in affected])
+    cmpi_logging.logger.trace_verbose("Refreshing devices: "
+            + str(sorted(names)))
+    now = time.time()
+    for name in names:
+        _last_refresh[name] = now
+    # the devices may have been changed outside of the device tree
+    _mark_modified(names)
+
+    # remove all affected devices from the tree, leaves first
+    for device in sorted(affected, key=_get_depth, reverse=True):
+        if device in tree.devices:
+            # pylint: disable-msg=W0212
+            tree._removeDevice(device, force=True, moddisk=False)
+
+    # and add them back from udev
+    found = set()
+    for info in blivet.udev.udev_get_block_devices():
+        name = blivet.udev.udev_device_get_name(info)
+        if name in names:
+            found.add(name)
+            tree.addUdevDevice(info)
+
+    # check, that the remaining devices are back
+    for device in devices:
+        if device.name not in found:
+            # the device has been removed from the system
+            continue
+        if device.exists and not tree.getDeviceByName(device.name):
+            raise Exception("Device %s not found after refresh."
+                    % device.name)
+
+@cmpi_logging.trace_function
+def reset_storage(storage, devices=None, force=False, names=None):
+    """
+        Refresh storage.devicetree after some action on given devices.
+        
+        Only the devices (and their parents and children) and devices with
+        given names are rescanned, if incremental refresh is enabled in the
+        configuration.
+        Full storage.reset() is performed if the incremental refresh fails,
+        if it is disabled, if force is True or if the last full reset
+        is older than configured interval. It waits until all actions,
+        which run without the lock, finish.
+
+        The caller must hold the write lock of the storage. New snapshot
+        of the device tree is published at the end.
+    """
+    global _last_reset
+
+    if (not force and (devices or names) and _config
+            and _config.incremental_refresh):
+        interval = _config.full_reset_interval
+        if (not interval or _background_reset
+                or time.time() - _last_reset < interval):
+            try:
+                refresh_devices(storage, devices or [], names)
+                storage.publish_snapshot()
+                return
+            except Exception, err:
+                cmpi_logging.logger.trace_warn(
+                        "Incremental refresh failed, resetting: " + str(err))
+        else:
+            cmpi_logging.logger.trace_info(
+                    "Periodic full reset of the device tree.")
+
+    storage.wait_for_devices()
+    _last_reset = time.time()
+    _last_refresh.clear()
+    storage.reset()
+    storage.publish_snapshot()
+
+def get_refresh_time(name):
+    """
+        Return time of the last refresh of device with given name, either
+        incremental or full.
+    """
+    return max(_last_reset, _last_refresh.get(name, 0))
+
+def set_background_reset(enabled):
+    """
+        Enable or disable periodic full reset of the device tree after
+        actions. It should be disabled when a background thread calls
+        reset_storage(force=True) when get_next_reset() is due.
+    """
+    global _background_reset
+    _background_reset = enabled
+
+def get_next_reset():
+    """
+        Return time, when the next periodic full reset of the device tree
+        is due. Return None, if the periodic reset is disabled.
+    """
+    if not _config or not _config.full_reset_interval:
+        return None
+    return _last_reset + _config.full_reset_interval
+
+def _get_ancestors(devices):
+    """ Return set of given devices and all their parents, recursively. """
+    result = set()
+    todo = list(devices)
+    while todo:
+        device = todo.pop()
+        if device in result:
+            continue
+        result.add(device)
+        todo.extend(device.parents)
+    return result
+
 @cmpi_logging.trace_function
-def do_storage_action(storage, action):
+def trigger_udev(devices):
+    """
+        Replay udev rules for given devices and their parents and wait until
+        udev processes the events.
+        The whole block subsystem is triggered only if no sysfs path of the
+        devices is known.
+        The waiting is limited by [blivet] udev_settle_timeout.
+    """
+    # workaround for bug #891971
+    open("/dev/.in_sysinit", "w").close()
+    subprocess.call(['udevadm', 'control', '--env=ANACONDA=1'])
+
+    start = time.time()
+    names = set()
+    for device in _get_ancestors(devices):
+        if device.sysfsPath:
+            names.add(os.path.basename(device.sysfsPath))
+    cmd = ['udevadm', 'trigger', '--subsystem-match=block']
+    if names:
+        cmd.extend(['--sysname-match=' + name for name in sorted(names)])
+    subprocess.call(cmd)
+    triggered = time.time()
+
+    timeout = 120
+    if _config:
+        timeout = _config.udev_settle_timeout
+    ret = subprocess.call(['udevadm', 'settle', '--timeout=%d' % timeout])
+    settled = time.time()
+    if ret != 0:
+        cmpi_logging.logger.trace_warn(
+                "udevadm settle did not finish in %d seconds." % timeout)
+
+    cmpi_logging.logger.trace_info(
+            "udev trigger of %s took %.3f s, settle took %.3f s"
+            % (sorted(names) or "all block devices",
+               triggered - start, settled - triggered))
+
+@cmpi_logging.trace_function
+def do_storage_action(storage, action, transaction_id=None):
     """
         Perform Anaconda DeviceAction on given Storage instance.
+        See do_storage_actions() for details.
+    """
+    do_storage_actions(storage, [action], transaction_id)
+
+@cmpi_logging.trace_function
+def do_storage_actions(storage, actions, transaction_id=None):
     """
+        Register given list of Anaconda DeviceActions in the device tree
+        and perform them. See register_actions() and process_actions().
 
-    cmpi_logging.logger.trace_info("Running action " + str(action))
-    cmpi_logging.logger.trace_info("    on device " + repr(action.device))
+        The caller may hold the write lock of the storage, e.g. when it
+        created the actions, but then the actions are performed with the
+        lock held. It is better to call register_actions() with the lock
+        held and process_actions() after the lock is released.
+    """
+    storage.acquire_write()
+    try:
+        batch = register_actions(storage, actions, transaction_id)
+    finally:
+        storage.release_write()
+    process_actions(storage, batch)
+
+class ActionBatch(object):
+    """
+        Actions registered by register_actions(), which wait for
+        process_actions().
+    """
+    def __init__(self, actions, names, reserved=False):
+        self.actions = actions
+        # devices, which are refreshed after the actions
+        self.devices = [action.device for action in actions]
+        # names of devices, which can be modified by the actions
+        self.names = names
+        # True, if the names are reserved for the actions by
+        # StorageAccess.reserve_devices()
+        self.reserved = reserved
+        # True, if the actions were already executed
+        self.executed = False
+        # True, if the execution succeeded
+        self.succeeded = False
+        # sys.exc_info() of failed execution, it is raised by
+        # process_actions()
+        self.error = None
+        self.start = time.time()
+        self.processed = None
+
+def _is_exclusive(action):
+    """
+        Return True, if given action must be processed by blivet together
+        with partition tables of all disks, i.e. it creates, modifies or
+        removes a partition or a partition table.
+    """
+    if isinstance(action.device, blivet.devices.PartitionDevice):
+        return True
+    for fmt in (getattr(action, 'origFormat', None), action.device.format):
+        if isinstance(fmt, blivet.formats.disklabel.DiskLabel):
+            return True
+    return False
+
+def _detach_actions(storage, actions):
+    """
+        Remove given registered actions from the list of actions of the
+        device tree, so processActions() of another job does not perform
+        them. Devices added and removed by the actions stay in the tree.
+        The caller must hold the write lock of the storage.
+    """
+    tree = storage.devicetree
+    for action in actions:
+        # pylint: disable-msg=W0212
+        if action in tree._actions:
+            tree._actions.remove(action)
+
+def _attach_actions(storage, actions):
+    """
+        Add given actions, removed by _detach_actions(), back to the list
+        of actions of the device tree.
+        The caller must hold the write lock of the storage.
+    """
+    tree = storage.devicetree
+    for action in actions:
+        # pylint: disable-msg=W0212
+        if action not in tree._actions:
+            tree._actions.append(action)
+
+@cmpi_logging.trace_function
+def register_actions(storage, actions, transaction_id=None):
+    """
+        Register given list of Anaconda DeviceActions in the device tree.
+        The caller must hold the write lock of the storage, so the devices
+        modified by the action constructors are registered at once.
 
-    do_partitioning = False
-    if (isinstance(action.device, blivet.devices.PartitionDevice)
-            and isinstance(action,
-                    blivet.deviceaction.ActionCreateDevice)):
-        do_partitioning = True
-    storage.devicetree.registerAction(action)
+        Return ActionBatch, which the caller must pass to process_actions()
+        after it releases the lock. Most actions (mkfs, mdadm, lvm, ...)
+        are then executed without the lock, so actions on unrelated
+        devices run in parallel. Their devices are reserved until the
+        actions finish, see StorageAccess.reserve_devices().
+        Actions on partitions and partition tables are executed here, with
+        the lock held, because blivet allocates partitions and commits the
+        partition tables of all disks at once.
 
-    do_raid = False
-    if isinstance(action.device, blivet.devices.MDRaidArrayDevice):
-        do_raid = True
+        If transaction_id is set, the actions are only registered in the
+        private device tree of the transaction with this ID and they are
+        performed when the transaction is committed. None is returned in
+        this case. Raise CIMError, if the transaction is not in progress.
+        The actions are canceled in this case.
+    """
+    for action in actions:
+        cmpi_logging.logger.trace_info("Running action " + str(action))
+        cmpi_logging.logger.trace_info("    on device " + repr(action.device))
+
+    if transaction_id:
+        _register_in_transaction(storage, actions, transaction_id)
+        return None
+
+    registered = []
     try:
-        if do_partitioning:
+        for action in actions:
+            storage.devicetree.registerAction(action)
+            registered.append(action)
+    except Exception:
+        for action in reversed(registered):
+            storage.devicetree.cancelAction(action)
+        raise
+    _detach_actions(storage, actions)
+
+    devices = [action.device for action in actions]
+    names = set([device.name for device in
+            get_affected_devices(storage, devices)])
+    _mark_modified(names)
+
+    for action in actions:
+        if _is_exclusive(action):
+            return _execute_exclusive(storage, actions, names)
+
+    storage.reserve_devices(names)
+    return ActionBatch(actions, names, reserved=True)
+
+def _creates_partition(actions):
+    """ Return True, if any of given actions creates a partition. """
+    for action in actions:
+        if (isinstance(action.device, blivet.devices.PartitionDevice)
+                and isinstance(action,
+                        blivet.deviceaction.ActionCreateDevice)):
+            return True
+    return False
+
+@cmpi_logging.trace_function
+def _execute_exclusive(storage, actions, names):
+    """
+        Execute given list of registered Anaconda DeviceActions by blivet,
+        including allocation of new partitions. It waits until all
+        actions running without the lock finish.
+        The caller must hold the write lock of the storage.
+        Return ActionBatch for process_actions(). An error of the actions
+        is raised by process_actions(), after the devices are refreshed.
+    """
+    batch = ActionBatch(actions, names)
+    storage.wait_for_devices()
+
+    tree = storage.devicetree
+    for action in reversed(tree.findActions()):
+        if action not in actions:
+            cmpi_logging.logger.trace_warn(
+                    "Canceling unexpected action " + str(action))
+            tree.cancelAction(action)
+    _attach_actions(storage, actions)
+
+    batch.executed = True
+    try:
+        if _creates_partition(actions):
             # this must be called when creating a partition
             cmpi_logging.logger.trace_verbose("Running doPartitioning()")
-            blivet.partitioning.doPartitioning(storage=storage)
+            blivet.partitioning.doPartitioning(storage=storage.blivet)
+
+        tree.processActions(dryRun=False)
+        _finish_execution(actions)
+        batch.succeeded = True
+    except Exception:
+        batch.error = sys.exc_info()
+    _detach_actions(storage, actions)
+    batch.processed = time.time()
+    return batch
 
-        storage.devicetree.processActions(dryRun=False)
+def _finish_execution(actions):
+    """
+        Log results of given executed actions and work around issues
+        of the tools.
+    """
+    for action in actions:
         if not isinstance(action,
                 blivet.deviceaction.ActionDestroyDevice):
-            cmpi_logging.logger.trace_verbose("Result: " + repr(action.device))
-        if do_raid:
-            # work around mdadm not waiting for device to appear/disappear
-            if isinstance(action,
-                    blivet.deviceaction.ActionDestroyDevice):
-                # remove the metadata, otherwise reset() still recognizes
-                # the array
-                for device in action.device.parents:
-                    subprocess.call([
-                            'dd',
-                            'if=/dev/zero',
-                            'of=' + device.path,
-                            'bs=1024',
-                            'count=1024'])
+            cmpi_logging.logger.trace_verbose(
+                    "Result: " + repr(action.device))
+        if (isinstance(action.device, blivet.devices.MDRaidArrayDevice)
+                and isinstance(action,
+                        blivet.deviceaction.ActionDestroyDevice)):
+            # work around mdadm not waiting for device to
+            # appear/disappear:
+            # remove the metadata, otherwise reset() still recognizes
+            # the array
+            for device in action.device.parents:
+                subprocess.call([
+                        'dd',
+                        'if=/dev/zero',
+                        'of=' + device.path,
+                        'bs=1024',
+                        'count=1024'])
+
+@cmpi_logging.trace_function
+def process_actions(storage, batch):
+    """
+        Execute actions registered by register_actions(), if they were not
+        executed there, wait for udev and refresh the devices.
+        The caller must not hold the write lock of the storage. The lock
+        is acquired only to refresh the device tree and publish new
+        snapshot, the actions and udev settle run without it.
+        Nothing is done, if batch is None.
+    """
+    if batch is None:
+        return
+    try:
+        try:
+            if not batch.executed:
+                batch.executed = True
+                for action in batch.actions:
+                    cmpi_logging.logger.trace_verbose(
+                            "Executing action " + str(action))
+                    action.execute()
+                _finish_execution(batch.actions)
+                batch.succeeded = True
+        finally:
+            if batch.processed is None:
+                batch.processed = time.time()
+            trigger_udev(batch.devices)
+    finally:
+        triggered = time.time()
+        if batch.reserved:
+            storage.release_devices(batch.names)
+        storage.acquire_write()
+        try:
+            # transactions, which copied the device tree while the actions
+            # were running, must not modify the devices
+            _mark_modified(batch.names)
+            # the device tree is not reliable after failed action
+            reset_storage(storage, batch.devices, force=not batch.succeeded)
+        finally:
+            storage.release_write()
+        cmpi_logging.logger.trace_info(
+                "%d action(s) took %.3f s, udev took %.3f s, "
+                "refresh took %.3f s"
+                % (len(batch.actions), batch.processed - batch.start,
+                   triggered - batch.processed, time.time() - triggered))
+    if batch.error:
+        raise batch.error[0], batch.error[1], batch.error[2]
+
+class Transaction(object):
+    """
+        Actions planned by BeginTransaction() and CreateOrModify* methods
+        with the same Transaction parameter.
+
+        The actions are planned in a private copy of the device tree, the
+        shared device tree is not modified until the transaction is
+        committed. The transaction expires, if it is not used for
+        ``timeout`` seconds.
+    """
+    def __init__(self, storage, timeout):
+        """
+            Create the transaction with a copy of the shared device tree.
+            The caller must hold the write lock of the storage.
+        """
+        self.the_id = uuid.uuid4().hex
+        self.view = storage.create_view()
+        self.actions = []
+        # names of devices, which are modified by the actions
+        self.names = set()
+        # value of _modifications when the device tree was copied
+        self.modifications = _modifications
+        # held by the thread, which uses the transaction
+        self.lock = threading.Lock()
+        self.timeout = timeout
+        self.deadline = None
+        self.touch()
+
+    def touch(self):
+        """ Postpone the expiration, the transaction was used. """
+        if self.timeout:
+            self.deadline = time.time() + self.timeout
+
+    def is_expired(self):
+        """ Return True, if the transaction has not been used in time. """
+        return self.deadline is not None and time.time() > self.deadline
+
+def _mark_modified(names):
+    """
+        Remember that devices with given names were modified, so
+        transactions, which started before, cannot modify them.
+        The caller must hold the write lock of the storage.
+    """
+    global _modifications
+    _modifications += 1
+    for name in names:
+        _last_modified[name] = _modifications
+
+def _get_transaction(transaction_id, remove=False):
+    """
+        Return the transaction with given ID. Remove it from the list of
+        transactions in progress, if remove is True.
+        Expired transactions are rolled back.
+        Raise CIMError, if the transaction is not in progress.
+    """
+    _transactions_lock.acquire()
+    try:
+        for transaction in _transactions.values():
+            if transaction.is_expired():
+                cmpi_logging.logger.trace_warn(
+                        "Transaction %s expired, rolling back."
+                        % transaction.the_id)
+                del _transactions[transaction.the_id]
+        if transaction_id not in _transactions:
+            raise pywbem.CIMError(pywbem.CIM_ERR_INVALID_PARAMETER,
+                    "Transaction %s is not in progress, it may have expired."
+                    % transaction_id)
+        if remove:
+            return _transactions.pop(transaction_id)
+        return _transactions[transaction_id]
     finally:
-        # workaround for bug #891971
-        open("/dev/.in_sysinit", "w")
-        os.system('udevadm control --env=ANACONDA=1')
-        os.system('udevadm trigger --subsystem-match block')
-        os.system('udevadm settle')
-        storage.reset()
+        _transactions_lock.release()
+
+@cmpi_logging.trace_function
+def begin_transaction(storage, timeout):
+    """
+        Start a transaction and return its ID. Actions with this
+        transaction ID are registered in a private copy of the device
+        tree, they are processed together in commit_transaction().
+        Other clients can modify the storage while the transaction is in
+        progress, the commit fails if they modify the same devices.
+        The transaction is rolled back, if it is not used for timeout
+        seconds. Zero timeout means no expiration.
+    """
+    storage.acquire_write()
+    try:
+        transaction = Transaction(storage, timeout)
+    finally:
+        storage.release_write()
+    _transactions_lock.acquire()
+    try:
+        _transactions[transaction.the_id] = transaction
+    finally:
+        _transactions_lock.release()
+    cmpi_logging.logger.trace_info("Transaction %s started."
+            % transaction.the_id)
+    return transaction.the_id
+
+@cmpi_logging.trace_function
+def enter_transaction(storage, transaction_id):
+    """
+        Use the private device tree of the transaction with given ID in the
+        current thread, until leave_transaction() is called. Only one
+        thread can use the transaction at a time, others wait.
+        Return the transaction for leave_transaction().
+        Raise CIMError if the transaction is not in progress.
+    """
+    transaction = _get_transaction(transaction_id)
+    transaction.lock.acquire()
+    transaction.touch()
+    storage.enter_view(transaction.view)
+    return transaction
+
+@cmpi_logging.trace_function
+def leave_transaction(storage, transaction):
+    """ Stop using the transaction entered by enter_transaction(). """
+    storage.leave_view()
+    transaction.touch()
+    transaction.lock.release()
+
+def _register_in_transaction(storage, actions, transaction_id):
+    """
+        Register given actions in the private device tree of the
+        transaction with given ID. The current thread must have entered
+        the transaction, see enter_transaction().
+    """
+    _transactions_lock.acquire()
+    try:
+        transaction = _transactions.get(transaction_id)
+    finally:
+        _transactions_lock.release()
+    if (transaction is None
+            or storage.get_view() is not transaction.view):
+        for action in reversed(actions):
+            action.cancel()
+        raise pywbem.CIMError(pywbem.CIM_ERR_INVALID_PARAMETER,
+                "Transaction %s is not in progress, it may have expired."
+                % transaction_id)
+
+    tree = storage.devicetree
+    registered = []
+    try:
+        for action in actions:
+            tree.registerAction(action)
+            registered.append(action)
+        if _creates_partition(actions):
+            # allocate the partitions now, so they are visible
+            blivet.partitioning.doPartitioning(storage=storage.blivet)
+    except Exception:
+        for action in reversed(registered):
+            tree.cancelAction(action)
+        raise
+
+    cmpi_logging.logger.trace_verbose(
+            "Postponed to commit of transaction " + transaction_id)
+    transaction.actions.extend(actions)
+    devices = [action.device for action in actions]
+    transaction.names.update([device.name for device in
+            get_affected_devices(storage, devices)])
+    # make the planned devices visible in the transaction
+    storage.publish_snapshot()
+
+@cmpi_logging.trace_function
+def commit_transaction(storage, transaction_id):
+    """
+        Process all actions registered in the transaction with given ID.
+        The actions are executed and the device tree is reset with the
+        write lock of the storage held.
+        Raise CIMError if the transaction is not in progress or if any
+        device modified by the transaction was modified by someone else
+        since the transaction started. The transaction is rolled back in
+        this case.
+    """
+    transaction = _get_transaction(transaction_id, remove=True)
+    transaction.lock.acquire()
+    try:
+        storage.acquire_write()
+        try:
+            storage.wait_for_devices()
+            conflicts = [name for name in transaction.names
+                    if _last_modified.get(name, 0)
+                        > transaction.modifications]
+            if conflicts:
+                raise pywbem.CIMError(pywbem.CIM_ERR_FAILED,
+                        "Devices %s were modified since transaction %s "
+                        "started, the transaction was rolled back."
+                        % (", ".join(sorted(conflicts)), transaction_id))
+            if transaction.actions:
+                _commit_transaction(storage, transaction)
+        finally:
+            storage.release_write()
+    finally:
+        transaction.lock.release()
+
+def _commit_transaction(storage, transaction):
+    """
+        Execute the actions of given transaction in its private device tree
+        and reset the shared one.
+        The caller must hold the write lock of the storage.
+    """
+    start = time.time()
+    devices = [action.device for action in transaction.actions]
+    try:
+        try:
+            transaction.view.blivet.devicetree.processActions(dryRun=False)
+            _finish_execution(transaction.actions)
+        finally:
+            processed = time.time()
+            _mark_modified(transaction.names)
+            trigger_udev(devices)
+    finally:
+        triggered = time.time()
+        # the shared device tree does not know the planned devices
+        reset_storage(storage, force=True)
+        cmpi_logging.logger.trace_info(
+                "Transaction %s: %d action(s) took %.3f s, udev took %.3f s, "
+                "reset took %.3f s"
+                % (transaction.the_id, len(transaction.actions),
+                   processed - start, triggered - processed,
+                   time.time() - triggered))
+
+@cmpi_logging.trace_function
+def rollback_transaction(storage, transaction_id):
+    """
+        Cancel all actions registered in the transaction with given ID.
+        Raise CIMError if the transaction is not in progress.
+    """
+    transaction = _get_transaction(transaction_id, remove=True)
+    # wait for a call, which uses the transaction
+    transaction.lock.acquire()
+    transaction.lock.release()
+    cmpi_logging.logger.trace_info("Transaction %s rolled back."
+            % transaction_id)
 
 def log_storage_call(msg, args):
     """
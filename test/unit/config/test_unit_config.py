@@ -72,6 +72,22 @@ class TestConfig(unittest.TestCase):
         self.assertEqual(cfg.system_class_name, "My_ComputerSystem")
         self.assertEqual(cfg.system_name, socket.getfqdn())
 
+    def test_system_name(self):
+        """ Test static SystemName and its refresh."""
+        StorageConfiguration.CONFIG_PATH = self.directory
+        StorageConfiguration.CONFIG_FILE = self.directory + "/configs/systemname.conf"
+        cfg = StorageConfiguration()
+
+        self.assertEqual(cfg.system_name, "static.example.com")
+
+        # the name must be refreshed when the configuration is reloaded
+        cfg.config.remove_option('common', 'systemname')
+        cfg.refresh_system_name()
+        self.assertEqual(cfg.system_name, socket.getfqdn())
+
+        cfg.load()
+        self.assertEqual(cfg.system_name, "static.example.com")
+
     def tearDown(self):
         pass
 
@@ -0,0 +1,54 @@
+# Copyright (C) 2013 Red Hat, Inc.  All rights reserved.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#
+# Authors: Jan Safranek <jsafrane@redhat.com>
+# -*- coding: utf-8 -*-
+
+from openlmi.storage.InstanceCache import InstanceCache
+import unittest
+
+class TestInstanceCache(unittest.TestCase):
+    def test_generation(self):
+        """ Test that entries of older generation are not returned. """
+        cache = InstanceCache()
+        self.assertEqual(cache.get("sda", 1), None)
+        cache.put("sda", 1, ["value"])
+        self.assertEqual(cache.get("sda", 1), ["value"])
+        # newer generation discards the entry
+        self.assertEqual(cache.get("sda", 2), None)
+        cache.put("sda", 2, ["new value"])
+        # older generation is not cached
+        cache.put("sda", 1, ["old value"])
+        self.assertEqual(cache.get("sda", 1), None)
+        self.assertEqual(cache.get("sda", 2), ["new value"])
+        self.assertEqual(cache.get_statistics(),
+                {'hits': 2, 'misses': 3, 'size': 1})
+
+    def test_size(self):
+        """ Test that the least recently used entries are discarded. """
+        cache = InstanceCache(2)
+        cache.put("sda", 1, "a")
+        cache.put("sdb", 1, "b")
+        cache.get("sda", 1)
+        cache.put("sdc", 1, "c")
+        self.assertEqual(cache.get("sdb", 1), None)
+        self.assertEqual(cache.get("sda", 1), "a")
+        self.assertEqual(cache.get("sdc", 1), "c")
+        cache.clear()
+        self.assertEqual(cache.get_statistics()['size'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+# Copyright (C) 2013 Red Hat, Inc.  All rights reserved.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#
+# Authors: Jan Safranek <jsafrane@redhat.com>
+# -*- coding: utf-8 -*-
+
+from openlmi.storage.DeviceProvider import DeviceProvider
+import unittest
+
+Redundancy = DeviceProvider.Redundancy
+
+class TestRedundancy(unittest.TestCase):
+    def setUp(self):
+        Redundancy._cache.clear()
+        self.disk = Redundancy(False, 1, 0, 1)
+        self.mirror = Redundancy(True, 2, 1, 1)
+
+    def test_levels(self):
+        """ Test redundancy of various RAID levels. """
+        disks = [self.disk] * 4
+        self.assertEqual(
+                Redundancy.get_common_redundancy_list(disks),
+                Redundancy(False, 1, 0, 1))
+        self.assertEqual(
+                Redundancy.get_common_redundancy_list(disks, Redundancy.RAID0),
+                Redundancy(False, 1, 0, 4))
+        self.assertEqual(
+                Redundancy.get_common_redundancy_list(disks, Redundancy.RAID1),
+                Redundancy(True, 4, 3, 1))
+        self.assertEqual(
+                Redundancy.get_common_redundancy_list(disks, Redundancy.RAID4),
+                Redundancy(True, 1, 1, 4, Redundancy.PARITY_NON_ROTATED))
+        self.assertEqual(
+                Redundancy.get_common_redundancy_list(disks, Redundancy.RAID5),
+                Redundancy(True, 1, 1, 4, Redundancy.PARITY_ROTATED))
+        self.assertEqual(
+                Redundancy.get_common_redundancy_list(disks, Redundancy.RAID6),
+                Redundancy(True, 1, 2, 4, Redundancy.PARITY_ROTATED))
+        self.assertEqual(
+                Redundancy.get_common_redundancy_list(disks + [self.disk],
+                        Redundancy.RAID10),
+                Redundancy(True, 2, 1, 3))
+        self.assertEqual(
+                Redundancy.get_common_redundancy_list(disks, 3), None)
+
+    def test_mixed(self):
+        """ Test redundancy of devices with different redundancies. """
+        members = [self.disk, self.mirror]
+        self.assertEqual(
+                Redundancy.get_common_redundancy_list(members),
+                Redundancy(False, 1, 0, 1))
+        self.assertEqual(
+                Redundancy.get_common_redundancy_list(members,
+                        Redundancy.RAID1),
+                Redundancy(True, 3, 2, 1))
+
+    def test_single(self):
+        """ Test that single member is not modified. """
+        result = Redundancy.get_common_redundancy_list([self.disk],
+                Redundancy.RAID1)
+        self.assertEqual(result, Redundancy(False, 1, 0, 1))
+        result = Redundancy.get_common_redundancy_list([self.disk],
+                Redundancy.RAID5)
+        self.assertEqual(result, Redundancy(False, 1, 1, 1))
+        self.assertEqual(self.disk, Redundancy(False, 1, 0, 1))
+
+    def test_cache(self):
+        """ Test that equal members share the result. """
+        first = Redundancy.get_common_redundancy_list(
+                [self.disk, self.mirror], Redundancy.RAID0)
+        second = Redundancy.get_common_redundancy_list(
+                [self.disk.copy(), self.mirror.copy()], Redundancy.RAID0)
+        self.assertTrue(first is second)
+        third = Redundancy.get_common_redundancy_list(
+                [self.disk, self.mirror], Redundancy.RAID1)
+        self.assertFalse(first is third)
+
+    def test_many_members(self):
+        """ Test redundancy of 2 - 256 members. """
+        count = 2
+        while count <= 256:
+            members = [Redundancy(False, 1, 0, i % 3 + 1)
+                    for i in xrange(count)]
+            result = Redundancy.get_common_redundancy_list(members,
+                    Redundancy.RAID1)
+            self.assertEqual(result.data_redundancy, count)
+            self.assertEqual(result.package_redundancy, count - 1)
+            count *= 2
+
+if __name__ == '__main__':
+    unittest.main()
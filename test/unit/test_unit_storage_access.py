@@ -0,0 +1,227 @@
+# Copyright (C) 2013 Red Hat, Inc.  All rights reserved.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#
+# Authors: Jan Safranek <jsafrane@redhat.com>
+# -*- coding: utf-8 -*-
+
+from openlmi.storage.StorageAccess import ReadWriteLock, StorageAccess
+import unittest
+import threading
+import time
+
+class DeviceMock(object):
+    """ Mockup of blivet StorageDevice. """
+    def __init__(self, name, parents=None, fmt=None, uuid=None):
+        self.name = name
+        self.path = "/dev/" + name
+        self.sysfsPath = "/devices/virtual/block/" + name
+        self.size = 1
+        self.parents = parents or []
+        self.format = fmt
+        self.uuid = uuid
+        self.partedDevice = None
+
+class AlignmentMock(object):
+    """ Mockup of parted.Alignment. """
+    def __init__(self, grain_size):
+        self.grainSize = grain_size
+
+class PartedDeviceMock(object):
+    """ Mockup of parted.Device. """
+    def __init__(self, length):
+        self.sectorSize = 512
+        self.length = length
+        self.optimumAlignment = AlignmentMock(2048)
+
+class FormatMock(object):
+    """ Mockup of blivet DeviceFormat. """
+    def __init__(self, uuid=None):
+        self.uuid = uuid
+
+class BlivetMock(object):
+    """ Mockup of blivet.Blivet. """
+    def __init__(self, devices):
+        self.devices = devices
+        self.partitions = []
+        self.lvs = []
+        self.vgs = []
+        self.mdarrays = []
+
+    def copy(self):
+        return BlivetMock(list(self.devices))
+
+class TestReadWriteLock(unittest.TestCase):
+    def setUp(self):
+        self.lock = ReadWriteLock()
+
+    def _run(self, function):
+        """ Run function in a thread, return True if it finished in time. """
+        thread = threading.Thread(target=function)
+        thread.daemon = True
+        thread.start()
+        thread.join(1)
+        return not thread.is_alive()
+
+    def test_readers(self):
+        """ Test that readers do not block each other. """
+        self.lock.acquire_read()
+        def reader():
+            self.lock.acquire_read()
+            self.lock.release_read()
+        self.assertTrue(self._run(reader))
+        self.lock.release_read()
+
+    def test_writer_blocks_readers(self):
+        """ Test that a writer blocks readers. """
+        self.lock.acquire_write()
+        result = []
+        def reader():
+            self.lock.acquire_read()
+            result.append(time.time())
+            self.lock.release_read()
+        thread = threading.Thread(target=reader)
+        thread.daemon = True
+        thread.start()
+        time.sleep(0.1)
+        self.assertEqual(result, [])
+        released = time.time()
+        self.lock.release_write()
+        thread.join(1)
+        self.assertEqual(len(result), 1)
+        self.assertTrue(result[0] >= released)
+
+    def test_recursion(self):
+        """ Test recursive locking of writer and reader. """
+        self.lock.acquire_write()
+        self.lock.acquire_write()
+        self.lock.acquire_read()
+        self.lock.release_read()
+        self.lock.release_write()
+        self.lock.release_write()
+
+        self.lock.acquire_read()
+        self.lock.acquire_read()
+        self.assertRaises(RuntimeError, self.lock.acquire_write)
+        self.lock.release_read()
+        self.lock.release_read()
+
+        def writer():
+            self.lock.acquire_write()
+            self.lock.release_write()
+        self.assertTrue(self._run(writer))
+
+class TestStorageAccess(unittest.TestCase):
+    def setUp(self):
+        self.disk = DeviceMock("sda", fmt=FormatMock("fmt-uuid"))
+        self.part = DeviceMock("sda1", parents=[self.disk])
+        self.vg = DeviceMock("vg", parents=[self.part], uuid="vg-uuid")
+        self.blivet = BlivetMock([self.disk, self.part, self.vg])
+        self.storage = StorageAccess(self.blivet)
+
+    def test_lookup(self):
+        """ Test lookups of devices in the snapshot. """
+        self.assertEqual(self.storage.get_device_by_path("/dev/sda1"),
+                self.part)
+        self.assertEqual(self.storage.get_device_by_name("vg"), self.vg)
+        self.assertEqual(self.storage.get_device_by_kernel_name("sda1"),
+                self.part)
+        self.assertEqual(self.storage.get_device_by_uuid("vg-uuid"), self.vg)
+        self.assertEqual(self.storage.get_device_by_uuid("fmt-uuid"),
+                self.disk)
+        self.assertEqual(self.storage.get_device_by_path("/dev/sdb"), None)
+        self.assertEqual(self.storage.get_device_by_uuid(None), None)
+        self.assertEqual(set(self.storage.deviceDeps(self.disk)),
+                set([self.part, self.vg]))
+        self.assertEqual(self.storage.get_parents(self.vg), (self.part,))
+
+    def test_snapshot(self):
+        """ Test that readers see the snapshot until it is published. """
+        new_format = FormatMock()
+        new_device = DeviceMock("sdb")
+        self.disk.format = new_format
+        self.blivet.devices = self.blivet.devices + [new_device]
+
+        self.assertEqual(self.storage.get_format(self.disk).uuid, "fmt-uuid")
+        self.assertEqual(len(self.storage.devices), 3)
+        # not in the snapshot
+        self.assertEqual(self.storage.get_format(new_device), None)
+
+        self.storage.publish_snapshot()
+        self.assertEqual(self.storage.get_format(self.disk), new_format)
+        self.assertEqual(len(self.storage.devices), 4)
+        self.assertEqual(self.storage.get_device_by_name("sdb"), new_device)
+
+    def test_frozen_attributes(self):
+        """ Test that device attributes do not change until published. """
+        self.disk.partedDevice = PartedDeviceMock(1000)
+        self.storage.publish_snapshot()
+        self.assertEqual(self.storage.get_size(self.disk), (512, 1000))
+        self.assertEqual(self.storage.get_alignment(self.disk), 2048)
+
+        self.disk.partedDevice.length = 2000
+        self.disk.parents = [self.vg]
+        self.assertEqual(self.storage.get_size(self.disk), (512, 1000))
+        self.assertEqual(self.storage.get_parents(self.disk), ())
+        self.assertEqual(self.storage.get_size(self.part), None)
+
+        self.storage.publish_snapshot()
+        self.assertEqual(self.storage.get_size(self.disk), (512, 2000))
+        self.assertEqual(self.storage.get_parents(self.disk), (self.vg,))
+
+    def test_reserve_devices(self):
+        """ Test that only conflicting reservations wait. """
+        self.storage.reserve_devices(set(["sda", "sda1"]))
+        self.storage.reserve_devices(set(["sdb"]))
+        result = []
+        def reserve():
+            self.storage.reserve_devices(set(["sda1", "vg"]))
+            result.append(self.storage.get_reserved_devices())
+        thread = threading.Thread(target=reserve)
+        thread.daemon = True
+        thread.start()
+        time.sleep(0.1)
+        self.assertEqual(result, [])
+
+        self.storage.release_devices(set(["sda", "sda1"]))
+        thread.join(1)
+        self.assertEqual(result, [set(["sdb", "sda1", "vg"])])
+
+    def test_view(self):
+        """ Test that a private view is visible only in its thread. """
+        generation = self.storage.snapshot.generation
+        view = self.storage.create_view()
+        self.storage.enter_view(view)
+        new_device = DeviceMock("sdb")
+        self.storage.blivet.devices.append(new_device)
+        self.storage.publish_snapshot()
+        self.assertEqual(self.storage.get_device_by_name("sdb"), new_device)
+        self.assertEqual(self.storage.snapshot.generation, None)
+
+        result = []
+        def reader():
+            result.append(self.storage.get_device_by_name("sdb"))
+        thread = threading.Thread(target=reader)
+        thread.start()
+        thread.join(1)
+        self.assertEqual(result, [None])
+
+        self.storage.leave_view()
+        self.assertEqual(self.storage.get_device_by_name("sdb"), None)
+        self.assertEqual(len(self.blivet.devices), 3)
+        self.assertEqual(self.storage.snapshot.generation, generation)
+
+if __name__ == '__main__':
+    unittest.main()
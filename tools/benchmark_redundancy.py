@@ -0,0 +1,57 @@
+#!/usr/bin/python
+# Copyright (C) 2013 Red Hat, Inc.  All rights reserved.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#
+# Authors: Jan Safranek <jsafrane@redhat.com>
+# -*- coding: utf-8 -*-
+
+#
+# Measure computation of redundancy of RAIDs with 2 - 256 members, with and
+# without the cache of computed redundancies.
+#
+# Usage: PYTHONPATH=src python tools/benchmark_redundancy.py
+#
+
+import time
+from openlmi.storage.DeviceProvider import DeviceProvider
+
+Redundancy = DeviceProvider.Redundancy
+
+LEVELS = [Redundancy.LINEAR, Redundancy.RAID0, Redundancy.RAID1,
+        Redundancy.RAID4, Redundancy.RAID5, Redundancy.RAID6,
+        Redundancy.RAID10]
+
+def measure(members):
+    """ Return time in seconds to compute redundancy of all LEVELS. """
+    start = time.time()
+    for level in LEVELS:
+        Redundancy.get_common_redundancy_list(members, level)
+    return time.time() - start
+
+def main():
+    count = 2
+    while count <= 256:
+        members = [Redundancy(False, 1, 0, i % 3 + 1)
+                for i in xrange(count)]
+        Redundancy._cache.clear()
+        computed = measure(members)
+        cached = measure(members)
+        print "%d members: %.1f us computed, %.1f us cached" % (
+                count, computed * 1e6, cached * 1e6)
+        count *= 2
+
+if __name__ == '__main__':
+    main()